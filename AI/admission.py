@@ -0,0 +1,224 @@
+# admission.py — per-endpoint admission control and load shedding for the API
+import asyncio
+import json
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from metrics import metrics
+
+# Endpoint class -> (max concurrent, max queued, max queue wait in ms).
+# Override with ADMISSION_<CLASS>_CONCURRENCY / _QUEUE / _MAX_WAIT_MS.
+DEFAULT_LIMITS = {
+    "chat": (32, 64, 2000),
+    "trip": (8, 16, 5000),
+    "refine": (16, 32, 3000),
+    "batch": (1, 0, 0),
+    "jobs": (64, 64, 1000),
+}
+
+# Path prefix -> endpoint class (longest prefix wins). None = never limited.
+# "jobs" bounds open long-polls (GET /trip/jobs/{id}?wait=...); submission
+# also has its own bounded queue.
+ROUTES = {
+    "/chat": "chat",
+    "/trip": "trip",
+    "/trip/batch": "batch",
+    "/trip/jobs": "jobs",
+    "/refine": "refine",
+}
+
+
+class Rejected(Exception):
+    def __init__(self, status: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionLimiter:
+    """
+    At most `limit` requests in flight; up to `queue_size` more wait (FIFO)
+    for at most `max_wait` seconds. Anything beyond is rejected at once:
+
+        queue full        -> 429, Retry-After
+        waited too long   -> 503, Retry-After
+
+    Retry-After is estimated from the recent average service time and the
+    current backlog. Runs on one event loop; no locking needed.
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int, max_wait: float):
+        self.name = name
+        self.limit = max(1, limit)
+        self.queue_size = max(0, queue_size)
+        self.max_wait = max(0.0, max_wait)
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._avg_service = 1.0  # seconds, EWMA
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        backlog = self.active + self.queued
+        return max(1, math.ceil(self._avg_service * backlog / self.limit))
+
+    def _gauges(self) -> None:
+        metrics.set_gauge(f"admission.{self.name}.active", self.active)
+        metrics.set_gauge(f"admission.{self.name}.queued", self.queued)
+
+    async def acquire(self) -> None:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self._admit(0.0)
+            return
+        if self.queued >= self.queue_size or self.max_wait <= 0:
+            self.shed_queue_full += 1
+            metrics.incr(f"admission.{self.name}.shed_queue_full")
+            raise Rejected(429, "Too many requests queued", self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._gauges()
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_wait)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # The slot was handed over just as the timeout fired; give it back.
+                self.release(0.0)
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            self._gauges()
+            self.shed_timeout += 1
+            metrics.incr(f"admission.{self.name}.shed_timeout")
+            raise Rejected(503, "Server busy, queue wait exceeded", self.retry_after())
+        except asyncio.CancelledError:  # client went away while queued
+            if waiter.done() and not waiter.cancelled():
+                self.release(0.0)
+            elif waiter in self._waiters:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            self._gauges()
+            raise
+        self._admit(time.monotonic() - started)
+
+    def _admit(self, waited: float) -> None:
+        self.admitted += 1
+        metrics.incr(f"admission.{self.name}.admitted")
+        metrics.observe(f"admission.{self.name}.queue_wait_seconds", waited)
+        self._gauges()
+
+    def release(self, service_seconds: Optional[float] = None) -> None:
+        """Free a slot; hand it straight to the oldest live waiter if any."""
+        if service_seconds:
+            self._avg_service = 0.8 * self._avg_service + 0.2 * service_seconds
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # slot transfers; `active` unchanged
+                self._gauges()
+                return
+        self.active -= 1
+        self._gauges()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "queue_size": self.queue_size,
+            "max_wait_seconds": self.max_wait,
+            "active": self.active,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_timeout": self.shed_timeout,
+            "avg_service_seconds": round(self._avg_service, 3),
+        }
+
+
+def _limits_from_env(defaults: Dict[str, Tuple[int, int, int]]) -> Dict[str, Tuple[int, int, int]]:
+    limits = {}
+    for name, (concurrency, queue, wait_ms) in defaults.items():
+        prefix = f"ADMISSION_{name.upper()}_"
+        values = []
+        for suffix, default in (("CONCURRENCY", concurrency), ("QUEUE", queue), ("MAX_WAIT_MS", wait_ms)):
+            raw = os.getenv(prefix + suffix)
+            values.append(int(raw) if raw and raw.isdigit() else default)
+        limits[name] = tuple(values)
+    return limits
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware that admits each request to its endpoint class's
+    AdmissionLimiter before it reaches the app, and holds the slot until the
+    response (including a streamed body) has been sent. Shed requests get a
+    JSON 429/503 with Retry-After without touching the threadpool.
+
+    Usage:
+        app.add_middleware(AdmissionMiddleware)
+        app.add_middleware(AdmissionMiddleware, limits={"trip": (4, 8, 2000)})
+
+    ADMISSION_ENABLED=0 turns it into a pass-through.
+    """
+
+    def __init__(self, app, limits: Optional[Dict[str, Tuple[int, int, int]]] = None, routes=None):
+        self.app = app
+        self.enabled = os.getenv("ADMISSION_ENABLED", "1") != "0"
+        self.routes = sorted((routes or ROUTES).items(), key=lambda item: -len(item[0]))
+        merged = {**_limits_from_env(DEFAULT_LIMITS), **(limits or {})}
+        self.limiters = {
+            name: AdmissionLimiter(name, concurrency, queue, wait_ms / 1000.0)
+            for name, (concurrency, queue, wait_ms) in merged.items()
+        }
+        metrics.register("admission", self.stats)
+
+    def limiter_for(self, path: str) -> Optional[AdmissionLimiter]:
+        for prefix, name in self.routes:
+            if path == prefix or path.startswith(prefix + "/"):
+                return self.limiters.get(name) if name else None
+        return None
+
+    async def __call__(self, scope, receive, send):
+        limiter = self.limiter_for(scope.get("path", "")) if self.enabled and scope["type"] == "http" else None
+        if limiter is None or scope.get("method") == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await limiter.acquire()
+        except Rejected as rejected:
+            await _send_rejection(send, rejected)
+            return
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.monotonic() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: limiter.stats() for name, limiter in self.limiters.items()}
+
+
+async def _send_rejection(send, rejected: Rejected) -> None:
+    body = json.dumps({"detail": rejected.reason}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": rejected.status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("ascii")),
+            (b"retry-after", str(rejected.retry_after).encode("ascii")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -1,17 +1,32 @@
 # agent_core.py — TravelAI core (stable, CLI-safe)
 
+import contextvars
 import os
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
-from groq import Groq
 
 from rag_engine import RAGEngine
 from rag_documents import india_travel_docs
-
-from zapi.tools_weather import get_weather
-from zapi.flight_api import search_flights_serpapi
-from zapi.hotel_api import search_hotels_serpapi
-from zapi.tripadvisor_api import search_tripadvisor
+from llm.groq_llm import call_groq_stream, get_groq_client
+from semantic_cache import SemanticCache
+
+from provider_cache import ProviderCache
+from zapi.flight_api import format_fare_calendar
+from prompt_compactor import PromptCompactor, PLACE_COLUMNS
+from itinerary_sections import Itinerary, refine_sections
+from places import CITY_TO_IATA, PLACE_NAMES, canonical_city
+from trip_cache import TripResultCache, provider_fingerprint, trip_request_key
+from trip_planning import (
+    TripPlan,
+    build_trip_plan,
+    plan_summary_for_prompt,
+    render_budget,
+    render_flights,
+    render_hotels,
+    replan,
+    rooms_for,
+)
 
 # -------------------------------------------------
 # ENV
@@ -24,19 +39,24 @@ GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
 if not GROQ_API_KEY:
     raise RuntimeError("GROQ_API_KEY missing")
 
-groq_client = Groq(api_key=GROQ_API_KEY)
+# Same client call_groq_stream uses, so every Groq call shares one pool.
+groq_client = get_groq_client()
 
 
-def call_groq(prompt: str) -> str:
+def call_groq(prompt: str, max_tokens: int = 2048) -> str:
     response = groq_client.chat.completions.create(
         model=GROQ_MODEL,
         messages=[{"role": "user", "content": prompt}],
         temperature=0.4,
-        max_tokens=2048,
+        max_tokens=max_tokens,
     )
     return response.choices[0].message.content.strip()
 
 
+def _items(raw: Any, key: str) -> list:
+    return raw.get(key, []) if isinstance(raw, dict) else []
+
+
 # -------------------------------------------------
 # TRAVEL AI
 # -------------------------------------------------
@@ -46,6 +66,54 @@ class TravelAI:
         self.rag = RAGEngine()
         self.rag.load_docs(india_travel_docs)
 
+        # ---------- PROVIDER CACHES ----------
+        self.providers = ProviderCache()
+
+        # ---------- FINISHED PLANS ----------
+        self.trip_cache = TripResultCache(self.providers.ttls)
+
+        # ---------- CHAT ANSWERS (reuses the RAG embedder) ----------
+        self.chat_cache = SemanticCache(self.rag._embed, self.rag.dim, vocabulary=PLACE_NAMES)
+
+    # -------------------------------------------------
+    # CHAT
+    # -------------------------------------------------
+    def _chat_prompt(self, message: str) -> str:
+        context = self.rag.search(message, top_k=3)
+        return f"""
+You are an expert India travel assistant.
+
+CONTEXT
+{context}
+
+QUESTION
+{message}
+
+Answer concisely. Use the context when it is relevant, otherwise general knowledge.
+"""
+
+    def ask(self, message: str) -> str:
+        """Travel Q&A; paraphrases of recent questions are served from the semantic cache."""
+        cached = self.chat_cache.lookup(message)
+        if cached is not None:
+            return cached
+        answer = call_groq(self._chat_prompt(message), max_tokens=1024)
+        self.chat_cache.store(message, answer)
+        return answer
+
+    def ask_stream(self, message: str):
+        """Streaming ask(); a cache hit is yielded as a single chunk."""
+        cached = self.chat_cache.lookup(message)
+        if cached is not None:
+            yield cached
+            return
+        chunks = []
+        for chunk in call_groq_stream(self._chat_prompt(message)):
+            chunks.append(chunk)
+            yield chunk
+        # Only complete answers are cached (a dropped client stops the generator).
+        self.chat_cache.store(message, "".join(chunks).strip())
+
     # -------------------------------------------------
     # FULL TRIP PLANNER
     # -------------------------------------------------
@@ -60,39 +128,52 @@ class TravelAI:
         interests: str = "sightseeing",
         days: int = 3,
         max_budget: Optional[int] = None,
+        flex_days: int = 0,
     ) -> str:
+        """Full itinerary as markdown, or a "❌ ..." message for unsupported cities."""
+        result = self.plan_trip(
+            origin_city, destination_city, depart_date, return_date,
+            passengers, cabin_class, interests, days, max_budget, flex_days,
+        )
+        return result.get("message") or result.get("itinerary", "")
 
-        # ---------- CITY ALIASES ----------
-        CITY_ALIASES = {
-            "hyd": "hyderabad",
-            "blr": "bangalore",
-            "bom": "mumbai",
-            "mum": "mumbai",
-            "del": "delhi",
-            "maa": "chennai",
-            "ccu": "kolkata",
-        }
-
-        # ---------- STATE → CITY ----------
-        STATE_TO_CITY = {
-            "kerala": "kochi",
-            "tamil nadu": "chennai",
-            "karnataka": "bangalore",
-            "maharashtra": "mumbai",
-            "rajasthan": "jaipur",
-            "telangana": "hyderabad",
-            "andhra pradesh": "visakhapatnam",
-            "west bengal": "kolkata",
-        }
-
-        origin_city = origin_city.strip().lower()
-        destination_city = destination_city.strip().lower()
-
-        origin_city = CITY_ALIASES.get(origin_city, origin_city)
-        destination_city = CITY_ALIASES.get(destination_city, destination_city)
+    def plan_trip(self, *args, **kwargs) -> Dict[str, Any]:
+        """
+        plan_full_trip_events drained to its final event: the "done" event
+        (itinerary plus the TripPlan dict that /refine re-renders from) or
+        the "error" event.
+        """
+        final: Dict[str, Any] = {}
+        for event in self.plan_full_trip_events(*args, **kwargs):
+            if event["type"] in ("done", "error"):
+                final = event
+        return final
 
-        origin_city = STATE_TO_CITY.get(origin_city, origin_city)
-        destination_city = STATE_TO_CITY.get(destination_city, destination_city)
+    def plan_full_trip_events(
+        self,
+        origin_city: str,
+        destination_city: str,
+        depart_date: str,
+        return_date: str,
+        passengers: int = 2,
+        cabin_class: str = "economy",
+        interests: str = "sightseeing",
+        days: int = 3,
+        max_budget: Optional[int] = None,
+        flex_days: int = 0,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        plan_full_trip as a stream of events, for progressive delivery:
+
+            {"type": "started", ...}
+            {"type": "weather" | "flights" | "hotels" | "activities", ...}  as each provider returns
+            {"type": "token", "text": ...}                                  itinerary prose from the LLM
+            {"type": "budget", "markdown": ...}
+            {"type": "done", "itinerary": ..., "cached": bool, "plan": TripPlan.to_dict()}
+            {"type": "error", "message": "❌ ..."}                          unsupported city
+        """
+        origin_city = canonical_city(origin_city)
+        destination_city = canonical_city(destination_city)
 
         # ---------- DATE NORMALIZATION ----------
         def normalize_date(d: str) -> str:
@@ -104,59 +185,80 @@ class TravelAI:
         depart_date = normalize_date(depart_date)
         return_date = normalize_date(return_date)
 
-        # ---------- CITY → IATA ----------
-        CITY_TO_IATA = {
-            "delhi": "DEL",
-            "hyderabad": "HYD",
-            "mumbai": "BOM",
-            "bangalore": "BLR",
-            "chennai": "MAA",
-            "goa": "GOI",
-            "kolkata": "CCU",
-            "kochi": "COK",
-            "trivandrum": "TRV",
-            "calicut": "CCJ",
-            "jaipur": "JAI",
-            "visakhapatnam": "VTZ",
-        }
-
         origin_iata = CITY_TO_IATA.get(origin_city)
         dest_iata = CITY_TO_IATA.get(destination_city)
 
         if not origin_iata:
-            return f"❌ Unsupported origin city: {origin_city.title()}"
+            yield {"type": "error", "message": f"❌ Unsupported origin city: {origin_city.title()}"}
+            return
 
         if not dest_iata:
-            return f"❌ Unsupported destination city: {destination_city.title()}"
-
-        # ---------- DATA ----------
-        weather = get_weather(destination_city)
+            yield {"type": "error", "message": f"❌ Unsupported destination city: {destination_city.title()}"}
+            return
+
+        yield {
+            "type": "started",
+            "origin_city": origin_city,
+            "destination_city": destination_city,
+            "depart_date": depart_date,
+            "return_date": return_date,
+            "days": days,
+        }
 
-        flights_raw = search_flights_serpapi(
-            origin_airport=origin_iata,
-            destination_airport=dest_iata,
+        # ---------- DATA (concurrent, reported as each arrives) ----------
+        data: Dict[str, Any] = {}
+        for name, value in self._fetch_trip_data(
+            origin_iata, dest_iata, destination_city, depart_date, return_date,
+            passengers, cabin_class, flex_days,
+        ):
+            data[name] = value
+            if name == "weather":
+                yield {"type": "weather", "text": value}
+            elif name == "flights":
+                flights_raw, fare_calendar = value
+                partial = build_trip_plan(
+                    _items(flights_raw, "flights"), [], depart_date, return_date, passengers, days,
+                    fare_calendar=fare_calendar,
+                )
+                yield {"type": "flights", "markdown": render_flights(partial)}
+            elif name == "hotels":
+                partial = build_trip_plan([], _items(value, "hotels"), depart_date, return_date, passengers, days)
+                yield {"type": "hotels", "markdown": render_hotels(partial)}
+            elif name == "activities":
+                yield {"type": "activities", "places": [p.get("title") for p in _items(value, "places")]}
+
+        weather = data["weather"]
+        flights_raw, fare_calendar = data["flights"]
+        hotels_raw = data["hotels"]
+        activities_raw = data["activities"]
+        activities = _items(activities_raw, "places")
+
+        # ---------- DETERMINISTIC PLANNING ----------
+        # Flight ranking, hotel tiers and budget math are computed here; the
+        # LLM only writes the day-wise itinerary and transport tips.
+        plan = build_trip_plan(
+            flights=_items(flights_raw, "flights"),
+            hotels=_items(hotels_raw, "hotels"),
             depart_date=depart_date,
             return_date=return_date,
             passengers=passengers,
-            cabin_class=cabin_class,
+            days=days,
+            max_budget=max_budget,
+            fare_calendar=fare_calendar,
         )
-        flights = flights_raw.get("flights", []) if isinstance(flights_raw, dict) else []
-
-        hotels_raw = search_hotels_serpapi(
-            city=destination_city,
-            checkin=depart_date,
-            checkout=return_date,
-            adults=passengers,
-            rooms=1,
-        )
-        hotels = hotels_raw.get("hotels", []) if isinstance(hotels_raw, dict) else []
 
-        activities_raw = search_tripadvisor(
-            city=destination_city,
-            interests="things to do",
-            max_results=10,
+        # ---------- WHOLE-RESPONSE CACHE ----------
+        # Same canonical request over the same fares, hotels and places -> same
+        # plan; a refreshed forecast alone does not invalidate it.
+        cache_key = trip_request_key(
+            origin_city, destination_city, depart_date, return_date,
+            passengers, cabin_class, interests, days, max_budget, flex_days,
         )
-        activities = activities_raw.get("places", []) if isinstance(activities_raw, dict) else []
+        fingerprint = provider_fingerprint(flights_raw, hotels_raw, activities_raw, fare_calendar)
+        cached = self.trip_cache.get(cache_key, fingerprint)
+        if cached is not None:
+            yield {"type": "done", "itinerary": cached, "cached": True, "plan": plan.to_dict()}
+            return
 
         rag_context = self.rag.search(
             f"Travel tips, food, safety, best time for {destination_city}",
@@ -165,6 +267,12 @@ class TravelAI:
 
         budget_text = f"{max_budget} INR" if max_budget else "Not specified"
 
+        # ---------- COMPACT PROMPT SECTIONS ----------
+        compactor = PromptCompactor()
+        weather_text = compactor.text("weather", weather)
+        rag_text = compactor.text("rag", rag_context)
+        activities_text = compactor.table("activities", activities, PLACE_COLUMNS)
+
         prompt = f"""
 You are an expert India travel planner.
 
@@ -172,34 +280,105 @@ From: {origin_city.title()}
 To: {destination_city.title()}
 Depart: {depart_date}
 Return: {return_date}
+Days: {days}
 Passengers: {passengers}
 Interests: {interests}
 Budget: {budget_text}
 
 WEATHER
-{weather}
+{weather_text}
 
 RAG INFO
-{rag_context}
+{rag_text}
 
-FLIGHTS
-{flights}
-
-HOTELS
-{hotels}
+CHOSEN TRAVEL AND STAY
+{plan_summary_for_prompt(plan)}
 
 ACTIVITIES
-{activities}
-
-OUTPUT:
-1. Flights
-2. Hotels
-3. Day-wise itinerary
-4. Transport tips
-5. Budget summary
+{activities_text}
+
+Flights, hotels and the budget table are already written. Write ONLY these
+markdown sections, nothing before or after:
+## Day 1 ... ## Day {days} (morning / afternoon / evening, using the activities above)
+## Transport tips
 """
 
-        return call_groq(prompt)
+        compactor.report(prompt)
+        chunks = []
+        for chunk in call_groq_stream(prompt, max_tokens=min(2048, 300 + 250 * days)):
+            chunks.append(chunk)
+            yield {"type": "token", "text": chunk}
+
+        budget_section = render_budget(plan)
+        yield {"type": "budget", "markdown": budget_section}
+
+        itinerary = "\n\n".join(
+            [render_flights(plan), render_hotels(plan), "".join(chunks).strip(), budget_section]
+        )
+        self.trip_cache.set(cache_key, fingerprint, itinerary)
+        yield {"type": "done", "itinerary": itinerary, "cached": False, "plan": plan.to_dict()}
+
+    def _fetch_trip_data(
+        self,
+        origin_iata: str,
+        dest_iata: str,
+        destination_city: str,
+        depart_date: str,
+        return_date: str,
+        passengers: int,
+        cabin_class: str,
+        flex_days: int,
+    ) -> Iterator[Tuple[str, Any]]:
+        """Run the provider lookups concurrently; yield (name, result) in completion order."""
+
+        def flights():
+            # Fare calendar first: its centre cell fills the exact-date flights
+            # cache, so the lookup below is a cache hit.
+            fare_calendar = ""
+            if flex_days > 0:
+                fare_calendar = format_fare_calendar(
+                    self.providers.fare_calendar(
+                        origin_airport=origin_iata,
+                        destination_airport=dest_iata,
+                        depart_date=depart_date,
+                        return_date=return_date,
+                        flex_days=flex_days,
+                        passengers=passengers,
+                        cabin_class=cabin_class,
+                    )
+                )
+            flights_raw = self.providers.flights(
+                origin_airport=origin_iata,
+                destination_airport=dest_iata,
+                depart_date=depart_date,
+                return_date=return_date,
+                passengers=passengers,
+                cabin_class=cabin_class,
+            )
+            return flights_raw, fare_calendar
+
+        tasks = {
+            "weather": lambda: self.providers.weather(destination_city),
+            "flights": flights,
+            "hotels": lambda: self.providers.hotels(
+                city=destination_city,
+                checkin=depart_date,
+                checkout=return_date,
+                adults=passengers,
+                rooms=rooms_for(passengers),
+            ),
+            "activities": lambda: self.providers.tripadvisor(
+                city=destination_city,
+                interests="things to do",
+                max_results=10,
+            ),
+        }
+        with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="trip-data") as pool:
+            # Each lookup runs in a copy of the caller's context, so the
+            # caller's SerpAPI priority (e.g. a low-priority job) applies.
+            futures = {pool.submit(contextvars.copy_context().run, fn): name for name, fn in tasks.items()}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
 
     # -------------------------------------------------
     # 🔥 ITINERARY REFINEMENT (FIXES YOUR ERROR)
@@ -207,23 +386,36 @@ OUTPUT:
     def refine_itinerary(self, existing_itinerary: str, user_request: str) -> str:
         """
         Refines an existing itinerary based on user feedback.
-        """
 
-        prompt = f"""
-You are an expert India travel planner.
+        Only the sections the request touches (flights, hotels, a day,
+        budget, transport) are sent to the LLM and spliced back; free-form
+        itineraries without headings fall back to a full rewrite.
+        """
+        updated, _, _ = self.refine_sections(Itinerary.from_text(existing_itinerary), user_request)
+        return updated.to_text()
 
-CURRENT ITINERARY:
-{existing_itinerary}
+    def refine_sections(
+        self,
+        itinerary: Itinerary,
+        user_request: str,
+        plan: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[Itinerary, List[str], Optional[Dict[str, Any]]]:
+        """
+        Section-level refinement; returns (updated Itinerary, touched section
+        keys, updated plan). With the TripPlan dict from plan_trip, flights,
+        hotels and budget are re-picked and re-rendered from its provider
+        data (see trip_planning.replan) and only the rest goes to the LLM.
+        """
+        if not plan:
+            updated, keys = refine_sections(itinerary, user_request, llm=call_groq)
+            return updated, keys, plan
 
-USER REQUEST:
-{user_request}
+        state = {"plan": TripPlan.from_dict(plan)}
 
-INSTRUCTIONS:
-- Modify ONLY what the user asked for
-- Keep all other days unchanged
-- Be realistic and practical
-- Return the FULL updated itinerary
+        def rerender(request: str, keys: List[str]) -> Dict[str, str]:
+            state["plan"] = replan(state["plan"], request, keys)
+            renderers = {"flights": render_flights, "hotels": render_hotels, "budget": render_budget}
+            return {key: renderers[key](state["plan"]) for key in keys}
 
-UPDATED ITINERARY:
-"""
-        return call_groq(prompt)
+        updated, keys = refine_sections(itinerary, user_request, llm=call_groq, rerender=rerender)
+        return updated, keys, state["plan"].to_dict()
@@ -1,14 +1,24 @@
 # api.py — FastAPI backend for TravelAI (with CORS)
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field, validator
+from contextlib import closing
 from typing import Optional
 from datetime import datetime
+import asyncio
+import json
 import logging
+import time
 
 from agent_core import TravelAI
+from metrics import metrics
+from admission import AdmissionMiddleware
+from batch_runner import BATCH_CONCURRENCY, run_batch
+from session_store import SessionConflict, SessionStore
+from trip_jobs import FINISHED, PRIORITIES, JobQueue, QueueFullError
+from zapi.scheduler import BACKGROUND, INTERACTIVE, priority
 
 # Simple logging config for the AI service; in production use structured logging/central collector
 logging.basicConfig(level=logging.INFO)
@@ -39,6 +49,12 @@ app = FastAPI(
     description="Travel AI backend with chat, streaming, and trip planning",
 )
 
+# -------------------------------------------------
+# ADMISSION CONTROL (per-endpoint concurrency, bounded queue, fast 429/503)
+# -------------------------------------------------
+# Added before CORS so CORS wraps it and shed responses stay readable by the frontend.
+app.add_middleware(AdmissionMiddleware)
+
 # -------------------------------------------------
 # CORS (REQUIRED FOR FRONTEND)
 # -------------------------------------------------
@@ -56,6 +72,8 @@ app.add_middleware(
 # AI AGENT
 # -------------------------------------------------
 agent = TravelAI()
+sessions = SessionStore()
+jobs = JobQueue()
 
 # -------------------------------------------------
 # REQUEST MODELS
@@ -64,6 +82,11 @@ class ChatRequest(BaseModel):
     message: str = Field(..., min_length=1, max_length=2000)
 
 
+class ChatFeedback(BaseModel):
+    message: str = Field(..., min_length=1, max_length=2000)
+    wrong_answer: bool = True
+
+
 class TripRequest(BaseModel):
     origin_city: str = Field(..., min_length=2, max_length=100)
     destination_city: str = Field(..., min_length=2, max_length=100)
@@ -74,6 +97,7 @@ class TripRequest(BaseModel):
     interests: Optional[str] = Field("sightseeing", max_length=300)
     days: int = Field(3, ge=1, le=60)
     max_budget: Optional[int] = None
+    flex_days: int = Field(0, ge=0, le=3)
 
     @validator('cabin_class')
     def cabin_class_choices(cls, v):
@@ -95,6 +119,26 @@ class TripRequest(BaseModel):
         return v.strip().lower()
 
 
+class TripJobRequest(TripRequest):
+    priority: str = Field("normal")
+
+    @validator('priority')
+    def priority_choices(cls, v):
+        if v not in PRIORITIES:
+            raise ValueError(f"priority must be one of {set(PRIORITIES)}")
+        return v
+
+
+def _trip_meta(req: TripRequest) -> dict:
+    """Request fields kept with a session or job."""
+    return {
+        "origin_city": req.origin_city,
+        "destination_city": req.destination_city,
+        "depart_date": req.depart_date,
+        "return_date": req.return_date,
+    }
+
+
 # -------------------------------------------------
 # HEALTH
 # -------------------------------------------------
@@ -103,6 +147,14 @@ def health():
     return {"status": "ok", "service": "TravelAI"}
 
 
+# -------------------------------------------------
+# METRICS
+# -------------------------------------------------
+@app.get("/metrics")
+def get_metrics():
+    return metrics.snapshot()
+
+
 # -------------------------------------------------
 # CHAT (NON-STREAMING)
 # -------------------------------------------------
@@ -138,13 +190,23 @@ def chat_stream(req: ChatRequest):
     return StreamingResponse(generator(), media_type="text/plain")
 
 
+# -------------------------------------------------
+# CHAT CACHE FEEDBACK
+# -------------------------------------------------
+@app.post("/chat/feedback")
+def chat_feedback(req: ChatFeedback):
+    """Report a cached answer that did not fit the question; it is dropped and counted as a false hit."""
+    dropped = agent.chat_cache.report_false_hit(req.message) if req.wrong_answer else False
+    return {"dropped": dropped}
+
+
 # -------------------------------------------------
 # FULL TRIP PLANNER
 # -------------------------------------------------
 @app.post("/trip")
 def plan_trip(req: TripRequest):
     try:
-        itinerary = agent.plan_full_trip(
+        result = agent.plan_trip(
             origin_city=req.origin_city,
             destination_city=req.destination_city,
             depart_date=req.depart_date,
@@ -154,13 +216,16 @@ def plan_trip(req: TripRequest):
             interests=req.interests,
             days=req.days,
             max_budget=req.max_budget,
+            flex_days=req.flex_days,
         )
 
-        if isinstance(itinerary, str) and itinerary.startswith('❌'):
+        if result.get("type") == "error":
             # Known validation from agent
-            raise HTTPException(status_code=400, detail=itinerary)
+            raise HTTPException(status_code=400, detail=result["message"])
 
-        return {"itinerary": itinerary}
+        itinerary = result["itinerary"]
+        session = sessions.create(itinerary, meta=_trip_meta(req), plan=result.get("plan"))
+        return {"itinerary": itinerary, "session_id": session.session_id}
     except HTTPException:
         raise
     except Exception as e:
@@ -168,18 +233,194 @@ def plan_trip(req: TripRequest):
         raise HTTPException(status_code=500, detail='Trip planning failed')
 
 
+# -------------------------------------------------
+# FULL TRIP PLANNER (STREAMING, NDJSON)
+# -------------------------------------------------
+PROVIDER_EVENTS = {"weather", "flights", "hotels", "activities"}
+
+
+@app.post("/trip/stream")
+def plan_trip_stream(req: TripRequest):
+    """
+    One JSON object per line, pushed as soon as it is ready: provider results
+    (weather, flights, hotels, activities), then itinerary tokens, then the
+    budget and a final "done" event carrying the full itinerary and a
+    session_id for /refine. See TravelAI.plan_full_trip_events for the shape.
+    """
+    started = time.perf_counter()
+
+    def generator():
+        marks = set()
+
+        def mark(name):
+            if name not in marks:
+                marks.add(name)
+                metrics.observe(f"trip.{name}_seconds", time.perf_counter() - started)
+
+        try:
+            for event in agent.plan_full_trip_events(**req.dict()):
+                if event["type"] == "done":
+                    plan = event.pop("plan", None)
+                    session = sessions.create(event["itinerary"], meta=_trip_meta(req), plan=plan)
+                    event = {**event, "session_id": session.session_id}
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+
+                mark("ttfb")
+                if event["type"] in PROVIDER_EVENTS:
+                    mark("first_provider")
+                elif event["type"] == "token":
+                    mark("first_token")
+            mark("total")
+        except Exception:
+            logger.exception('plan_trip_stream failed')
+            metrics.incr("trip.stream_errors")
+            yield json.dumps({"type": "error", "message": "Trip planning failed"}) + "\n"
+
+    return StreamingResponse(generator(), media_type="application/x-ndjson")
+
+
+
+# -------------------------------------------------
+# FULL TRIP PLANNER (BATCH, JSONL IN / JSONL OUT)
+# -------------------------------------------------
+@app.post("/trip/batch")
+async def plan_trip_batch(request: Request, concurrency: int = Query(BATCH_CONCURRENCY, ge=1, le=16)):
+    """
+    Body: one TripRequest JSON object per line. Streams one JSON result per
+    line as each plan finishes (see batch_runner.run_batch), then a summary.
+    """
+    lines = (await request.body()).decode("utf-8").splitlines()
+
+    def add_session(row, kwargs, result):
+        # Same session contents as /trip: request meta plus the TripPlan.
+        session = sessions.create(row["itinerary"], meta=_trip_meta(TripRequest(**kwargs)), plan=result.get("plan"))
+        row["session_id"] = session.session_id
+
+    def generator():
+        for result in run_batch(
+            agent.plan_trip,
+            lines,
+            concurrency=concurrency,
+            parse=lambda obj: TripRequest(**obj).dict(),
+            provider_stats=agent.providers.stats,
+            on_success=add_session,
+        ):
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(generator(), media_type="application/x-ndjson")
+
+
+# -------------------------------------------------
+# FULL TRIP PLANNER (ASYNC JOBS)
+# -------------------------------------------------
+def _trip_job(req: TripJobRequest):
+    params = req.dict(exclude={"priority"})
+
+    def run(job):
+        # Low-priority jobs spend SerpAPI quota as background traffic.
+        with priority(BACKGROUND if job.priority == "low" else INTERACTIVE):
+            with closing(agent.plan_full_trip_events(**params)) as events:
+                for event in events:
+                    job.check_cancelled()
+                    if event["type"] == "error":
+                        raise ValueError(event["message"])
+                    job.progress("itinerary" if event["type"] == "token" else event["type"])
+                    if event["type"] == "done":
+                        session = sessions.create(event["itinerary"], meta=_trip_meta(req), plan=event.get("plan"))
+                        return {"itinerary": event["itinerary"], "session_id": session.session_id}
+        raise RuntimeError("planner finished without an itinerary")
+
+    return run
+
+
+@app.post("/trip/jobs", status_code=202)
+def submit_trip_job(req: TripJobRequest):
+    try:
+        job = jobs.submit(_trip_job(req), priority=req.priority, meta=_trip_meta(req))
+    except QueueFullError:
+        raise HTTPException(status_code=503, detail="Trip job queue is full", headers={"Retry-After": "30"})
+    return job.to_dict()
+
+
+# Long-polls check the job this often on the event loop instead of parking
+# a threadpool thread in Job.wait().
+JOB_POLL_INTERVAL = 0.25
+
+
+@app.get("/trip/jobs/{job_id}")
+async def get_trip_job(job_id: str, wait: float = Query(0, ge=0, le=30)):
+    """Job status and, once succeeded, its result. `wait` long-polls up to that many seconds for completion."""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job_id")
+    deadline = time.monotonic() + wait
+    while job.status not in FINISHED:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        await asyncio.sleep(min(JOB_POLL_INTERVAL, remaining))
+    return job.to_dict()
+
 
+@app.delete("/trip/jobs/{job_id}")
+def cancel_trip_job(job_id: str):
+    job = jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job_id")
+    return job.to_dict()
+
+
+# -------------------------------------------------
+# REFINEMENT (SERVER-SIDE SESSIONS)
+# -------------------------------------------------
 class RefineRequest(BaseModel):
-    itinerary: str
-    user_request: str
+    user_request: str = Field(..., min_length=1, max_length=2000)
+    # session_id from /trip; `itinerary` is only needed to start a session
+    # for an itinerary that did not come from /trip.
+    session_id: Optional[str] = Field(None, max_length=64)
+    itinerary: Optional[str] = None
 
 
 @app.post("/refine")
 def refine_trip(req: RefineRequest):
-    updated = agent.refine_itinerary(
-        existing_itinerary=req.itinerary,
-        user_request=req.user_request,
-    )
-    return {"itinerary": updated}
+    if req.session_id:
+        session_id = req.session_id
+    elif req.itinerary:
+        session_id = sessions.create(req.itinerary).session_id
+    else:
+        raise HTTPException(status_code=422, detail="session_id or itinerary is required")
+
+    with sessions.locked(session_id):
+        session = sessions.get(session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Unknown or expired session_id")
+        try:
+            session.itinerary, changed, session.plan = agent.refine_sections(
+                session.itinerary, req.user_request, session.plan,
+            )
+        except Exception:
+            logger.exception('refine_trip failed')
+            raise HTTPException(status_code=500, detail='Itinerary refinement failed')
+        session.requests.append(req.user_request)
+        try:
+            sessions.save(session)
+        except SessionConflict:
+            raise HTTPException(status_code=409, detail="Session was updated by another request; retry")
+
+    return {"itinerary": session.text, "session_id": session_id, "changed": changed}
+
+
+@app.get("/sessions/{session_id}")
+def get_session(session_id: str):
+    session = sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired session_id")
+    return {"session_id": session_id, "itinerary": session.text, "requests": session.requests}
+
+
+@app.delete("/sessions/{session_id}")
+def delete_session(session_id: str):
+    sessions.delete(session_id)
+    return {"deleted": session_id}
 
 
@@ -0,0 +1,160 @@
+# batch_runner.py — plan many trips from JSONL with bounded concurrency
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from metrics import metrics
+from trip_cache import trip_request_key
+from zapi.scheduler import BACKGROUND, priority
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+
+REQUIRED_FIELDS = ("origin_city", "destination_city", "depart_date", "return_date")
+OPTIONAL_FIELDS = {
+    "passengers": int,
+    "cabin_class": str,
+    "interests": str,
+    "days": int,
+    "max_budget": int,
+    "flex_days": int,
+}
+
+
+def parse_request(obj: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    plan_full_trip kwargs from one JSONL object. Missing optional fields
+    keep plan_full_trip's defaults; unknown fields are ignored.
+    """
+    if not isinstance(obj, dict):
+        raise ValueError("each line must be a JSON object")
+    missing = [name for name in REQUIRED_FIELDS if not obj.get(name)]
+    if missing:
+        raise ValueError(f"missing fields: {', '.join(missing)}")
+    kwargs = {name: str(obj[name]) for name in REQUIRED_FIELDS}
+    for name, cast in OPTIONAL_FIELDS.items():
+        if obj.get(name) is not None:
+            kwargs[name] = cast(obj[name])
+    return kwargs
+
+
+def _dedupe_key(kwargs: Dict[str, Any]) -> Tuple[Any, ...]:
+    """The trip cache key, so requests the planner would serve alike ('HYD', 'Hyderabad') run once."""
+    return trip_request_key(**kwargs)
+
+
+def _provider_savings(stats: Optional[Callable[[], Dict[str, Dict[str, Any]]]]) -> int:
+    """Provider lookups answered without a call (cache hits plus coalesced misses)."""
+    if stats is None:
+        return 0
+    return sum(s.get("hits", 0) + s.get("coalesced", 0) for s in stats().values())
+
+
+def run_batch(
+    plan: Callable[..., Any],
+    lines: Iterable[str],
+    concurrency: int = BATCH_CONCURRENCY,
+    parse: Callable[[Dict[str, Any]], Dict[str, Any]] = parse_request,
+    provider_stats: Optional[Callable[[], Dict[str, Dict[str, Any]]]] = None,
+    max_items: int = BATCH_MAX_ITEMS,
+    on_success: Optional[Callable[[Dict[str, Any], Dict[str, Any], Any], None]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Plan every JSONL trip request in `lines`, yielding one result per
+    non-blank line as it completes ("index" is its 0-based line number),
+    then a summary:
+
+        {"index": 0, "status": "ok", "itinerary": "..."}
+        {"index": 1, "status": "error", "error": "missing fields: return_date"}
+        {"type": "summary", "total": 2, "succeeded": 1, "failed": 1, ...}
+
+    At most `concurrency` plans run at once, at BACKGROUND SerpAPI priority,
+    and reading stops while that many are waiting, so huge inputs are not
+    held in memory. Requests identical after normalization are planned once.
+    Overlapping provider lookups (same destination weather, hotels, ...)
+    are shared through the agent's ProviderCache, which coalesces concurrent
+    misses; `provider_stats` (ProviderCache.stats) reports how many were saved.
+
+    `plan` returns the itinerary text (plan_full_trip) or a final event dict
+    (TravelAI.plan_trip). `on_success(row, kwargs, result)` may add fields
+    to each ok row before it is yielded, e.g. a session id.
+    """
+    concurrency = max(1, concurrency)
+    saved_before = _provider_savings(provider_stats)
+    counts = {"total": 0, "succeeded": 0, "failed": 0, "deduplicated": 0}
+
+    def planned(kwargs):
+        with priority(BACKGROUND):
+            return plan(**kwargs)
+
+    def row(index: int, future: Future) -> Dict[str, Any]:
+        try:
+            result = future.result()
+        except Exception as e:
+            return {"index": index, "status": "error", "error": str(e) or e.__class__.__name__}
+        if isinstance(result, dict):
+            if result.get("type") == "error":
+                return {"index": index, "status": "error", "error": result.get("message")}
+            itinerary = result.get("itinerary")
+        else:
+            itinerary = result
+        if isinstance(itinerary, str) and itinerary.startswith("❌"):
+            return {"index": index, "status": "error", "error": itinerary}
+        out = {"index": index, "status": "ok", "itinerary": itinerary}
+        if on_success is not None:
+            on_success(out, requests[future], result)
+        return out
+
+    def emit(out: Dict[str, Any]) -> Dict[str, Any]:
+        counts["succeeded" if out["status"] == "ok" else "failed"] += 1
+        metrics.incr(f"batch.{out['status']}")
+        return out
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="trip-batch") as pool:
+        by_key: Dict[Tuple[Any, ...], Future] = {}
+        requests: Dict[Future, Dict[str, Any]] = {}
+        waiting: Dict[Future, List[int]] = {}
+
+        def drain(block_until: int) -> Iterator[Dict[str, Any]]:
+            while len(waiting) > block_until:
+                done, _ = wait(list(waiting), return_when=FIRST_COMPLETED)
+                for future in done:
+                    for index in waiting.pop(future):
+                        yield emit(row(index, future))
+
+        for index, line in enumerate(lines):
+            line = line.strip()
+            if not line:
+                continue
+            counts["total"] += 1
+            if counts["total"] > max_items:
+                yield emit({"index": index, "status": "error", "error": f"batch limit of {max_items} requests reached"})
+                break
+            try:
+                kwargs = parse(json.loads(line))
+            except Exception as e:
+                yield emit({"index": index, "status": "error", "error": f"invalid request: {e}"})
+                continue
+
+            key = _dedupe_key(kwargs)
+            future = by_key.get(key)
+            if future is not None:
+                counts["deduplicated"] += 1
+                if future in waiting:
+                    waiting[future].append(index)
+                else:
+                    yield emit(row(index, future))
+                continue
+
+            yield from drain(block_until=concurrency - 1)
+            future = pool.submit(planned, kwargs)
+            by_key[key] = future
+            requests[future] = kwargs
+            waiting[future] = [index]
+
+        yield from drain(block_until=0)
+
+    counts["provider_lookups_saved"] = _provider_savings(provider_stats) - saved_before
+    metrics.incr("batch.deduplicated", counts["deduplicated"])
+    yield {"type": "summary", **counts}
@@ -0,0 +1,78 @@
+# bench_cache.py — micro-benchmark: legacy dict TTLCache vs bounded LRU TTLCache
+#
+# Run from the AI/ folder:
+#   python benchmarks/bench_cache.py
+
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache_utils import TTLCache  # noqa: E402
+
+
+class LegacyTTLCache:
+    """The original unbounded, unlocked implementation, kept for comparison."""
+
+    def __init__(self, ttl_seconds: int = 600):
+        self.ttl = ttl_seconds
+        self._data: Dict[Tuple[Any, ...], Tuple[float, Any]] = {}
+
+    def get(self, *parts: Any) -> Any:
+        entry = self._data.get(tuple(parts))
+        if not entry:
+            return None
+        expires_at, value = entry
+        if time.time() > expires_at:
+            self._data.pop(tuple(parts), None)
+            return None
+        return value
+
+    def set(self, value: Any, *parts: Any) -> None:
+        self._data[tuple(parts)] = (time.time() + self.ttl, value)
+
+
+PAYLOAD = {"hotels": [{"name": f"Hotel {i}", "price": 1000 + i, "rating": 4.1} for i in range(5)]}
+
+
+def run(cache, ops: int, key_space: int, read_ratio: float, seed: int = 7) -> float:
+    rng = random.Random(seed)
+    keys = [("goa", f"2025-12-{d:02d}", rng.randint(1, 4)) for d in range(1, key_space + 1)]
+    start = time.perf_counter()
+    for _ in range(ops):
+        key = keys[rng.randrange(key_space)]
+        if rng.random() < read_ratio:
+            if cache.get(*key) is None:
+                cache.set(PAYLOAD, *key)
+        else:
+            cache.set(PAYLOAD, *key)
+    return ops / (time.perf_counter() - start)
+
+
+def main():
+    ops = int(os.getenv("BENCH_OPS", "200000"))
+    scenarios = [
+        ("hot keys (fits in cache)", 500, 0.9),
+        ("diverse keys (exceeds bound)", 50000, 0.9),
+        ("write heavy", 5000, 0.5),
+    ]
+    print(f"{'scenario':32} {'legacy ops/s':>14} {'lru ops/s':>14} {'lru+bytes ops/s':>16} {'legacy size':>12} {'lru size':>9}")
+    for name, key_space, read_ratio in scenarios:
+        legacy = LegacyTTLCache(ttl_seconds=600)
+        lru = TTLCache(ttl_seconds=600, max_entries=2048)
+        lru_bytes = TTLCache(ttl_seconds=600, max_entries=2048, max_bytes=4 * 1024 * 1024)
+
+        legacy_ops = run(legacy, ops, key_space, read_ratio)
+        lru_ops = run(lru, ops, key_space, read_ratio)
+        lru_bytes_ops = run(lru_bytes, ops, key_space, read_ratio)
+        print(
+            f"{name:32} {legacy_ops:14,.0f} {lru_ops:14,.0f} {lru_bytes_ops:16,.0f} "
+            f"{len(legacy._data):12,} {len(lru):9,}"
+        )
+
+
+if __name__ == "__main__":
+    main()
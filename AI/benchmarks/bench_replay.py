@@ -0,0 +1,87 @@
+# bench_replay.py — offline provider throughput from a recorded fixture corpus.
+#
+# 1. Record once (live keys, real quota):
+#      PROVIDER_RECORD_MODE=record python benchmarks/bench_replay.py --requests 20
+# 2. Replay anywhere, no network:
+#      PROVIDER_RECORD_MODE=replay PROVIDER_REPLAY_LATENCY_MS=300 \
+#      PROVIDER_REPLAY_JITTER_MS=100 PROVIDER_REPLAY_ERROR_RATE=0.02 \
+#      python benchmarks/bench_replay.py --requests 500 --workers 32
+#
+# Each simulated /trip fetches weather, flights, hotels and activities for a
+# route from a fixed, seeded list, like TravelAI.plan_full_trip (LLM excluded).
+# Corpus path: PROVIDER_FIXTURES (default fixtures/providers.jsonl.gz).
+
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Providers refuse to run without keys; replay never sends them anywhere.
+if os.getenv("PROVIDER_RECORD_MODE") == "replay":
+    for name in ("SERPAPI_KEY", "OPENWEATHER_API_KEY"):
+        os.environ.setdefault(name, "replay")
+
+from metrics import metrics  # noqa: E402
+from zapi.flight_api import search_flights_serpapi  # noqa: E402
+from zapi.hotel_api import search_hotels_serpapi  # noqa: E402
+from zapi.tools_weather import get_weather  # noqa: E402
+from zapi.tripadvisor_api import search_tripadvisor  # noqa: E402
+from zapi.recording import RECORD_MODE, FIXTURES_PATH  # noqa: E402
+
+ROUTES = [
+    ("DEL", "GOI", "goa"),
+    ("BOM", "BLR", "bangalore"),
+    ("HYD", "JAI", "jaipur"),
+    ("BLR", "COK", "kochi"),
+    ("MAA", "DEL", "delhi"),
+]
+DEPART, RETURN = "2026-12-10", "2026-12-14"
+
+
+def trip(route):
+    origin, dest, city = route
+    start = time.perf_counter()
+    get_weather(city)
+    search_flights_serpapi(origin, dest, DEPART, RETURN, passengers=2)
+    search_hotels_serpapi(city, DEPART, RETURN, adults=2)
+    search_tripadvisor(city, "things to do", max_results=10)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    routes = [rng.choice(ROUTES) for _ in range(args.requests)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        latencies = sorted(pool.map(trip, routes))
+    elapsed = time.perf_counter() - start
+
+    counters = metrics.snapshot()["counters"]
+    print(f"mode={RECORD_MODE} corpus={FIXTURES_PATH}")
+    print(f"{args.requests} trips in {elapsed:.2f}s -> {args.requests / elapsed:.1f} trips/s")
+    print(
+        f"p50={latencies[len(latencies) // 2] * 1000:.0f}ms "
+        f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f}ms"
+    )
+    print(
+        "replay hits={} misses={} injected_errors={}".format(
+            counters.get("provider_replay.hits", 0),
+            counters.get("provider_replay.misses", 0),
+            counters.get("provider_replay.injected_errors", 0),
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
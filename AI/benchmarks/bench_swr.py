@@ -0,0 +1,115 @@
+# bench_swr.py — replay a /trip traffic trace against provider caches with and
+# without stale-while-revalidate and compare request latency percentiles.
+#
+# Run from the AI/ folder:
+#   python benchmarks/bench_swr.py                      # synthetic, seeded trace
+#   python benchmarks/bench_swr.py --trace trace.jsonl  # {"t": seconds, "route": "DEL-GOI"} per line
+#   python benchmarks/bench_swr.py --save-trace trace.jsonl
+#
+# Time is scaled down (TTLs in seconds, provider latency in tens of ms) so a
+# run takes a few seconds; the relative effect is what matters.
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache_utils import TTLCache  # noqa: E402
+
+
+def synthetic_trace(n: int, duration: float, routes: int, seed: int = 42):
+    """Poisson arrivals over Zipf-popular routes."""
+    rng = random.Random(seed)
+    weights = [1.0 / (i + 1) for i in range(routes)]
+    names = [f"R{i:03d}" for i in range(routes)]
+    t = 0.0
+    rate = n / duration
+    trace = []
+    for _ in range(n):
+        t += rng.expovariate(rate)
+        trace.append({"t": round(t, 4), "route": rng.choices(names, weights)[0]})
+    return trace
+
+
+def load_trace(path: str):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def replay(trace, cache: TTLCache, provider_latency: float, workers: int = 64):
+    latencies = []
+    lock = threading.Lock()
+    provider_calls = [0]
+
+    def fetch(route):
+        with lock:
+            provider_calls[0] += 1
+        time.sleep(provider_latency)
+        return {"route": route, "price": 4200}
+
+    def handle(event):
+        start = time.perf_counter()
+        cache.get_or_compute((event["route"],), lambda: fetch(event["route"]))
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for event in trace:
+            delay = event["t"] - (time.perf_counter() - t0)
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(handle, event)
+
+    latencies.sort()
+    n = len(latencies)
+    return {
+        "p50_ms": latencies[int(0.50 * (n - 1))] * 1000,
+        "p95_ms": latencies[int(0.95 * (n - 1))] * 1000,
+        "p99_ms": latencies[int(0.99 * (n - 1))] * 1000,
+        "provider_calls": provider_calls[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trace")
+    parser.add_argument("--save-trace")
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--duration", type=float, default=6.0)
+    parser.add_argument("--routes", type=int, default=40)
+    parser.add_argument("--soft-ttl", type=float, default=0.5)
+    parser.add_argument("--hard-ttl", type=float, default=5.0)
+    parser.add_argument("--latency", type=float, default=0.08)
+    args = parser.parse_args()
+
+    trace = load_trace(args.trace) if args.trace else synthetic_trace(
+        args.requests, args.duration, args.routes
+    )
+    if args.save_trace:
+        with open(args.save_trace, "w", encoding="utf-8") as f:
+            for event in trace:
+                f.write(json.dumps(event) + "\n")
+
+    baseline = replay(trace, TTLCache(ttl_seconds=args.soft_ttl), args.latency)
+    swr = replay(
+        trace,
+        TTLCache(ttl_seconds=args.soft_ttl, hard_ttl_seconds=args.hard_ttl),
+        args.latency,
+    )
+
+    print(f"trace: {len(trace)} requests, {args.routes} routes, provider latency {args.latency * 1000:.0f} ms")
+    print(f"{'mode':24} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'provider calls':>15}")
+    for name, r in (("hard TTL only", baseline), ("stale-while-revalidate", swr)):
+        print(f"{name:24} {r['p50_ms']:8.1f} {r['p95_ms']:8.1f} {r['p99_ms']:8.1f} {r['provider_calls']:15}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+# cache_store.py — shared (cross-worker, persistent) cache tier
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Callable, Optional, Tuple
+
+from cache_utils import TTLCache, _NegativeEntry
+
+# Payloads at least this large are zlib-compressed before hitting the store.
+COMPRESS_MIN_BYTES = 256
+
+
+# -------------------------------------------------
+# SERIALIZATION
+# -------------------------------------------------
+def encode(value: Any) -> bytes:
+    """Compact JSON, zlib-compressed when large. First byte tags the format."""
+    raw = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    if len(raw) >= COMPRESS_MIN_BYTES:
+        return b"z" + zlib.compress(raw, 6)
+    return b"j" + raw
+
+
+def decode(data: bytes) -> Any:
+    tag, body = data[:1], data[1:]
+    if tag == b"z":
+        body = zlib.decompress(body)
+    return json.loads(body.decode("utf-8"))
+
+
+def make_store_key(namespace: str, parts: Tuple[Any, ...]) -> str:
+    return namespace + ":" + json.dumps(parts, separators=(",", ":"), default=str)
+
+
+# -------------------------------------------------
+# STORES
+# -------------------------------------------------
+class SQLiteStore:
+    """
+    SQLite (WAL mode) key/value store with per-row expiry, safe to share
+    between processes on one machine.
+
+    get() returns (payload, remaining_ttl_seconds) or None.
+    """
+
+    def __init__(self, path: str, purge_every: int = 256):
+        self.path = path
+        self.purge_every = purge_every
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        remaining = row[1] - time.time()
+        if remaining <= 0:
+            return None
+        return bytes(row[0]), remaining
+
+    def set(self, key: str, data: bytes, ttl: float) -> None:
+        self._conn().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, sqlite3.Binary(data), time.time() + ttl),
+        )
+        with self._lock:
+            self._writes += 1
+            purge = self._writes % self.purge_every == 0
+        if purge:
+            self.purge_expired()
+
+    def delete(self, key: str) -> None:
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def purge_expired(self) -> int:
+        cur = self._conn().execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        return cur.rowcount
+
+
+class RedisStore:
+    """
+    Redis-backed store. Any client exposing get/set(px=)/pttl/delete works,
+    so tests can pass an in-memory fake instead of a server.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisStore":
+        import redis  # optional dependency
+
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        data = self.client.get(key)
+        if data is None:
+            return None
+        pttl = self.client.pttl(key)
+        remaining = pttl / 1000.0 if pttl and pttl > 0 else 0
+        if remaining <= 0:
+            return None
+        return data, remaining
+
+    def set(self, key: str, data: bytes, ttl: float) -> None:
+        self.client.set(key, data, px=max(1, int(ttl * 1000)))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(key)
+
+
+def open_store(url: Optional[str] = None):
+    """
+    Build a store from a URL (default: TRAVELAI_CACHE_URL env var).
+
+        sqlite:///var/cache/travelai.db
+        redis://localhost:6379/0
+
+    Returns None when no shared tier is configured.
+    """
+    url = url or os.getenv("TRAVELAI_CACHE_URL")
+    if not url:
+        return None
+    if url.startswith("sqlite:///"):
+        return SQLiteStore(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisStore.from_url(url)
+    raise ValueError(f"Unsupported cache URL: {url}")
+
+
+# -------------------------------------------------
+# TWO-TIER CACHE
+# -------------------------------------------------
+class TieredCache(TTLCache):
+    """
+    In-process LRU (TTLCache) in front of a shared store.
+
+    Reads try the local tier first, then the shared tier; shared hits are
+    copied into the local tier with their remaining soft and hard TTL, so
+    stale-while-revalidate behaves the same across workers. A soft-expired
+    local entry is replaced only by a fresher shared one. Writes go to both
+    tiers, so warm entries survive restarts and are visible to every worker.
+    Negative entries and values `is_error` flags stay local; unreadable
+    shared rows are deleted.
+
+    Usage:
+        cache = TieredCache(SQLiteStore("cache/travelai.db"), "provider:hotels", ttl_seconds=1800)
+        cache.get_or_compute(("goa", "2025-12-10"), fetch_hotels)
+    """
+
+    def __init__(self, store, namespace: str, is_error: Optional[Callable[[Any], bool]] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+        self.namespace = namespace
+        self.is_error = is_error
+        self._shared_hits = 0
+        self._shared_errors = 0
+
+    def _shared_error(self) -> None:
+        with self._lock:
+            self._shared_errors += 1
+
+    def _fill_from_shared(self, key: Tuple[Any, ...]) -> None:
+        """Copy a shared entry into the local tier, keeping its soft/hard expiry."""
+        local_stale_at = None
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                if entry[3] > time.monotonic():
+                    return  # fresh locally
+                local_stale_at = entry[3]
+
+        store_key = make_store_key(self.namespace, key)
+        try:
+            found = self.store.get(store_key)
+        except Exception:
+            self._shared_error()
+            return
+        if found is None:
+            return
+
+        data, hard_remaining = found
+        try:
+            stale_at_wall, value = decode(data)
+        except Exception:
+            # Corrupt or foreign row: drop it so the next write replaces it.
+            self._shared_error()
+            try:
+                self.store.delete(store_key)
+            except Exception:
+                pass
+            return
+        soft_left = stale_at_wall - time.time()
+        if local_stale_at is not None and time.monotonic() + soft_left <= local_stale_at:
+            return  # no fresher than the stale local copy; let it revalidate
+        with self._lock:
+            self._shared_hits += 1
+        # TTLCache.set: local tier only
+        super().set(value, *key, ttl=max(0.0, min(soft_left, hard_remaining)), hard_ttl=hard_remaining)
+
+    def get(self, *parts: Any) -> Any:
+        self._fill_from_shared(self._make_key(*parts))
+        return super().get(*parts)
+
+    def set(
+        self,
+        value: Any,
+        *parts: Any,
+        ttl: Optional[float] = None,
+        hard_ttl: Optional[float] = None,
+    ) -> None:
+        super().set(value, *parts, ttl=ttl, hard_ttl=hard_ttl)
+        if isinstance(value, _NegativeEntry) or (self.is_error is not None and self.is_error(value)):
+            return
+
+        soft = self.ttl if ttl is None else ttl
+        hard = soft + (self.hard_ttl - self.ttl) if hard_ttl is None else max(hard_ttl, soft)
+        try:
+            self.store.set(
+                make_store_key(self.namespace, self._make_key(*parts)),
+                encode([time.time() + soft, value]),
+                hard,
+            )
+        except Exception:
+            self._shared_error()
+
+    def get_or_compute(self, key: Any, fn, **kwargs) -> Any:
+        key = key if isinstance(key, tuple) else (key,)
+        self._fill_from_shared(key)
+        return super().get_or_compute(key, fn, **kwargs)
+
+    async def aget_or_compute(self, key: Any, fn, **kwargs) -> Any:
+        key = key if isinstance(key, tuple) else (key,)
+        self._fill_from_shared(key)
+        return await super().aget_or_compute(key, fn, **kwargs)
+
+    def stats(self):
+        stats = super().stats()
+        with self._lock:
+            stats["shared_hits"] = self._shared_hits
+            stats["shared_errors"] = self._shared_errors
+        return stats
@@ -1,39 +1,443 @@
 # cache_utils.py
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import sys
+import threading
 import time
-from typing import Any, Dict, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+_MISSING = object()
+
+_refresh_executor: Optional[ThreadPoolExecutor] = None
+
+# True while a stale-while-revalidate refresh is running, so loaders (e.g. the
+# SerpAPI scheduler) can treat the work as background.
+background_refresh: contextvars.ContextVar = contextvars.ContextVar("background_refresh", default=False)
+_refresh_executor_lock = threading.Lock()
+
+
+def _get_refresh_executor() -> ThreadPoolExecutor:
+    """Shared pool for stale-while-revalidate refreshes (created on first use)."""
+    global _refresh_executor
+    with _refresh_executor_lock:
+        if _refresh_executor is None:
+            _refresh_executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv("CACHE_REFRESH_WORKERS", "4")),
+                thread_name_prefix="cache-refresh",
+            )
+        return _refresh_executor
+
+
+class _NegativeEntry:
+    """Cached marker for a failed computation (negative caching)."""
+
+    __slots__ = ("error",)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class _Flight:
+    """One in-progress computation that sync and async callers can wait on."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def add_async_waiter(self) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._async_waiters.append((loop, future))
+        return future
+
+    def finish(self, value: Any, error: Optional[BaseException]) -> None:
+        self.value = value
+        self.error = error
+        self.event.set()
+        for loop, future in self._async_waiters:
+            loop.call_soon_threadsafe(_resolve_future, future, value, error)
+
+    def result(self) -> Any:
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+def _resolve_future(future: asyncio.Future, value: Any, error: Optional[BaseException]) -> None:
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(value)
 
 
 class TTLCache:
     """
-    Very simple in-memory cache with TTL (seconds).
+    Thread-safe in-memory cache with TTL (seconds) and LRU eviction.
+
+    The cache is bounded by entry count and, optionally, by an approximate
+    byte size of the stored values. Expired entries are dropped when read and
+    by an amortised sweep that runs every `sweep_every` writes, so keys that
+    are never read again do not accumulate.
 
     Usage:
-        cache = TTLCache(ttl_seconds=600)
+        cache = TTLCache(ttl_seconds=600, max_entries=1000)
         cache.set(value, "key-part-1", "key-part-2")
         result = cache.get("key-part-1", "key-part-2")
+        cache.stats()  # hits, misses, evictions, size, ...
+
+    get_or_compute() / aget_or_compute() add single-flight loading: when many
+    callers miss the same key at once, exactly one runs `fn` and the others
+    wait for its result. Failures are re-raised to every waiter and are only
+    cached when `negative_ttl` is given.
+
+        weather = cache.get_or_compute(("goa",), lambda: get_weather("goa"))
+        hotels = await cache.aget_or_compute(("goa", day), fetch_hotels_async)
+
+    Stale-while-revalidate: with `hard_ttl_seconds` > `ttl_seconds`, an entry
+    older than the soft TTL but younger than the hard TTL is still returned by
+    get_or_compute() immediately, and one background refresh per key is
+    scheduled. Only after the hard TTL do callers block on a fresh value.
+    Plain get() treats soft-expired entries as misses.
     """
 
-    def __init__(self, ttl_seconds: int = 600):
+    def __init__(
+        self,
+        ttl_seconds: int = 600,
+        max_entries: int = 1024,
+        max_bytes: Optional[int] = None,
+        sweep_every: int = 64,
+        hard_ttl_seconds: Optional[int] = None,
+    ):
         self.ttl = ttl_seconds
-        self._data: Dict[Tuple[Any, ...], Tuple[float, Any]] = {}
+        self.hard_ttl = max(hard_ttl_seconds or ttl_seconds, ttl_seconds)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_every = sweep_every
+
+        self._lock = threading.RLock()
+        # key -> (expires_at, size_bytes, value, stale_at); ordered oldest -> most recently used
+        self._data: "OrderedDict[Tuple[Any, ...], Tuple[float, int, Any, float]]" = OrderedDict()
+        # min-heap of (expires_at, seq, key); may hold stale items for
+        # overwritten keys. seq breaks expiry ties so keys are never compared
+        # (mixed key types such as None and str are not orderable).
+        self._expiry: List[Tuple[float, int, Tuple[Any, ...]]] = []
+        self._seq = itertools.count()
+        self._bytes = 0
+        self._writes = 0
+        self._inflight: Dict[Tuple[Any, ...], _Flight] = {}
+        self._refresh_tasks: set = set()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._coalesced = 0
+        self._stale_hits = 0
+        self._refreshes = 0
 
     def _make_key(self, *parts: Any) -> Tuple[Any, ...]:
         return tuple(parts)
 
+    # ------------------------ Public API ------------------------
     def get(self, *parts: Any) -> Any:
         key = self._make_key(*parts)
-        entry = self._data.get(key)
-        if not entry:
-            return None
-        expires_at, value = entry
-        now = time.time()
-        if now > expires_at:
-            # expired: delete and miss
-            self._data.pop(key, None)
+        with self._lock:
+            value, stale = self._lookup(key)
+            if stale:
+                self._misses += 1
+        if value is _MISSING or stale or isinstance(value, _NegativeEntry):
             return None
         return value
 
-    def set(self, value: Any, *parts: Any) -> None:
+    def set(
+        self,
+        value: Any,
+        *parts: Any,
+        ttl: Optional[float] = None,
+        hard_ttl: Optional[float] = None,
+    ) -> None:
+        """
+        ttl      : soft TTL (defaults to the cache TTL)
+        hard_ttl : hard TTL; defaults to `ttl` plus the cache's stale window
+        """
         key = self._make_key(*parts)
-        expires_at = time.time() + self.ttl
-        self._data[key] = (expires_at, value)
+        soft = self.ttl if ttl is None else ttl
+        hard = soft + (self.hard_ttl - self.ttl) if hard_ttl is None else max(hard_ttl, soft)
+        now = time.monotonic()
+        stale_at = now + soft
+        expires_at = now + hard
+        size = _approx_size(value) if self.max_bytes else 0
+
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (expires_at, size, value, stale_at)
+            self._bytes += size
+            heapq.heappush(self._expiry, (expires_at, next(self._seq), key))
+
+            self._writes += 1
+            if self._writes % self.sweep_every == 0:
+                self._sweep()
+            self._enforce_bounds()
+
+    def get_or_compute(
+        self,
+        key: Any,
+        fn: Callable[[], Any],
+        ttl: Optional[float] = None,
+        negative_ttl: Optional[float] = None,
+        is_error: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """
+        Return the cached value for `key`, or compute it with `fn()` exactly once
+        across concurrent callers.
+
+        key          : tuple of key parts (a non-tuple is treated as one part)
+        ttl          : TTL for successful results (defaults to the cache TTL)
+        negative_ttl : if set, exceptions and results for which `is_error`
+                       returns True are cached for this many seconds
+        """
+        key = key if isinstance(key, tuple) else (key,)
+        status, found = self._join_flight(key)
+        if status == "hit":
+            return found
+        if status == "stale":
+            value, flight = found
+            if flight is not None:
+                _get_refresh_executor().submit(
+                    self._refresh, key, flight, fn, ttl, is_error
+                )
+            return value
+        if status == "wait":
+            found.event.wait()
+            return found.result()
+
+        flight = found
+
+        value, error = None, None
+        try:
+            value = fn()
+        except BaseException as e:
+            error = e
+        self._complete_flight(key, flight, value, error, ttl, negative_ttl, is_error)
+        return flight.result()
+
+    async def aget_or_compute(
+        self,
+        key: Any,
+        fn: Callable[[], Awaitable[Any]],
+        ttl: Optional[float] = None,
+        negative_ttl: Optional[float] = None,
+        is_error: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """Async variant of get_or_compute(); `fn` returns an awaitable."""
+        key = key if isinstance(key, tuple) else (key,)
+        status, found = self._join_flight(key, async_waiter=True)
+        if status == "hit":
+            return found
+        if status == "stale":
+            value, flight = found
+            if flight is not None:
+                task = asyncio.get_running_loop().create_task(
+                    self._arefresh(key, flight, fn, ttl, is_error)
+                )
+                self._refresh_tasks.add(task)
+                task.add_done_callback(self._refresh_tasks.discard)
+            return value
+        if status == "wait":
+            return await found
+
+        flight = found
+
+        value, error = None, None
+        try:
+            value = await fn()
+        except BaseException as e:
+            error = e
+        self._complete_flight(key, flight, value, error, ttl, negative_ttl, is_error)
+        return flight.result()
+
+    def delete(self, *parts: Any) -> None:
+        key = self._make_key(*parts)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._expiry.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "coalesced": self._coalesced,
+                "stale_hits": self._stale_hits,
+                "refreshes": self._refreshes,
+                "inflight": len(self._inflight),
+                "size": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
+
+    # ------------------------ Single-flight ------------------------
+    def _join_flight(self, key: Tuple[Any, ...], async_waiter: bool = False) -> Tuple[str, Any]:
+        """
+        Returns ("hit", value), ("lead", flight) when the caller must compute,
+        ("wait", flight) / ("wait", future) when another caller already is, or
+        ("stale", (value, refresh_flight)) for a soft-expired entry, where
+        refresh_flight is None if a refresh is already running.
+        """
+        with self._lock:
+            value, stale = self._lookup(key)
+            if isinstance(value, _NegativeEntry):
+                raise value.error
+            if value is not _MISSING and not stale:
+                return "hit", value
+
+            flight = self._inflight.get(key)
+            if value is not _MISSING:
+                self._stale_hits += 1
+                if flight is not None:
+                    return "stale", (value, None)
+                flight = self._inflight[key] = _Flight()
+                self._refreshes += 1
+                return "stale", (value, flight)
+
+            if flight is None:
+                flight = self._inflight[key] = _Flight()
+                return "lead", flight
+
+            self._coalesced += 1
+            if async_waiter:
+                return "wait", flight.add_async_waiter()
+            return "wait", flight
+
+    def _complete_flight(self, key, flight, value, error, ttl, negative_ttl, is_error) -> None:
+        try:
+            if error is not None:
+                if negative_ttl and isinstance(error, Exception):
+                    self.set(_NegativeEntry(error), *key, ttl=negative_ttl, hard_ttl=negative_ttl)
+            elif is_error is not None and is_error(value):
+                if negative_ttl:
+                    self.set(value, *key, ttl=negative_ttl, hard_ttl=negative_ttl)
+            elif value is not None:
+                self.set(value, *key, ttl=ttl)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.finish(value, error)
+
+    # ------------------------ Stale-while-revalidate ------------------------
+    def _refresh(self, key, flight, fn, ttl, is_error) -> None:
+        value, error = None, None
+        token = background_refresh.set(True)
+        try:
+            value = fn()
+        except BaseException as e:
+            error = e
+        finally:
+            background_refresh.reset(token)
+        self._complete_refresh(key, flight, value, error, ttl, is_error)
+
+    async def _arefresh(self, key, flight, fn, ttl, is_error) -> None:
+        value, error = None, None
+        background_refresh.set(True)  # the task runs in its own context copy
+        try:
+            value = await fn()
+        except BaseException as e:
+            error = e
+        self._complete_refresh(key, flight, value, error, ttl, is_error)
+
+    def _complete_refresh(self, key, flight, value, error, ttl, is_error) -> None:
+        """A failed refresh keeps serving the stale value until its hard TTL."""
+        try:
+            failed = error is not None or value is None or (is_error is not None and is_error(value))
+            if not failed:
+                self.set(value, *key, ttl=ttl)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.finish(value, error)
+
+    # ------------------------ Internals (lock held) ------------------------
+    def _lookup(self, key: Tuple[Any, ...]) -> Tuple[Any, bool]:
+        """Returns (value, is_stale); value is _MISSING on a miss."""
+        entry = self._data.get(key)
+        if entry is None:
+            self._misses += 1
+            return _MISSING, False
+        expires_at, _, value, stale_at = entry
+        now = time.monotonic()
+        if now > expires_at:
+            # expired: delete and miss
+            self._remove(key)
+            self._expirations += 1
+            self._misses += 1
+            return _MISSING, False
+        self._data.move_to_end(key)
+        if now > stale_at:
+            return value, True
+        self._hits += 1
+        return value, False
+
+    def _remove(self, key: Tuple[Any, ...]) -> None:
+        entry = self._data.pop(key)
+        self._bytes -= entry[1]
+
+    def _sweep(self) -> None:
+        """Drop every expired entry at the head of the expiry heap."""
+        now = time.monotonic()
+        heap = self._expiry
+        while heap and heap[0][0] <= now:
+            expires_at, _, key = heapq.heappop(heap)
+            entry = self._data.get(key)
+            # Skip stale heap items left behind by overwrites.
+            if entry is not None and entry[0] == expires_at:
+                self._remove(key)
+                self._expirations += 1
+
+        # Rebuild the heap if overwrites left it mostly stale.
+        if len(heap) > 2 * len(self._data) + 64:
+            self._expiry = [(entry[0], next(self._seq), key) for key, entry in self._data.items()]
+            heapq.heapify(self._expiry)
+
+    def _enforce_bounds(self) -> None:
+        while len(self._data) > self.max_entries or (
+            self.max_bytes is not None and self._bytes > self.max_bytes and len(self._data) > 1
+        ):
+            key = next(iter(self._data))
+            self._remove(key)
+            self._evictions += 1
+
+
+def _approx_size(value: Any, _depth: int = 0) -> int:
+    """Rough deep size of JSON-like values (dict/list/tuple/str/numbers)."""
+    size = sys.getsizeof(value)
+    if _depth > 6:
+        return size
+    if isinstance(value, dict):
+        for k, v in value.items():
+            size += _approx_size(k, _depth + 1) + _approx_size(v, _depth + 1)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += _approx_size(item, _depth + 1)
+    return size
@@ -1,7 +1,38 @@
 # main.py — CLI interface for TravelAI
+#
+#   python cli_app.py                                    interactive planner
+#   python cli_app.py --batch trips.jsonl [--out results.jsonl] [--concurrency 4]
 
+import argparse
+import json
+import sys
 from datetime import datetime
 from agent_core import TravelAI
+from batch_runner import BATCH_CONCURRENCY, run_batch
+from itinerary_sections import Itinerary
+
+
+def batch_main(path: str, out_path: str, concurrency: int):
+    """Plan every JSONL trip request in `path` ('-' = stdin), writing JSONL results as they finish."""
+    agent = TravelAI()
+    source = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    sink = sys.stdout if out_path == "-" else open(out_path, "w", encoding="utf-8")
+    try:
+        for result in run_batch(
+            agent.plan_full_trip,
+            source,
+            concurrency=concurrency,
+            provider_stats=agent.providers.stats,
+        ):
+            sink.write(json.dumps(result, ensure_ascii=False) + "\n")
+            sink.flush()
+            if result.get("type") == "summary":
+                print(f"Batch done: {result}", file=sys.stderr)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
 
 
 def main():
@@ -50,7 +81,7 @@ def main():
 
     try:
         # ---------------- INITIAL ITINERARY ----------------
-        itinerary = agent.plan_full_trip(
+        result = agent.plan_trip(
             origin_city=origin_city,
             destination_city=destination_city,
             depart_date=depart,
@@ -61,10 +92,16 @@ def main():
             days=days,
             max_budget=max_budget,
         )
+        itinerary = result.get("message") or result.get("itinerary", "")
+        # Flight/hotel picks and budget math, re-rendered by refinements.
+        plan = result.get("plan")
 
         print("\n=== INITIAL ITINERARY ===\n")
         print(itinerary)
 
+        # Parsed once; each refinement only regenerates the touched sections.
+        sections = Itinerary.from_text(itinerary)
+
         # ---------------- REFINEMENT LOOP ----------------
         while True:
             print("\nYou can now tweak your plan.")
@@ -83,14 +120,10 @@ def main():
 
             print("\nUpdating your itinerary based on your request...\n")
 
-            # ✅ CORRECT METHOD NAME
-            itinerary = agent.refine_itinerary(
-                existing_itinerary=itinerary,
-                user_request=user_change,
-            )
+            sections, touched, plan = agent.refine_sections(sections, user_change, plan)
 
-            print("\n=== UPDATED ITINERARY ===\n")
-            print(itinerary)
+            print(f"\n=== UPDATED ITINERARY (changed: {', '.join(touched)}) ===\n")
+            print(sections.to_text())
 
     except Exception as e:
         print("\n[ERROR] Failed to generate or refine trip:")
@@ -98,4 +131,13 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="TravelAI trip planner")
+    parser.add_argument("--batch", metavar="JSONL", help="plan every trip request in this JSONL file ('-' = stdin)")
+    parser.add_argument("--out", default="-", help="where to write JSONL results (default stdout)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    args = parser.parse_args()
+
+    if args.batch:
+        batch_main(args.batch, args.out, args.concurrency)
+    else:
+        main()
@@ -0,0 +1,265 @@
+# itinerary_sections.py — addressable itinerary sections and section-level refinement
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from metrics import metrics
+from prompt_compactor import count_tokens
+
+HEADING_RE = re.compile(r"^\s*(#{1,6})\s+(.+?)\s*#*\s*$")
+DAY_RE = re.compile(r"\bday\s*(\d+)\b", re.IGNORECASE)
+
+ORDINALS = {
+    "first": 1, "second": 2, "third": 3, "fourth": 4, "fifth": 5,
+    "sixth": 6, "seventh": 7, "eighth": 8, "ninth": 9, "tenth": 10,
+}
+
+# Request wording -> section key it touches.
+REQUEST_RULES = [
+    ("flights", re.compile(r"\b(flights?|fly|flying|airlines?|airport|layover|non-?stop)\b", re.I)),
+    ("hotels", re.compile(r"\b(hotels?|hostels?|stay|rooms?|resorts?|accommodation|check-?in)\b", re.I)),
+    ("budget", re.compile(r"\b(budget|cheap|cheaper|costs?|expensive|prices?|afford|spend|money)\b", re.I)),
+    ("transport", re.compile(r"\b(transport|taxi|cabs?|scooters?|bikes?|metro|bus|train|drive|driving|commute|uber|ola|travel time)\b", re.I)),
+]
+
+WHOLE = "itinerary"
+
+# Sections rendered from provider data (trip_planning). With a re-render
+# hook they are rebuilt deterministically instead of by the LLM, and the
+# budget follows any change to flights or hotels.
+PLANNED_SECTIONS = ("flights", "hotels", "budget")
+
+
+def section_key(heading: str) -> Optional[str]:
+    """Stable key for a known heading ('Day 2: Old Goa' -> 'day-2'), else None."""
+    text = heading.lower()
+    day = DAY_RE.search(text)
+    if day:
+        return f"day-{int(day.group(1))}"
+    if "flight" in text:
+        return "flights"
+    if any(w in text for w in ("hotel", "stay", "accommodation")):
+        return "hotels"
+    if "budget" in text or "cost" in text:
+        return "budget"
+    if "transport" in text or "getting around" in text:
+        return "transport"
+    return None
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or "section"
+
+
+@dataclass
+class Section:
+    key: str
+    heading: str      # full heading line, e.g. "## Day 1: Beaches"
+    body: str
+
+    def to_text(self) -> str:
+        return f"{self.heading}\n{self.body}".rstrip() if self.heading else self.body.rstrip()
+
+
+@dataclass
+class Itinerary:
+    """
+    An itinerary as ordered, addressable sections.
+
+    Sections start at markdown headings that map to a known key (flights,
+    hotels, day-N, budget, transport) or at level-1/2 headings; deeper
+    headings such as "### Morning" stay inside their section. Text before
+    the first heading is kept as "intro". Text without any heading is one
+    "itinerary" section.
+    """
+
+    sections: List[Section] = field(default_factory=list)
+
+    @classmethod
+    def from_text(cls, text: str) -> "Itinerary":
+        sections: List[Section] = []
+        heading, key, body = "", "intro", []
+        used = set()
+
+        def flush():
+            content = "\n".join(body).strip("\n")
+            if heading or content.strip():
+                unique = key
+                n = 2
+                while unique in used:
+                    unique, n = f"{key}-{n}", n + 1
+                used.add(unique)
+                sections.append(Section(unique, heading, content))
+
+        for line in (text or "").splitlines():
+            match = HEADING_RE.match(line)
+            if match:
+                known = section_key(match.group(2))
+                if known or len(match.group(1)) <= 2:
+                    flush()
+                    heading, key, body = line.strip(), known or _slug(match.group(2)), []
+                    continue
+            body.append(line)
+        flush()
+
+        if len(sections) == 1 and sections[0].key == "intro":
+            sections[0].key = WHOLE
+        return cls(sections)
+
+    def to_text(self) -> str:
+        return "\n\n".join(s.to_text() for s in self.sections)
+
+    def keys(self) -> List[str]:
+        return [s.key for s in self.sections]
+
+    def get(self, key: str) -> Optional[Section]:
+        return next((s for s in self.sections if s.key == key), None)
+
+    def replace(self, key: str, body: str) -> "Itinerary":
+        """Copy with one section body replaced."""
+        return Itinerary([
+            Section(s.key, s.heading, body) if s.key == key else s for s in self.sections
+        ])
+
+    def day_keys(self) -> List[str]:
+        return [k for k in self.keys() if k.startswith("day-")]
+
+
+def classify_request(request: str, itinerary: Itinerary) -> List[str]:
+    """
+    Section keys a refinement request touches, in itinerary order.
+
+    Explicit days ("day 2", "second day", "last day") select those days;
+    flight/hotel/budget/transport wording selects those sections; anything
+    else (e.g. "more nightlife") applies to every day.
+    """
+    keys = set(itinerary.keys())
+    if WHOLE in keys:
+        return [WHOLE]
+
+    touched = set()
+    days = itinerary.day_keys()
+    text = request.lower()
+
+    for match in DAY_RE.finditer(text):
+        touched.add(f"day-{int(match.group(1))}")
+    for word, n in ORDINALS.items():
+        if re.search(rf"\b{word}\s+day\b", text):
+            touched.add(f"day-{n}")
+    if days and re.search(r"\b(last|final)\s+day\b", text):
+        touched.add(days[-1])
+
+    for key, pattern in REQUEST_RULES:
+        if pattern.search(text):
+            touched.add(key)
+
+    touched &= keys
+    if not touched or not (touched - {"budget"}):
+        # Nothing specific (or only "cheaper"): the request shapes the days.
+        touched |= set(days)
+    return [k for k in itinerary.keys() if k in touched] or [WHOLE]
+
+
+def _section_prompt(itinerary: Itinerary, section: Section, request: str) -> str:
+    outline = "\n".join(s.heading for s in itinerary.sections if s.heading)
+    return f"""
+You are an expert India travel planner editing ONE section of an existing itinerary.
+
+ITINERARY OUTLINE:
+{outline}
+
+SECTION TO EDIT:
+{section.to_text()}
+
+USER REQUEST:
+{request}
+
+INSTRUCTIONS:
+- Change only what the request needs in this section; keep everything else as is
+- Keep the same markdown style and level of detail
+- Return ONLY the updated section body, without its heading line
+"""
+
+
+def _full_prompt(text: str, request: str) -> str:
+    return f"""
+You are an expert India travel planner.
+
+CURRENT ITINERARY:
+{text}
+
+USER REQUEST:
+{request}
+
+INSTRUCTIONS:
+- Modify ONLY what the user asked for
+- Keep all other days unchanged
+- Be realistic and practical
+- Return the FULL updated itinerary
+
+UPDATED ITINERARY:
+"""
+
+
+def _strip_heading(reply: str, section: Section) -> str:
+    lines = reply.strip().splitlines()
+    if lines and HEADING_RE.match(lines[0]) and section_key(lines[0]) == section_key(section.heading):
+        lines = lines[1:]
+    return "\n".join(lines).strip("\n")
+
+
+def refine_sections(
+    itinerary: Itinerary,
+    request: str,
+    llm: Callable[[str, int], str],
+    max_workers: int = 4,
+    rerender: Optional[Callable[[str, List[str]], Dict[str, str]]] = None,
+) -> Tuple[Itinerary, List[str]]:
+    """
+    Regenerate only the sections `request` touches and splice them back.
+    `llm(prompt, max_tokens)` returns the model's text. With `rerender`,
+    touched PLANNED_SECTIONS are not sent to the LLM: `rerender(request,
+    keys)` returns their new markdown by key (e.g. from trip_planning).
+    Returns (updated itinerary, touched keys).
+    """
+    keys = classify_request(request, itinerary)
+
+    if keys == [WHOLE]:
+        text = itinerary.to_text()
+        reply = llm(_full_prompt(text, request), 2048)
+        metrics.incr("refine.full_rewrites")
+        return Itinerary.from_text(reply), keys
+
+    planned: List[str] = []
+    if rerender is not None:
+        touched = set(keys)
+        if touched & {"flights", "hotels"} and itinerary.get("budget"):
+            touched.add("budget")
+        keys = [k for k in itinerary.keys() if k in touched]
+        planned = [k for k in keys if k in PLANNED_SECTIONS]
+    rendered = rerender(request, planned) if planned else {}
+
+    sections = [itinerary.get(k) for k in keys if k not in planned]
+
+    def regenerate(section: Section) -> str:
+        budget = min(1024, 2 * count_tokens(section.body) + 200)
+        return _strip_heading(llm(_section_prompt(itinerary, section, request), budget), section)
+
+    bodies = []
+    if sections:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sections)))) as pool:
+            bodies = list(pool.map(regenerate, sections))
+
+    updated = itinerary
+    for section, body in zip(sections, bodies):
+        if body.strip():
+            updated = updated.replace(section.key, body)
+    for key in planned:
+        if rendered.get(key):
+            updated = updated.replace(key, _strip_heading(rendered[key], itinerary.get(key)))
+
+    metrics.incr("refine.sections_regenerated", len(sections))
+    metrics.incr("refine.sections_rerendered", len(planned))
+    metrics.observe("refine.sections_per_request", len(sections))
+    return updated, keys
@@ -1,4 +1,5 @@
 import os
+import threading
 from groq import Groq
 from dotenv import load_dotenv
 from typing import Optional
@@ -7,12 +8,22 @@ from typing import Optional
 # Load environment variables
 load_dotenv()
 
+# One client (and one httpx connection pool) per process, so repeated calls
+# reuse warm connections to Groq. Rebuilt only if the key changes.
+_client: Optional[Groq] = None
+_client_key: Optional[str] = None
+_client_lock = threading.Lock()
+
 
 def get_groq_client():
+    global _client, _client_key
     api_key = os.getenv("GROQ_API_KEY")
     if not api_key:
         raise ValueError("GROQ_API_KEY not found in environment variables")
-    return Groq(api_key=api_key)
+    with _client_lock:
+        if _client is None or _client_key != api_key:
+            _client, _client_key = Groq(api_key=api_key), api_key
+        return _client
 
 
 def call_groq(prompt, system_prompt=None, model=None):
@@ -49,7 +60,7 @@ def call_groq(prompt, system_prompt=None, model=None):
 
 
 # ---------------- STREAMING ----------------
-def call_groq_stream(prompt: str, model: Optional[str] = None):
+def call_groq_stream(prompt: str, model: Optional[str] = None, max_tokens: int = 2048):
     """
     Generator that yields text chunks as the LLM streams output.
     """
@@ -61,7 +72,7 @@ def call_groq_stream(prompt: str, model: Optional[str] = None):
             model=model,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.4,
-            max_tokens=2048,
+            max_tokens=max_tokens,
             stream=True,
             timeout=30,
         )
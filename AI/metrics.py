@@ -0,0 +1,88 @@
+# metrics.py — lightweight in-process metrics for the AI service
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict
+
+
+class Metrics:
+    """
+    Counters, gauges and timing summaries kept in process memory.
+
+    Usage:
+        from metrics import metrics
+        metrics.incr("provider_cache.weather.hits")
+        metrics.observe("trip.ttfb_seconds", 0.42)
+        metrics.register("provider_cache", cache.stats)   # evaluated lazily
+        metrics.snapshot()
+    """
+
+    def __init__(self, max_samples: int = 1024):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._samples: Dict[str, Deque[float]] = {}
+        self._collectors: Dict[str, Callable[[], Any]] = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.max_samples)
+            samples.append(value)
+
+    def register(self, name: str, collector: Callable[[], Any]) -> None:
+        """Register a callable whose return value is included in snapshots."""
+        with self._lock:
+            self._collectors[name] = collector
+
+    def counter(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            samples = {name: list(values) for name, values in self._samples.items()}
+            collectors = dict(self._collectors)
+
+        timings = {name: _summarize(values) for name, values in samples.items() if values}
+
+        collected = {}
+        for name, collector in collectors.items():
+            try:
+                collected[name] = collector()
+            except Exception as e:
+                collected[name] = {"error": str(e)}
+
+        return {"counters": counters, "gauges": gauges, "timings": timings, **collected}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._samples.clear()
+
+
+def _summarize(values) -> Dict[str, float]:
+    ordered = sorted(values)
+    n = len(ordered)
+    return {
+        "count": n,
+        "mean": sum(ordered) / n,
+        "p50": ordered[int(0.50 * (n - 1))],
+        "p95": ordered[int(0.95 * (n - 1))],
+        "max": ordered[-1],
+    }
+
+
+metrics = Metrics()
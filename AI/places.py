@@ -0,0 +1,90 @@
+# places.py — supported cities, their aliases and airports
+import csv
+import logging
+import os
+
+from provider_cache import normalize_city
+
+logger = logging.getLogger(__name__)
+
+# Destination dataset (data/raw at the repository root) that seeds PLACE_NAMES.
+DESTINATIONS_DIR = os.getenv(
+    "DESTINATIONS_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "raw"),
+)
+# file -> columns holding place names
+DESTINATION_COLUMNS = {
+    "City.csv": ("City",),
+    "Expanded_Destinations.csv": ("Name", "State"),
+}
+
+# City aliases
+CITY_ALIASES = {
+    "hyd": "hyderabad",
+    "blr": "bangalore",
+    "bom": "mumbai",
+    "mum": "mumbai",
+    "del": "delhi",
+    "maa": "chennai",
+    "ccu": "kolkata",
+}
+
+# State -> city
+STATE_TO_CITY = {
+    "kerala": "kochi",
+    "tamil nadu": "chennai",
+    "karnataka": "bangalore",
+    "maharashtra": "mumbai",
+    "rajasthan": "jaipur",
+    "telangana": "hyderabad",
+    "andhra pradesh": "visakhapatnam",
+    "west bengal": "kolkata",
+}
+
+# City -> IATA
+CITY_TO_IATA = {
+    "delhi": "DEL",
+    "hyderabad": "HYD",
+    "mumbai": "BOM",
+    "bangalore": "BLR",
+    "chennai": "MAA",
+    "goa": "GOI",
+    "kolkata": "CCU",
+    "kochi": "COK",
+    "trivandrum": "TRV",
+    "calicut": "CCJ",
+    "jaipur": "JAI",
+    "visakhapatnam": "VTZ",
+}
+
+
+
+def load_destination_names(directory: str = DESTINATIONS_DIR) -> set:
+    """Normalized place names from the destination CSVs; missing files are skipped."""
+    names = set()
+    for filename, columns in DESTINATION_COLUMNS.items():
+        path = os.path.join(directory, filename)
+        try:
+            with open(path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    for column in columns:
+                        name = normalize_city(row.get(column) or "")
+                        if name:
+                            names.add(name)
+        except OSError as e:
+            logger.warning("destination names not loaded from %s: %s", path, e)
+    return names
+
+
+# Place names whose presence must match for a semantic /chat cache hit.
+PLACE_NAMES = (
+    set(CITY_ALIASES.values()) | set(STATE_TO_CITY) | set(STATE_TO_CITY.values()) | set(CITY_TO_IATA)
+    | load_destination_names()
+)
+
+
+def canonical_city(name: str) -> str:
+    """' HYD ' -> 'hyderabad', 'Kerala' -> 'kochi'; unknown names are only normalized."""
+    city = normalize_city(name)
+    city = CITY_ALIASES.get(city, city)
+    return STATE_TO_CITY.get(city, city)
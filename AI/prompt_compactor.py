@@ -0,0 +1,173 @@
+# prompt_compactor.py — dense, token-budgeted rendering of provider data for LLM prompts
+import importlib.util
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from metrics import metrics
+
+logger = logging.getLogger("travelai.prompt")
+
+# tiktoken is optional (pip install tiktoken). cl100k_base is close to the
+# Llama 3 tokenizer Groq serves; without it we fall back to ~4 chars/token.
+TIKTOKEN_AVAILABLE = importlib.util.find_spec("tiktoken") is not None
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding, TIKTOKEN_AVAILABLE
+    if _encoding is None and TIKTOKEN_AVAILABLE:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:  # e.g. BPE file cannot be downloaded
+            logger.warning("tiktoken unavailable, estimating tokens: %s", e)
+            TIKTOKEN_AVAILABLE = False
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def truncate_tokens(text: str, budget: int) -> str:
+    """Cut `text` to at most `budget` tokens, on a line or word boundary when possible."""
+    if count_tokens(text) <= budget:
+        return text
+    encoding = _get_encoding()
+    if encoding is not None:
+        cut = encoding.decode(encoding.encode(text)[:budget])
+    else:
+        cut = text[: budget * 4]
+    for sep in ("\n", " "):
+        idx = cut.rfind(sep)
+        if idx > len(cut) // 2:
+            cut = cut[:idx]
+            break
+    return cut.rstrip() + " …"
+
+
+# Per-section input-token budgets; override with PROMPT_BUDGET_<SECTION>.
+# Flights, hotels and fares are not prompt sections: trip_planning renders
+# them and the prompt only gets plan_summary_for_prompt().
+DEFAULT_BUDGETS = {
+    "weather": 80,
+    "rag": 600,
+    "activities": 450,
+}
+
+# (field, header) per table. Only what the itinerary output actually uses.
+PLACE_COLUMNS = [
+    ("title", "place"),
+    ("category", "type"),
+    ("rating", "rating"),
+    ("reviews", "reviews"),
+    ("price_level", "price"),
+]
+
+
+def _cell(value: Any) -> str:
+    if value is None or value == "":
+        return "-"
+    if isinstance(value, float):
+        return f"{value:g}"
+    if isinstance(value, dict):  # e.g. SerpAPI {"lowest": "₹4,200", ...}
+        value = value.get("lowest") or value.get("extracted_lowest") or next(iter(value.values()), "")
+    return " ".join(str(value).replace("|", "/").split())
+
+
+def render_table(rows: Iterable[Dict[str, Any]], columns: Sequence[Tuple[str, str]]) -> List[str]:
+    """Header line plus one 'a | b | c' line per row."""
+    lines = [" | ".join(header for _, header in columns)]
+    for row in rows:
+        lines.append(" | ".join(_cell(row.get(field)) for field, _ in columns))
+    return lines
+
+
+class PromptCompactor:
+    """
+    Renders prompt sections under per-section token budgets and records
+    input-token counts before (raw reprs) and after compaction.
+
+    Usage:
+        compactor = PromptCompactor()
+        activities_text = compactor.table("activities", places, PLACE_COLUMNS, sort_key="price_level")
+        rag_text = compactor.text("rag", rag_context)
+        prompt = f"...{activities_text}...{rag_text}..."
+        compactor.report(prompt)
+    """
+
+    def __init__(self, budgets: Optional[Dict[str, int]] = None):
+        self.budgets = dict(DEFAULT_BUDGETS)
+        for name in DEFAULT_BUDGETS:
+            raw = os.getenv(f"PROMPT_BUDGET_{name.upper()}")
+            if raw and raw.isdigit():
+                self.budgets[name] = int(raw)
+        self.budgets.update(budgets or {})
+        self.before: Dict[str, int] = {}
+        self.after: Dict[str, int] = {}
+
+    def _budget(self, section: str) -> int:
+        return self.budgets.get(section, 400)
+
+    def table(
+        self,
+        section: str,
+        rows: List[Dict[str, Any]],
+        columns: Sequence[Tuple[str, str]],
+        sort_key: Optional[str] = None,
+        empty: str = "none available",
+    ) -> str:
+        """
+        Dense table of `rows`, dropping trailing rows that don't fit the
+        section budget. With `sort_key`, rows are ordered ascending on it
+        first (missing values last) so the budget keeps the best ones.
+        """
+        rows = [r for r in rows if isinstance(r, dict)]
+        self.before[section] = count_tokens(str(rows))
+        if not rows:
+            self.after[section] = count_tokens(empty)
+            return empty
+
+        if sort_key:
+            rows = sorted(rows, key=lambda r: (not isinstance(r.get(sort_key), (int, float)), r.get(sort_key) or 0))
+
+        budget = self._budget(section)
+        header, *lines = render_table(rows, columns)
+        kept, used = [header], count_tokens(header)
+        for line in lines:
+            cost = count_tokens(line) + 1
+            if used + cost > budget:
+                break
+            kept.append(line)
+            used += cost
+        if len(kept) < len(lines) + 1:
+            kept.append(f"(+{len(lines) + 1 - len(kept)} more omitted)")
+
+        out = "\n".join(kept)
+        self.after[section] = count_tokens(out)
+        return out
+
+    def text(self, section: str, text: Any) -> str:
+        text = "" if text is None else str(text)
+        self.before[section] = count_tokens(text)
+        out = truncate_tokens(text, self._budget(section))
+        self.after[section] = count_tokens(out)
+        return out
+
+    def report(self, prompt: str) -> Dict[str, int]:
+        """Log and record prompt tokens before/after compaction."""
+        after_total = count_tokens(prompt)
+        before_total = after_total + sum(self.before.values()) - sum(self.after.values())
+        metrics.observe("prompt.input_tokens_before", before_total)
+        metrics.observe("prompt.input_tokens", after_total)
+        logger.info(
+            "prompt input tokens %d -> %d (%s)",
+            before_total,
+            after_total,
+            ", ".join(f"{k} {self.before[k]}->{self.after.get(k, 0)}" for k in self.before),
+        )
+        return {"before": before_total, "after": after_total}
@@ -0,0 +1,322 @@
+# provider_cache.py — cached access to the zapi providers used by agent_core
+
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from cache_utils import TTLCache
+from cache_store import TieredCache, open_store
+from metrics import metrics
+
+from zapi.tools_weather import get_weather
+from zapi.flight_api import search_flights_serpapi, search_flights_flexible
+from zapi.hotel_api import search_hotels_serpapi
+from zapi.tripadvisor_api import search_tripadvisor
+from zapi.maps_api import get_distance
+
+
+# Per-provider TTLs in seconds; override with CACHE_TTL_<PROVIDER> env vars.
+DEFAULT_TTLS = {
+    "weather": 600,       # 10 min
+    "flights": 900,       # 15 min
+    "hotels": 1800,       # 30 min
+    "tripadvisor": 21600, # 6 h
+    "maps": 86400,        # 24 h
+}
+
+# Extra window after the TTL in which a cached value is still served while a
+# background refresh runs (stale-while-revalidate); override with
+# CACHE_STALE_TTL_<PROVIDER>. Prices change slowly relative to our traffic.
+DEFAULT_STALE_TTLS = {
+    "weather": 1200,
+    "flights": 1800,
+    "hotels": 3600,
+    "tripadvisor": 86400,
+    "maps": 604800,
+}
+
+# get_weather returns plain strings, including for failures.
+WEATHER_ERROR_PREFIXES = (
+    "Weather API key missing",
+    "Please provide a valid city",
+    "Could not fetch weather",
+    "Error fetching weather",
+)
+
+
+# -------------------------------------------------
+# KEY NORMALIZATION
+# -------------------------------------------------
+def normalize_city(city: Optional[str]) -> str:
+    """'  New   Delhi ' -> 'new delhi'"""
+    return " ".join((city or "").split()).lower()
+
+
+def normalize_date(value: str) -> str:
+    """Accept YYYY-MM-DD or DD-MM-YYYY and return YYYY-MM-DD."""
+    value = (value or "").strip()
+    for fmt in ("%Y-%m-%d", "%d-%m-%Y"):
+        try:
+            return datetime.strptime(value, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return value
+
+
+def normalize_text(value: Optional[str]) -> str:
+    return " ".join((value or "").split()).lower()
+
+
+def is_error_result(value: Any) -> bool:
+    if value is None:
+        return True
+    if isinstance(value, dict):
+        return "error" in value
+    if isinstance(value, str):
+        return value.startswith(WEATHER_ERROR_PREFIXES)
+    return False
+
+
+def _ttls_from_env(prefix: str, defaults: Dict[str, int]) -> Dict[str, int]:
+    ttls = {}
+    for name, default in defaults.items():
+        raw = os.getenv(f"{prefix}{name.upper()}")
+        ttls[name] = int(raw) if raw and raw.isdigit() else default
+    return ttls
+
+
+# -------------------------------------------------
+# PROVIDER CACHE
+# -------------------------------------------------
+class ProviderCache:
+    """
+    One TTLCache per provider, keyed on normalized request parameters.
+
+    Lookups are single-flight: concurrent misses on the same key share one
+    provider call. Error results (missing keys, HTTP failures, empty
+    responses) are returned to the caller and only cached for `negative_ttl`
+    seconds (CACHE_NEGATIVE_TTL), which is off by default.
+
+    When a shared store is configured (TRAVELAI_CACHE_URL, see
+    cache_store.open_store) each provider cache is a TieredCache, so warm
+    entries are shared by all workers and survive restarts.
+
+    After its TTL an entry stays servable for its provider's stale window:
+    the cached value is returned at once and refreshed in the background.
+
+    Usage:
+        providers = ProviderCache()
+        providers.weather("Goa")
+        providers.stats()["weather"]["hit_rate"]
+    """
+
+    def __init__(
+        self,
+        ttls: Optional[Dict[str, int]] = None,
+        stale_ttls: Optional[Dict[str, int]] = None,
+        max_entries: int = 2048,
+        max_bytes: Optional[int] = 32 * 1024 * 1024,
+        negative_ttl: Optional[float] = None,
+        store=None,
+    ):
+        self.ttls = {**_ttls_from_env("CACHE_TTL_", DEFAULT_TTLS), **(ttls or {})}
+        self.stale_ttls = {
+            **_ttls_from_env("CACHE_STALE_TTL_", DEFAULT_STALE_TTLS),
+            **(stale_ttls or {}),
+        }
+        if negative_ttl is None and os.getenv("CACHE_NEGATIVE_TTL", "").isdigit():
+            negative_ttl = int(os.environ["CACHE_NEGATIVE_TTL"])
+        self.negative_ttl = negative_ttl
+        self.store = store if store is not None else open_store()
+
+        self._caches = {}
+        for name, ttl in self.ttls.items():
+            options = dict(
+                ttl_seconds=ttl,
+                hard_ttl_seconds=ttl + self.stale_ttls.get(name, 0),
+                max_entries=max_entries,
+                max_bytes=max_bytes,
+            )
+            if self.store is not None:
+                self._caches[name] = TieredCache(
+                    self.store, f"provider:{name}", is_error=is_error_result, **options
+                )
+            else:
+                self._caches[name] = TTLCache(**options)
+
+        metrics.register("provider_cache", self.stats)
+
+    # ------------------------ Core ------------------------
+    def _cached(self, provider: str, key: Tuple[Any, ...], fetch: Callable[[], Any]) -> Any:
+        return self._caches[provider].get_or_compute(
+            key,
+            fetch,
+            negative_ttl=self.negative_ttl,
+            is_error=is_error_result,
+        )
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        out = {}
+        for name, cache in self._caches.items():
+            stats = cache.stats()
+            total = stats["hits"] + stats["misses"]
+            stats["ttl_seconds"] = self.ttls[name]
+            stats["stale_ttl_seconds"] = self.stale_ttls.get(name, 0)
+            stats["hit_rate"] = round(stats["hits"] / total, 4) if total else 0.0
+            out[name] = stats
+        return out
+
+    # ------------------------ Providers ------------------------
+    def weather(self, city: str) -> str:
+        city = normalize_city(city)
+        return self._cached("weather", (city,), lambda: get_weather(city))
+
+    def flights(
+        self,
+        origin_airport: str,
+        destination_airport: str,
+        depart_date: str,
+        return_date: str,
+        passengers: int = 1,
+        cabin_class: str = "economy",
+        currency: str = "INR",
+        max_results: int = 5,
+    ) -> dict:
+        origin_airport = origin_airport.strip().upper()
+        destination_airport = destination_airport.strip().upper()
+        depart_date = normalize_date(depart_date)
+        return_date = normalize_date(return_date)
+        cabin_class = normalize_text(cabin_class)
+        currency = currency.upper()
+
+        key = (
+            origin_airport,
+            destination_airport,
+            depart_date,
+            return_date,
+            passengers,
+            cabin_class,
+            currency,
+            max_results,
+        )
+        return self._cached(
+            "flights",
+            key,
+            lambda: search_flights_serpapi(
+                origin_airport=origin_airport,
+                destination_airport=destination_airport,
+                depart_date=depart_date,
+                return_date=return_date,
+                passengers=passengers,
+                cabin_class=cabin_class,
+                currency=currency,
+                max_results=max_results,
+            ),
+        )
+
+    def fare_calendar(
+        self,
+        origin_airport: str,
+        destination_airport: str,
+        depart_date: str,
+        return_date: str,
+        flex_days: int = 1,
+        passengers: int = 1,
+        cabin_class: str = "economy",
+        currency: str = "INR",
+    ) -> dict:
+        """
+        Flexible-date fare calendar (see search_flights_flexible), cached per
+        route and date window. Each date pair goes through `flights`, so cells
+        are shared with overlapping calendars and exact-date searches.
+        """
+        origin_airport = origin_airport.strip().upper()
+        destination_airport = destination_airport.strip().upper()
+        depart_date = normalize_date(depart_date)
+        return_date = normalize_date(return_date)
+        cabin_class = normalize_text(cabin_class)
+        currency = currency.upper()
+
+        key = (
+            "calendar",
+            origin_airport,
+            destination_airport,
+            depart_date,
+            return_date,
+            flex_days,
+            passengers,
+            cabin_class,
+            currency,
+        )
+        return self._cached(
+            "flights",
+            key,
+            lambda: search_flights_flexible(
+                origin_airport=origin_airport,
+                destination_airport=destination_airport,
+                depart_date=depart_date,
+                return_date=return_date,
+                flex_days=flex_days,
+                passengers=passengers,
+                cabin_class=cabin_class,
+                currency=currency,
+                search=self.flights,
+            ),
+        )
+
+    def hotels(
+        self,
+        city: str,
+        checkin: str,
+        checkout: str,
+        adults: int = 2,
+        rooms: int = 1,
+        currency: str = "INR",
+        max_results: int = 5,
+    ) -> dict:
+        city = normalize_city(city)
+        checkin = normalize_date(checkin)
+        checkout = normalize_date(checkout)
+        currency = currency.upper()
+
+        key = (city, checkin, checkout, adults, rooms, currency, max_results)
+        return self._cached(
+            "hotels",
+            key,
+            lambda: search_hotels_serpapi(
+                city=city,
+                checkin=checkin,
+                checkout=checkout,
+                adults=adults,
+                rooms=rooms,
+                currency=currency,
+                max_results=max_results,
+            ),
+        )
+
+    def tripadvisor(
+        self,
+        city: str,
+        interests: Optional[str] = None,
+        max_results: int = 10,
+        currency: str = "INR",
+    ) -> dict:
+        city = normalize_city(city)
+        interests = normalize_text(interests) or None
+        currency = currency.upper()
+
+        key = (city, interests or "", max_results, currency)
+        return self._cached(
+            "tripadvisor",
+            key,
+            lambda: search_tripadvisor(
+                city=city,
+                interests=interests,
+                max_results=max_results,
+                currency=currency,
+            ),
+        )
+
+    def distance(self, origin: str, destination: str) -> dict:
+        key = (normalize_text(origin), normalize_text(destination))
+        return self._cached("maps", key, lambda: get_distance(origin, destination))
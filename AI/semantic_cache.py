@@ -0,0 +1,199 @@
+# semantic_cache.py — embedding-similarity answer cache for /chat
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from cache_utils import TTLCache
+from metrics import metrics
+from text_utils import normalize_query
+
+CHAT_CACHE_THRESHOLD = float(os.getenv("CHAT_CACHE_THRESHOLD", "0.92"))
+CHAT_CACHE_TTL = int(os.getenv("CHAT_CACHE_TTL", "86400"))             # 24 h
+CHAT_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "2000"))
+
+# Lookups scoring within this margin below the threshold are counted as
+# near misses: a high count means the threshold may be too strict.
+NEAR_MISS_MARGIN = 0.05
+
+# Neighbours inspected per lookup; the best one can be expired or guarded out.
+SEARCH_K = 4
+
+_NUMBER_RE = re.compile(r"\d+")
+
+
+def guard_terms(query: str, vocabulary: Iterable[str] = ()) -> FrozenSet[str]:
+    """
+    Terms two queries must share for a semantic hit: numbers ("3 days") and
+    any `vocabulary` word or phrase present (e.g. place names), since
+    "best time to visit goa" and "... kerala" embed very close together.
+    """
+    text = f" {normalize_query(query)} "
+    terms = set(_NUMBER_RE.findall(text))
+    terms.update(v for v in vocabulary if f" {v} " in text)
+    return frozenset(terms)
+
+
+class SemanticCache:
+    """
+    Answers keyed by query meaning rather than exact text.
+
+    Normalized queries are embedded with `embed` (unit-length vectors, e.g.
+    the RAG engine's MiniLM model) into an inner-product FAISS index. A
+    lookup returns the answer of the nearest live entry whose cosine
+    similarity is at least `threshold` and whose guard terms match.
+
+    Entries expire after `ttl_seconds` and the least recently hit entry is
+    evicted beyond `max_entries`. For threshold tuning the cache records the
+    best similarity of every lookup (chat_cache.similarity), near misses
+    and false hits reported through report_false_hit().
+
+    Usage:
+        cache = SemanticCache(rag._embed, rag.dim, vocabulary={"goa", "kerala"})
+        answer = cache.lookup(message)
+        if answer is None:
+            answer = llm(message)
+            cache.store(message, answer)
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[List[str]], np.ndarray],
+        dim: int,
+        threshold: float = CHAT_CACHE_THRESHOLD,
+        ttl_seconds: int = CHAT_CACHE_TTL,
+        max_entries: int = CHAT_CACHE_MAX_ENTRIES,
+        vocabulary: Iterable[str] = (),
+    ):
+        self.embed = embed
+        self.threshold = threshold
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self.vocabulary = frozenset(normalize_query(v) for v in vocabulary)
+
+        self._lock = threading.Lock()
+        self._index = faiss.IndexIDMap(faiss.IndexFlatIP(dim))
+        # id -> (query, guard terms, answer, expires_at); oldest -> most recently hit
+        self._entries: "OrderedDict[int, Tuple[str, FrozenSet[str], str, float]]" = OrderedDict()
+        self._next_id = 0
+        # lookup() embeds, store() reuses the vector for the same text.
+        # Embedding always happens before taking self._lock.
+        self._vectors = TTLCache(ttl_seconds=300, max_entries=256)
+
+        self._hits = 0
+        self._misses = 0
+        self._near_misses = 0
+        self._false_hits = 0
+        self._evictions = 0
+        metrics.register("chat_cache", self.stats)
+
+    # ------------------------ Internals ------------------------
+    def _vector(self, text: str) -> np.ndarray:
+        vec = self._vectors.get(text)
+        if vec is None:
+            vec = np.asarray(self.embed([text]), dtype="float32").reshape(1, -1)
+            self._vectors.set(vec, text)
+        return vec
+
+    def _remove(self, ids: List[int]) -> None:
+        if not ids:
+            return
+        for entry_id in ids:
+            self._entries.pop(entry_id, None)
+        self._index.remove_ids(np.asarray(ids, dtype="int64"))
+
+    def _match(self, text: str, vec: np.ndarray) -> Tuple[Optional[int], float]:
+        """(id of the best live guarded match, best similarity seen). Holds the lock."""
+        if not self._entries:
+            return None, 0.0
+        scores, ids = self._index.search(vec, min(SEARCH_K, len(self._entries)))
+        terms = guard_terms(text, self.vocabulary)
+        now = time.time()
+        expired, best, found = [], 0.0, None
+        for score, entry_id in zip(scores[0], ids[0]):
+            entry = self._entries.get(int(entry_id))
+            if entry is None:
+                continue
+            if entry[3] <= now:
+                expired.append(int(entry_id))
+                continue
+            best = max(best, float(score))
+            if found is None and score >= self.threshold and entry[1] == terms:
+                found = int(entry_id)
+        self._remove(expired)
+        return found, best
+
+    # ------------------------ Public API ------------------------
+    def lookup(self, query: str) -> Optional[str]:
+        text = normalize_query(query)
+        if not text:
+            return None
+        vec = self._vector(text)
+        with self._lock:
+            entry_id, best = self._match(text, vec)
+            if entry_id is not None:
+                self._entries.move_to_end(entry_id)
+                self._hits += 1
+                answer = self._entries[entry_id][2]
+            else:
+                self._misses += 1
+                if best >= self.threshold - NEAR_MISS_MARGIN:
+                    self._near_misses += 1
+                answer = None
+        metrics.observe("chat_cache.similarity", best)
+        return answer
+
+    def store(self, query: str, answer: str) -> None:
+        text = normalize_query(query)
+        if not text or not answer:
+            return
+        vec = self._vector(text)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(vec, np.asarray([entry_id], dtype="int64"))
+            self._entries[entry_id] = (text, guard_terms(text, self.vocabulary), answer, time.time() + self.ttl)
+            overflow = len(self._entries) - self.max_entries
+            if overflow > 0:
+                self._remove(list(self._entries)[:overflow])
+                self._evictions += overflow
+
+    def report_false_hit(self, query: str) -> bool:
+        """Drop the entry `query` would hit (a wrong cached answer) and count it."""
+        text = normalize_query(query)
+        if not text:
+            return False
+        vec = self._vector(text)
+        with self._lock:
+            entry_id, _ = self._match(text, vec)
+            if entry_id is None:
+                return False
+            self._remove([entry_id])
+            self._false_hits += 1
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._index.reset()
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "near_misses": self._near_misses,
+                "false_hits": self._false_hits,
+                "evictions": self._evictions,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "false_hit_rate": round(self._false_hits / self._hits, 4) if self._hits else 0.0,
+                "size": len(self._entries),
+                "threshold": self.threshold,
+                "ttl_seconds": self.ttl,
+            }
@@ -0,0 +1,188 @@
+# session_store.py — server-side itinerary sessions for /refine
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from cache_store import decode, encode, make_store_key, open_store
+from cache_utils import TTLCache
+from itinerary_sections import Itinerary
+from metrics import metrics
+
+# Idle sessions expire after SESSION_TTL_SECONDS; reads extend the local copy,
+# saves (each refinement) the shared one. At most SESSION_MAX_ENTRIES live in process memory (LRU).
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "7200"))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "1000"))
+
+class SessionConflict(Exception):
+    """Another worker saved the session after this copy was read; re-read and retry."""
+
+
+# Striped per-session locks so concurrent refinements of one session apply in order.
+_LOCK_STRIPES = 64
+
+
+@dataclass
+class Session:
+    session_id: str
+    itinerary: Itinerary
+    requests: List[str] = field(default_factory=list)
+    meta: Dict[str, Any] = field(default_factory=dict)
+    # trip_planning.TripPlan.to_dict() for trips planned here; flights,
+    # hotels and budget are re-rendered from it on refinement.
+    plan: Optional[Dict[str, Any]] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    # Bumped by every save; compared against the shared copy on get and save.
+    version: int = 0
+
+    @property
+    def text(self) -> str:
+        return self.itinerary.to_text()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "itinerary": self.text,
+            "requests": self.requests,
+            "meta": self.meta,
+            "plan": self.plan,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "version": self.version,
+        }
+
+    @classmethod
+    def from_dict(cls, session_id: str, data: Dict[str, Any]) -> "Session":
+        return cls(
+            session_id=session_id,
+            itinerary=Itinerary.from_text(data.get("itinerary", "")),
+            requests=list(data.get("requests") or []),
+            meta=dict(data.get("meta") or {}),
+            plan=data.get("plan"),
+            created_at=data.get("created_at") or time.time(),
+            updated_at=data.get("updated_at") or time.time(),
+            version=int(data.get("version") or 0),
+        )
+
+
+class SessionStore:
+    """
+    Itinerary sessions addressed by an opaque id.
+
+    The in-process tier is a TTLCache of parsed Session objects, so a
+    refinement reuses the section structure instead of re-parsing text.
+    With a shared store (TRAVELAI_CACHE_URL, see cache_store.open_store)
+    sessions are also written there as text, so any worker can pick up a
+    session and it survives restarts. The shared copy is authoritative:
+    get() reads it through and only re-parses when its version differs
+    from the local one, and save() raises SessionConflict when another
+    worker saved a newer version since this copy was read. (The check and
+    the write are not atomic; the per-session lock only orders saves
+    within one process.)
+
+    Usage:
+        sessions = SessionStore()
+        session = sessions.create(itinerary_text, meta={"destination": "goa"})
+        with sessions.locked(session.session_id):
+            session = sessions.get(session.session_id)
+            ...
+            sessions.save(session)
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = SESSION_TTL_SECONDS,
+        max_entries: int = SESSION_MAX_ENTRIES,
+        store=None,
+    ):
+        self.ttl = ttl_seconds
+        self.store = store if store is not None else open_store()
+        self._local = TTLCache(ttl_seconds=ttl_seconds, max_entries=max_entries)
+        self._locks = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+        self._shared_hits = 0
+        self._shared_errors = 0
+        metrics.register("sessions", self.stats)
+
+    def _key(self, session_id: str) -> str:
+        return make_store_key("session", (session_id,))
+
+    @contextmanager
+    def locked(self, session_id: str):
+        with self._locks[hash(session_id) % _LOCK_STRIPES]:
+            yield
+
+    def create(
+        self,
+        itinerary: str,
+        meta: Optional[Dict[str, Any]] = None,
+        plan: Optional[Dict[str, Any]] = None,
+    ) -> Session:
+        session = Session(
+            secrets.token_urlsafe(16), Itinerary.from_text(itinerary), meta=dict(meta or {}), plan=plan,
+        )
+        self.save(session)
+        metrics.incr("sessions.created")
+        return session
+
+    def _shared(self, session_id: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """(reachable, shared copy or None)."""
+        try:
+            found = self.store.get(self._key(session_id))
+        except Exception:
+            self._shared_errors += 1
+            return False, None
+        return True, decode(found[0]) if found is not None else None
+
+    def get(self, session_id: str) -> Optional[Session]:
+        """The session, or None if unknown or expired. Extends its local TTL."""
+        session = self._local.get(session_id)
+        if self.store is not None:
+            reachable, shared = self._shared(session_id)
+            if reachable and shared is None:
+                # Expired or deleted by another worker.
+                self._local.delete(session_id)
+                session = None
+            elif shared is not None and (session is None or session.version != shared.get("version", 0)):
+                self._shared_hits += 1
+                session = Session.from_dict(session_id, shared)
+        if session is None:
+            metrics.incr("sessions.misses")
+            return None
+        self._local.set(session, session_id)
+        return session
+
+    def save(self, session: Session) -> None:
+        """Persist `session`. Raises SessionConflict if the shared copy moved on since it was read."""
+        if self.store is not None:
+            _, shared = self._shared(session.session_id)
+            if shared is not None and shared.get("version", 0) > session.version:
+                self._local.delete(session.session_id)
+                metrics.incr("sessions.conflicts")
+                raise SessionConflict(session.session_id)
+        session.version += 1
+        session.updated_at = time.time()
+        self._local.set(session, session.session_id)
+        if self.store is None:
+            return
+        try:
+            self.store.set(self._key(session.session_id), encode(session.to_dict()), self.ttl)
+        except Exception:
+            self._shared_errors += 1
+
+    def delete(self, session_id: str) -> None:
+        self._local.delete(session_id)
+        if self.store is not None:
+            try:
+                self.store.delete(self._key(session_id))
+            except Exception:
+                self._shared_errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._local.stats()
+        stats["ttl_seconds"] = self.ttl
+        stats["shared_hits"] = self._shared_hits
+        stats["shared_errors"] = self._shared_errors
+        return stats
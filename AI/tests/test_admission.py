@@ -0,0 +1,87 @@
+import asyncio
+import os
+import sys
+
+import httpx
+from fastapi import FastAPI
+
+# Add AI folder to path so direct imports work
+ai_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ai_folder not in sys.path:
+    sys.path.insert(0, ai_folder)
+
+from admission import AdmissionMiddleware
+
+
+def make_app(limits, delay):
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware, limits=limits)
+
+    @app.post("/trip")
+    async def trip():
+        await asyncio.sleep(delay)
+        return {"ok": True}
+
+    @app.get("/trip/jobs/{job_id}")
+    async def job(job_id: str):
+        await asyncio.sleep(delay)
+        return {"job_id": job_id}
+
+    @app.get("/")
+    async def health():
+        return {"status": "ok"}
+
+    return app
+
+
+async def fire(app, method, path, n):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        async def one(i):
+            await asyncio.sleep(0.01 * i)  # deterministic arrival order
+            return await client.request(method, path)
+        return await asyncio.gather(*(one(i) for i in range(n)))
+
+
+def middleware_of(app):
+    app.build_middleware_stack()
+    layer = app.middleware_stack
+    while not isinstance(layer, AdmissionMiddleware):
+        layer = layer.app
+    return layer
+
+
+def test_queue_full_gets_429_and_queued_request_is_served():
+    app = make_app({"trip": (1, 1, 2000)}, delay=0.1)
+    responses = asyncio.run(fire(app, "POST", "/trip", 3))
+
+    assert [r.status_code for r in responses] == [200, 200, 429]
+    assert int(responses[2].headers["retry-after"]) >= 1
+    stats = middleware_of(app).limiters["trip"].stats()
+    assert stats["admitted"] == 2 and stats["shed_queue_full"] == 1
+    assert stats["active"] == 0 and stats["queued"] == 0
+
+
+def test_queue_wait_timeout_gets_503():
+    app = make_app({"trip": (1, 4, 100)}, delay=0.4)
+    responses = asyncio.run(fire(app, "POST", "/trip", 2))
+
+    assert [r.status_code for r in responses] == [200, 503]
+    assert "retry-after" in responses[1].headers
+    assert middleware_of(app).limiters["trip"].stats()["shed_timeout"] == 1
+
+
+def test_job_polls_have_their_own_limit_and_unlimited_routes_pass_through():
+    app = make_app({"trip": (1, 0, 0), "jobs": (2, 0, 0)}, delay=0.1)
+    responses = asyncio.run(fire(app, "GET", "/trip/jobs/abc", 3))
+    assert [r.status_code for r in responses] == [200, 200, 429]
+
+    responses = asyncio.run(fire(app, "GET", "/", 3))
+    assert all(r.status_code == 200 for r in responses)
+
+
+def test_disabled_by_env(monkeypatch):
+    monkeypatch.setenv("ADMISSION_ENABLED", "0")
+    app = make_app({"trip": (1, 0, 0)}, delay=0.05)
+    responses = asyncio.run(fire(app, "POST", "/trip", 3))
+    assert [r.status_code for r in responses] == [200, 200, 200]
@@ -9,9 +9,27 @@ if ai_folder not in sys.path:
 import pytest
 from fastapi.testclient import TestClient
 
+from itinerary_sections import Itinerary
+
+
+class DummyChatCache:
+    def __init__(self):
+        self.reported = []
+
+    def report_false_hit(self, message):
+        self.reported.append(message)
+        return True
+
+
+class DummyProviders:
+    def stats(self):
+        return {}
+
 
 class DummyAgent:
     def __init__(self, ask_resp=None, stream_tokens=None, plan_resp=None, refine_resp=None):
+        self.chat_cache = DummyChatCache()
+        self.providers = DummyProviders()
         self._ask = ask_resp
         self._stream = stream_tokens or []
         self._plan = plan_resp
@@ -27,9 +45,25 @@ class DummyAgent:
     def plan_full_trip(self, **kwargs):
         return self._plan
 
+    def plan_trip(self, **kwargs):
+        if isinstance(self._plan, str) and self._plan.startswith('❌'):
+            return {'type': 'error', 'message': self._plan}
+        return {'type': 'done', 'itinerary': str(self._plan), 'cached': False, 'plan': None}
+
+    def plan_full_trip_events(self, **kwargs):
+        yield {'type': 'started', 'destination_city': kwargs['destination_city']}
+        yield {'type': 'weather', 'text': 'Sunny'}
+        yield {'type': 'token', 'text': '## Day 1\n'}
+        yield {'type': 'token', 'text': 'Beach'}
+        yield {'type': 'done', 'itinerary': '## Day 1\nBeach', 'cached': False}
+
     def refine_itinerary(self, existing_itinerary, user_request):
         return self._refine
 
+    def refine_sections(self, itinerary, user_request, plan=None):
+        self.refined_from = itinerary.to_text()
+        return Itinerary.from_text(self._refine), ['itinerary'], plan
+
 
 # Import app after path setup
 import api
@@ -92,6 +126,14 @@ def test_chat_stream():
     assert 'itinerary' in r.json()
 
 
+def test_chat_feedback_drops_cached_answer():
+    client = get_client()
+    r = client.post('/chat/feedback', json={'message': 'when to visit goa'})
+    assert r.status_code == 200
+    assert r.json()['dropped'] is True
+    assert api.agent.chat_cache.reported == ['when to visit goa']
+
+
 def test_plan_trip_validation_error():
     client = get_client()
     # If agent returns a known '❌' string, API should return 400
@@ -112,6 +154,72 @@ def test_plan_trip_validation_error():
     assert r.status_code == 400
 
 
+def test_plan_trip_stream_ndjson():
+    import json
+
+    client = get_client()
+    payload = {
+        'origin_city': 'delhi',
+        'destination_city': 'goa',
+        'depart_date': '2026-01-01',
+        'return_date': '2026-01-04',
+        'days': 3,
+    }
+    r = client.post('/trip/stream', json=payload)
+    assert r.status_code == 200
+    assert r.headers['content-type'].startswith('application/x-ndjson')
+
+    events = [json.loads(line) for line in r.text.splitlines()]
+    assert [e['type'] for e in events] == ['started', 'weather', 'token', 'token', 'done']
+    assert events[-1]['itinerary'] == '## Day 1\nBeach'
+    assert events[-1]['session_id']
+    assert 'trip.ttfb_seconds' in client.get('/metrics').json()['timings']
+
+
+def test_trip_job_lifecycle():
+    client = get_client()
+    payload = {
+        'origin_city': 'delhi',
+        'destination_city': 'goa',
+        'depart_date': '2026-01-01',
+        'return_date': '2026-01-04',
+        'days': 3,
+        'priority': 'low',
+    }
+    r = client.post('/trip/jobs', json=payload)
+    assert r.status_code == 202
+    job_id = r.json()['job_id']
+
+    r = client.get(f'/trip/jobs/{job_id}', params={'wait': 5})
+    assert r.json()['status'] == 'succeeded'
+    assert r.json()['result']['itinerary'] == '## Day 1\nBeach'
+    assert r.json()['result']['session_id']
+
+    assert client.get('/trip/jobs/unknown').status_code == 404
+    assert client.post('/trip/jobs', json={**payload, 'priority': 'urgent'}).status_code == 422
+
+
+def test_plan_trip_batch_jsonl():
+    import json
+
+    client = get_client()
+    api.agent._plan = '## Day 1\nBeach'
+    lines = [
+        {'origin_city': 'delhi', 'destination_city': 'goa', 'depart_date': '2026-01-01', 'return_date': '2026-01-04'},
+        {'origin_city': 'delhi', 'destination_city': 'goa', 'depart_date': '01-01-2026', 'return_date': '2026-01-04'},
+        {'origin_city': 'delhi', 'destination_city': 'goa', 'depart_date': 'someday', 'return_date': '2026-01-04'},
+    ]
+    body = '\n'.join(json.dumps(l) for l in lines)
+    r = client.post('/trip/batch', content=body, headers={'content-type': 'application/x-ndjson'})
+    assert r.status_code == 200
+
+    results = [json.loads(line) for line in r.text.splitlines()]
+    rows = sorted(results[:-1], key=lambda row: row['index'])
+    assert [row['status'] for row in rows] == ['ok', 'ok', 'error']
+    assert rows[0]['session_id']
+    assert results[-1]['deduplicated'] == 1
+
+
 def test_refine_trip():
     client = get_client()
     api.agent._refine = 'Updated itinerary'
@@ -119,3 +227,42 @@ def test_refine_trip():
     r = client.post('/refine', json={'itinerary': 'orig', 'user_request': 'add museum'})
     assert r.status_code == 200
     assert r.json()['itinerary'] == 'Updated itinerary'
+    assert r.json()['session_id']
+
+
+def test_refine_by_session_id():
+    client = get_client()
+    api.agent._plan = '## Day 1\nBeach'
+    payload = {
+        'origin_city': 'delhi',
+        'destination_city': 'goa',
+        'depart_date': '2026-01-01',
+        'return_date': '2026-01-04',
+        'days': 3,
+    }
+    r = client.post('/trip', json=payload)
+    assert r.status_code == 200
+    session_id = r.json()['session_id']
+
+    api.agent._refine = '## Day 1\nFort'
+    r = client.post('/refine', json={'session_id': session_id, 'user_request': 'swap the beach'})
+    assert r.status_code == 200
+    assert api.agent.refined_from == '## Day 1\nBeach'
+    assert r.json()['itinerary'] == '## Day 1\nFort'
+
+    r = client.get(f'/sessions/{session_id}')
+    assert r.json()['itinerary'] == '## Day 1\nFort'
+    assert r.json()['requests'] == ['swap the beach']
+
+
+def test_refine_unknown_session():
+    client = get_client()
+    r = client.post('/refine', json={'session_id': 'nope', 'user_request': 'add museum'})
+    assert r.status_code == 404
+
+
+def test_metrics():
+    client = get_client()
+    r = client.get('/metrics')
+    assert r.status_code == 200
+    assert 'counters' in r.json()
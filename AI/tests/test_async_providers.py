@@ -0,0 +1,88 @@
+import sys
+import os
+import asyncio
+
+# Add AI folder to path so direct imports work
+ai_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ai_folder not in sys.path:
+    sys.path.insert(0, ai_folder)
+
+import httpx
+
+from zapi import hotel_api, tools_weather
+from zapi.async_http_client import AsyncProviderHTTPClient
+from zapi.resilience import BreakerRegistry, RetryBudget
+from zapi.scheduler import SerpAPIScheduler
+
+
+def mock_client(handler):
+    return AsyncProviderHTTPClient(
+        retry_wait_min=0,
+        retry_wait_max=0,
+        transport=httpx.MockTransport(handler),
+        breakers=BreakerRegistry(),
+        retry_budget=RetryBudget(),
+        scheduler=SerpAPIScheduler(rate_per_sec=1000),
+    )
+
+
+def test_async_hotels_matches_sync_parsing(monkeypatch):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(503)
+        return httpx.Response(200, json={'properties': [
+            {'name': 'Sea View', 'overall_rating': 4.3, 'rate_per_night': 3500, 'address': 'Baga'},
+        ]})
+
+    monkeypatch.setattr(hotel_api, 'SERPAPI_KEY', 'test-key')
+    monkeypatch.setattr(hotel_api, 'async_http_client', mock_client(handler))
+
+    result = asyncio.run(hotel_api.search_hotels_serpapi_async('goa', '2025-12-10', '2025-12-12'))
+
+    assert len(calls) == 2  # retried once after the 503
+    assert calls[-1].url.params['engine'] == 'google_hotels'
+    assert result['hotels'][0]['name'] == 'Sea View'
+    assert result['hotels'][0]['price'] == 3500
+
+
+def test_async_weather_status_error(monkeypatch):
+    monkeypatch.setattr(tools_weather, 'OPENWEATHER_API_KEY', 'test-key')
+    monkeypatch.setattr(
+        tools_weather, 'async_http_client', mock_client(lambda request: httpx.Response(404))
+    )
+
+    result = asyncio.run(tools_weather.get_weather_async('Atlantis'))
+    assert result == "Could not fetch weather for 'Atlantis'. (status 404)"
+
+
+def test_async_cancelled_call_releases_half_open_probe():
+    breakers = BreakerRegistry(failure_threshold=1, reset_timeout=0)
+    breaker = breakers.get('serpapi.com')
+    breaker.record_failure()  # half-open on next check
+
+    async def slow(request):
+        await asyncio.sleep(5)
+        return httpx.Response(200, json={})
+
+    client = AsyncProviderHTTPClient(
+        retry_wait_min=0, retry_wait_max=0, max_attempts=1,
+        transport=httpx.MockTransport(slow),
+        breakers=breakers, retry_budget=RetryBudget(),
+        scheduler=SerpAPIScheduler(rate_per_sec=1000),
+    )
+
+    async def run():
+        task = asyncio.create_task(client.get_json('https://serpapi.com/search'))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(run())
+    breaker.before_call()  # probe slot was given back, so this does not raise
+    assert breaker.state == 'half_open'
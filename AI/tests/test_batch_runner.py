@@ -0,0 +1,124 @@
+import json
+import os
+import sys
+import threading
+import time
+
+# Add AI folder to path so direct imports work
+ai_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ai_folder not in sys.path:
+    sys.path.insert(0, ai_folder)
+
+from batch_runner import parse_request, run_batch
+from zapi.scheduler import BACKGROUND, current_priority
+
+
+def line(**overrides):
+    req = {
+        "origin_city": "delhi",
+        "destination_city": "goa",
+        "depart_date": "2026-01-10",
+        "return_date": "2026-01-13",
+    }
+    req.update(overrides)
+    return json.dumps(req)
+
+
+def test_parse_request():
+    kwargs = parse_request(json.loads(line(passengers="3", extra="ignored")))
+    assert kwargs["passengers"] == 3
+    assert "extra" not in kwargs and "days" not in kwargs
+
+
+def test_results_errors_and_summary():
+    def plan(**kwargs):
+        assert current_priority() == BACKGROUND
+        if kwargs["origin_city"] == "atlantis":
+            return "❌ Unsupported origin city: Atlantis"
+        return f"plan {kwargs['destination_city']}"
+
+    lines = [line(), "", "not json", line(origin_city="atlantis"), line(destination_city="jaipur")]
+    out = list(run_batch(plan, lines, concurrency=2))
+    rows = sorted(out[:-1], key=lambda r: r["index"])
+
+    assert [(r["index"], r["status"]) for r in rows] == [(0, "ok"), (2, "error"), (3, "error"), (4, "ok")]
+    assert rows[0]["itinerary"] == "plan goa"
+    assert rows[2]["error"].startswith("❌")
+    assert out[-1] == {
+        "type": "summary", "total": 4, "succeeded": 2, "failed": 2,
+        "deduplicated": 0, "provider_lookups_saved": 0,
+    }
+
+
+def test_identical_requests_planned_once():
+    calls = []
+
+    def plan(**kwargs):
+        calls.append(kwargs)
+        time.sleep(0.05)
+        return "plan"
+
+    lines = [line(), line(origin_city=" Delhi "), line(depart_date="10-01-2026"), line(days=5)]
+    out = list(run_batch(plan, lines, concurrency=4))
+    assert len(calls) == 2
+    assert sorted(r["index"] for r in out[:-1]) == [0, 1, 2, 3]
+    assert out[-1]["deduplicated"] == 2
+
+
+def test_concurrency_is_bounded():
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def plan(**kwargs):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        return "plan"
+
+    lines = [line(days=d) for d in range(1, 13)]
+    out = list(run_batch(plan, lines, concurrency=3))
+    assert out[-1]["succeeded"] == 12
+    assert peak[0] <= 3
+
+
+def test_batch_limit_and_provider_savings():
+    stats = {"weather": {"hits": 0, "coalesced": 0}}
+
+    def plan(**kwargs):
+        stats["weather"]["hits"] += 1
+        return "plan"
+
+    out = list(run_batch(plan, [line(days=d) for d in range(1, 5)], max_items=2, provider_stats=lambda: stats))
+    assert [r["status"] for r in out[:-1]].count("ok") == 2
+    assert "batch limit" in [r for r in out[:-1] if r["status"] == "error"][0]["error"]
+    assert out[-1]["provider_lookups_saved"] == 2
+
+
+def test_aliases_dedupe_and_on_success_sees_each_row():
+    calls, seen = [], []
+
+    def plan(**kwargs):
+        calls.append(kwargs)
+        time.sleep(0.02)
+        return {"type": "done", "itinerary": "plan", "plan": {"rooms": 1}}
+
+    def on_success(row, kwargs, result):
+        seen.append((row["index"], kwargs["origin_city"], result["plan"]))
+        row["session_id"] = f"s{row['index']}"
+
+    lines = [line(origin_city="hyd"), line(origin_city="Hyderabad"), line(destination_city="kerala"), line(destination_city="kochi")]
+    out = list(run_batch(plan, lines, concurrency=4, on_success=on_success))
+
+    assert len(calls) == 2
+    assert out[-1]["deduplicated"] == 2
+    assert sorted(r["session_id"] for r in out[:-1]) == ["s0", "s1", "s2", "s3"]
+    assert sorted(i for i, _, _ in seen) == [0, 1, 2, 3]
+    assert all(p == {"rooms": 1} for _, _, p in seen)
+
+
+def test_error_event_results_are_errors():
+    out = list(run_batch(lambda **kwargs: {"type": "error", "message": "❌ Unsupported origin city: X"}, [line()]))
+    assert out[0]["status"] == "error" and out[0]["error"].startswith("❌")
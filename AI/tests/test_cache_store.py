@@ -0,0 +1,117 @@
+import sys
+import os
+import time
+
+# Add AI folder to path so direct imports work
+ai_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ai_folder not in sys.path:
+    sys.path.insert(0, ai_folder)
+
+from cache_store import RedisStore, SQLiteStore, TieredCache, decode, encode, make_store_key
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for redis.Redis (get/set px/pttl/delete)."""
+
+    def __init__(self):
+        self._data = {}
+
+    def get(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if time.time() >= expires_at:
+            del self._data[key]
+            return None
+        return value
+
+    def set(self, key, value, px):
+        self._data[key] = (value, time.time() + px / 1000.0)
+
+    def pttl(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return -2
+        return int((item[1] - time.time()) * 1000)
+
+    def delete(self, key):
+        self._data.pop(key, None)
+
+
+PAYLOAD = {'hotels': [{'name': f'Hotel {i}', 'price': 1000 + i} for i in range(20)]}
+
+
+def test_encode_roundtrip_and_compression():
+    data = encode(PAYLOAD)
+    assert data[:1] == b'z'
+    assert decode(data) == PAYLOAD
+    assert decode(encode('Sunny')) == 'Sunny'
+
+
+def test_sqlite_tier_survives_restart(tmp_path):
+    db = str(tmp_path / 'cache.db')
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return PAYLOAD
+
+    first = TieredCache(SQLiteStore(db), 'provider:hotels', ttl_seconds=60)
+    assert first.get_or_compute(('goa', '2025-12-10'), fetch) == PAYLOAD
+
+    # New process / worker: cold local tier, warm shared tier
+    second = TieredCache(SQLiteStore(db), 'provider:hotels', ttl_seconds=60)
+    assert second.get_or_compute(('goa', '2025-12-10'), fetch) == PAYLOAD
+    assert calls == [1]
+    assert second.stats()['shared_hits'] == 1
+
+
+def test_sqlite_tier_enforces_ttl(tmp_path):
+    store = SQLiteStore(str(tmp_path / 'cache.db'))
+    store.set('k', encode('v'), ttl=0.05)
+    assert store.get('k') is not None
+    time.sleep(0.1)
+    assert store.get('k') is None
+    assert store.purge_expired() == 1
+
+
+def test_redis_tier_with_fake_client():
+    redis = FakeRedis()
+    writer = TieredCache(RedisStore(redis), 'provider:weather', ttl_seconds=60)
+    writer.set('Sunny', 'goa')
+
+    reader = TieredCache(RedisStore(redis), 'provider:weather', ttl_seconds=60)
+    assert reader.get('goa') == 'Sunny'
+    assert reader.get('delhi') is None
+
+
+def test_error_payloads_stay_local(tmp_path):
+    store = SQLiteStore(str(tmp_path / 'cache.db'))
+    cache = TieredCache(store, 'provider:flights', is_error=lambda v: 'error' in v, ttl_seconds=60)
+    cache.set({'error': 'No flights returned'}, 'del', 'goi', ttl=5)
+    assert cache.get('del', 'goi') == {'error': 'No flights returned'}
+    assert store.get(make_store_key('provider:flights', ('del', 'goi'))) is None
+
+
+def test_corrupt_shared_row_is_dropped(tmp_path):
+    store = SQLiteStore(str(tmp_path / 'cache.db'))
+    key = make_store_key('provider:weather', ('goa',))
+    store.set(key, b'znot-zlib', 60)
+
+    cache = TieredCache(store, 'provider:weather', ttl_seconds=60)
+    assert cache.get('goa') is None
+    assert store.get(key) is None
+    assert cache.stats()['shared_errors'] == 1
+
+
+def test_stale_local_entry_picks_up_fresher_shared_value(tmp_path):
+    store = SQLiteStore(str(tmp_path / 'cache.db'))
+    a = TieredCache(store, 'provider:weather', ttl_seconds=60, hard_ttl_seconds=120)
+    b = TieredCache(store, 'provider:weather', ttl_seconds=60, hard_ttl_seconds=120)
+    a.set('Sunny', 'goa', ttl=0.05)
+    time.sleep(0.1)  # a's copy is stale but still servable
+
+    b.set('Rainy', 'goa')
+    assert a.get_or_compute(('goa',), lambda: 'Fetched') == 'Rainy'
+    assert a.stats()['shared_hits'] == 1
@@ -0,0 +1,225 @@
+import sys
+import os
+import threading
+
+# Add AI folder to path so direct imports work
+ai_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ai_folder not in sys.path:
+    sys.path.insert(0, ai_folder)
+
+import cache_utils
+from cache_utils import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_get_set_and_stats():
+    cache = TTLCache(ttl_seconds=60)
+    assert cache.get('a') is None
+    cache.set('value', 'a')
+    assert cache.get('a') == 'value'
+
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['size'] == 1
+
+
+def test_lru_eviction_by_entries():
+    cache = TTLCache(ttl_seconds=60, max_entries=2)
+    cache.set(1, 'a')
+    cache.set(2, 'b')
+    cache.get('a')          # 'b' is now least recently used
+    cache.set(3, 'c')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.stats()['evictions'] == 1
+
+
+def test_eviction_by_bytes():
+    cache = TTLCache(ttl_seconds=60, max_entries=100, max_bytes=2000)
+    for i in range(20):
+        cache.set('x' * 200, i)
+
+    stats = cache.stats()
+    assert stats['bytes'] <= 2000
+    assert stats['evictions'] > 0
+
+
+def test_sweep_drops_unread_expired_entries(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_utils.time, 'monotonic', clock)
+
+    cache = TTLCache(ttl_seconds=10, sweep_every=4)
+    for i in range(3):
+        cache.set(i, 'old', i)
+    clock.now += 11
+    cache.set('new', 'fresh')   # 4th write triggers the sweep
+
+    assert len(cache) == 1
+    assert cache.stats()['expirations'] == 3
+
+
+def test_equal_expiry_with_unorderable_keys(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_utils.time, 'monotonic', clock)
+
+    cache = TTLCache(ttl_seconds=10, sweep_every=1000)
+    cache.set('a', 'goa', None)
+    cache.set('b', 'goa', 'food')   # same expires_at; keys must not be compared
+    clock.now += 11
+    cache._sweep()
+
+    assert len(cache) == 0
+
+
+def test_concurrent_access():
+    cache = TTLCache(ttl_seconds=60, max_entries=50)
+
+    def worker(n):
+        for i in range(500):
+            cache.set(i, n, i % 80)
+            cache.get(n, (i + 1) % 80)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(cache) <= 50
+
+
+def test_get_or_compute_single_flight():
+    cache = TTLCache(ttl_seconds=60)
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'goa-weather'
+
+    results = []
+
+    def worker():
+        results.append(cache.get_or_compute(('goa',), slow_fetch))
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    threads[0].start()
+    started.wait(5)
+    for t in threads[1:]:
+        t.start()
+    while cache.stats()['coalesced'] < 4:
+        pass
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert calls == [1]
+    assert results == ['goa-weather'] * 5
+
+
+def test_get_or_compute_errors_propagate_and_are_not_cached():
+    cache = TTLCache(ttl_seconds=60)
+    calls = []
+
+    def failing():
+        calls.append(1)
+        raise RuntimeError('provider down')
+
+    for _ in range(2):
+        try:
+            cache.get_or_compute('k', failing)
+        except RuntimeError as e:
+            assert 'provider down' in str(e)
+    assert len(calls) == 2
+    assert cache.get_or_compute('k', lambda: 'ok') == 'ok'
+
+
+def test_get_or_compute_negative_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_utils.time, 'monotonic', clock)
+    cache = TTLCache(ttl_seconds=600)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return {'error': 'HTTP 503'}
+
+    is_error = lambda v: 'error' in v
+    cache.get_or_compute('k', fetch, negative_ttl=5, is_error=is_error)
+    cache.get_or_compute('k', fetch, negative_ttl=5, is_error=is_error)
+    assert len(calls) == 1
+
+    clock.now += 6
+    cache.get_or_compute('k', fetch, negative_ttl=5, is_error=is_error)
+    assert len(calls) == 2
+
+
+def test_aget_or_compute_single_flight():
+    import asyncio
+
+    cache = TTLCache(ttl_seconds=60)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 'hotels'
+
+    async def main():
+        return await asyncio.gather(*[cache.aget_or_compute(('goa',), fetch) for _ in range(10)])
+
+    assert asyncio.run(main()) == ['hotels'] * 10
+    assert calls == [1]
+
+
+def test_stale_while_revalidate(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_utils.time, 'monotonic', clock)
+    cache = TTLCache(ttl_seconds=10, hard_ttl_seconds=100)
+    refreshed = threading.Event()
+
+    def fetch_v2():
+        refreshed.set()
+        return 'v2'
+
+    cache.set('v1', 'k')
+    clock.now += 20  # past soft TTL, within hard TTL
+
+    # Served immediately; refresh happens in the background.
+    assert cache.get_or_compute('k', fetch_v2) == 'v1'
+    assert refreshed.wait(5)
+    while cache.stats()['inflight']:
+        pass
+    assert cache.get_or_compute('k', lambda: 'v3') == 'v2'
+    assert cache.stats()['stale_hits'] == 1
+
+    clock.now += 200  # past hard TTL: caller blocks on a fresh value
+    assert cache.get_or_compute('k', lambda: 'v4') == 'v4'
+
+
+def test_failed_refresh_keeps_stale_value(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_utils.time, 'monotonic', clock)
+    cache = TTLCache(ttl_seconds=10, hard_ttl_seconds=100)
+    cache.set('v1', 'k')
+    clock.now += 20
+
+    def failing():
+        raise RuntimeError('provider down')
+
+    assert cache.get_or_compute('k', failing) == 'v1'
+    while cache.stats()['inflight']:
+        pass
+    assert cache.get_or_compute('k', failing) == 'v1'
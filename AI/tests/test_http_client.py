@@ -0,0 +1,135 @@
+import sys
+import os
+
+# Add AI folder to path so direct imports work
+ai_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ai_folder not in sys.path:
+    sys.path.insert(0, ai_folder)
+
+import pytest
+import requests
+import requests_mock
+
+from zapi.http_client import ProviderHTTPClient
+from zapi.resilience import BreakerRegistry, CircuitOpenError, RetryBudget
+from zapi.scheduler import QuotaExceededError, SerpAPIScheduler
+
+URL = 'https://serpapi.com/search'
+
+
+def make_client(**kwargs):
+    kwargs.setdefault('breakers', BreakerRegistry())
+    kwargs.setdefault('retry_budget', RetryBudget())
+    kwargs.setdefault('scheduler', SerpAPIScheduler(rate_per_sec=1000))
+    return ProviderHTTPClient(retry_wait_min=0, retry_wait_max=0, **kwargs)
+
+
+def test_get_json_retries_non_200():
+    client = make_client()
+    with requests_mock.Mocker() as m:
+        m.get(URL, [{'status_code': 503}, {'status_code': 200, 'json': {'properties': []}}])
+        assert client.get_json(URL, params={'q': 'goa'}) == {'properties': []}
+        assert m.call_count == 2
+
+
+def test_get_json_gives_up_after_max_attempts():
+    client = make_client()
+    with requests_mock.Mocker() as m:
+        m.get(URL, status_code=500)
+        with pytest.raises(requests.exceptions.RequestException):
+            client.get_json(URL)
+        assert m.call_count == 3
+
+
+def test_get_returns_non_200_response():
+    client = make_client()
+    with requests_mock.Mocker() as m:
+        m.get(URL, status_code=401, text='bad key')
+        resp = client.get(URL)
+        assert resp.status_code == 401
+        assert m.call_count == 1
+
+
+def test_open_breaker_fails_fast():
+    client = make_client(breakers=BreakerRegistry(failure_threshold=2, reset_timeout=60))
+    with requests_mock.Mocker() as m:
+        m.get(URL, status_code=503)
+        # The second failure opens the breaker and cuts the retry ladder short.
+        with pytest.raises(CircuitOpenError):
+            client.get_json(URL, params={'engine': 'google_hotels'})
+        assert m.call_count == 2
+
+        with pytest.raises(CircuitOpenError):
+            client.get_json(URL, params={'engine': 'google_hotels'})
+        assert m.call_count == 2
+
+        # Other SerpAPI engines have their own breaker.
+        m.get(URL, json={'flights': []})
+        assert client.get_json(URL, params={'engine': 'google_flights'}) == {'flights': []}
+
+    stats = client.breakers.stats()
+    assert stats['serpapi.com:google_hotels']['state'] == 'open'
+    assert stats['serpapi.com:google_flights']['state'] == 'closed'
+
+
+def test_half_open_probe_closes_breaker():
+    breakers = BreakerRegistry(failure_threshold=1, reset_timeout=0)
+    client = make_client(breakers=breakers, max_attempts=1)
+    with requests_mock.Mocker() as m:
+        m.get(URL, status_code=500)
+        with pytest.raises(requests.exceptions.RequestException):
+            client.get_json(URL)
+        m.get(URL, json={'ok': True})
+        assert client.get_json(URL) == {'ok': True}
+    assert breakers.stats()['serpapi.com']['state'] == 'closed'
+
+
+def test_exhausted_retry_budget_stops_retries():
+    budget = RetryBudget(ratio=0, min_per_sec=0, max_tokens=1)
+    client = make_client(retry_budget=budget)
+    with requests_mock.Mocker() as m:
+        m.get(URL, status_code=500)
+        with pytest.raises(requests.exceptions.RequestException):
+            client.get_json(URL)
+        assert m.call_count == 2  # one budgeted retry, then give up
+    assert budget.stats()['denied'] == 1
+
+
+def test_scheduler_error_does_not_leak_half_open_probe():
+    breakers = BreakerRegistry(failure_threshold=1, reset_timeout=0)
+    scheduler = SerpAPIScheduler(rate_per_sec=1000)
+    client = make_client(breakers=breakers, scheduler=scheduler, max_attempts=1)
+    with requests_mock.Mocker() as m:
+        m.get(URL, status_code=500)
+        with pytest.raises(requests.exceptions.RequestException):
+            client.get_json(URL)
+        assert breakers.get('serpapi.com').state == 'half_open'
+
+        real_acquire = scheduler.acquire
+
+        def quota_gone(*args, **kwargs):
+            raise QuotaExceededError('monthly quota used up')
+
+        scheduler.acquire = quota_gone
+        with pytest.raises(QuotaExceededError):
+            client.get_json(URL)
+        scheduler.acquire = real_acquire
+
+        # The probe slot is still free, so the next call can close the breaker.
+        m.get(URL, json={'ok': True})
+        assert client.get_json(URL) == {'ok': True}
+    assert breakers.stats()['serpapi.com']['state'] == 'closed'
+
+
+def test_unexpected_error_releases_probe():
+    breakers = BreakerRegistry(failure_threshold=1, reset_timeout=0)
+    breaker = breakers.get('serpapi.com')
+    breaker.record_failure()
+    client = make_client(breakers=breakers, max_attempts=1)
+    with requests_mock.Mocker() as m:
+        m.get(URL, exc=KeyError('boom'))
+        with pytest.raises(KeyError):
+            client.get(URL)
+        m.get(URL, json={'ok': True})
+        assert client.get_json(URL) == {'ok': True}
+    assert breaker.state == 'closed'
@@ -0,0 +1,105 @@
+import os
+import sys
+import threading
+
+# Add AI folder to path so direct imports work
+ai_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ai_folder not in sys.path:
+    sys.path.insert(0, ai_folder)
+
+from itinerary_sections import Itinerary, classify_request, refine_sections
+
+TEXT = """## Flights
+1. IndiGo 6E 1 — ₹5,400 per person
+
+## Hotels
+- Budget: Zostel
+
+## Day 1: Arrival
+### Morning
+Check in.
+### Evening
+Baga beach.
+
+## Day 2
+Old Goa churches.
+
+## Day 3
+Spice farm.
+
+## Transport tips
+Rent a scooter.
+
+## Budget
+| Tier | Total |"""
+
+
+def test_parse_roundtrip_and_keys():
+    itinerary = Itinerary.from_text(TEXT)
+    assert itinerary.keys() == ['flights', 'hotels', 'day-1', 'day-2', 'day-3', 'transport', 'budget']
+    assert '### Evening' in itinerary.get('day-1').body
+    assert itinerary.to_text() == TEXT
+
+
+def test_classify_request():
+    itinerary = Itinerary.from_text(TEXT)
+    assert classify_request('add more nightlife on day 2', itinerary) == ['day-2']
+    assert classify_request('swap the last day for a beach day', itinerary) == ['day-3']
+    assert classify_request('pick a non-stop flight', itinerary) == ['flights']
+    assert classify_request('more shopping, fewer museums', itinerary) == ['day-1', 'day-2', 'day-3']
+    assert classify_request('make it more budget friendly', itinerary) == ['day-1', 'day-2', 'day-3', 'budget']
+    assert classify_request('cheaper hotel please', itinerary) == ['hotels', 'budget']
+
+
+def test_refine_regenerates_only_touched_sections():
+    prompts = []
+    lock = threading.Lock()
+
+    def llm(prompt, max_tokens):
+        with lock:
+            prompts.append(prompt)
+        return '## Day 2\nAnjuna night market.'
+
+    updated, keys = refine_sections(Itinerary.from_text(TEXT), 'add nightlife on day 2', llm)
+
+    assert keys == ['day-2']
+    assert len(prompts) == 1
+    assert 'Old Goa churches.' in prompts[0] and 'Spice farm.' not in prompts[0]
+    assert updated.get('day-2').body == 'Anjuna night market.'
+    assert updated.get('day-3').body == 'Spice farm.'
+    assert updated.to_text().count('## Day 2') == 1
+
+
+def test_unstructured_itinerary_falls_back_to_full_rewrite():
+    calls = []
+    updated, keys = refine_sections(
+        Itinerary.from_text('Visit beaches, then eat.'),
+        'more food',
+        lambda prompt, max_tokens: calls.append(max_tokens) or 'Visit beaches, then eat fish thali.',
+    )
+    assert keys == ['itinerary']
+    assert calls == [2048]
+    assert updated.to_text() == 'Visit beaches, then eat fish thali.'
+
+
+def test_planned_sections_are_rerendered_not_rewritten():
+    prompts = []
+    rendered = []
+
+    def rerender(request, keys):
+        rendered.append(keys)
+        return {'hotels': '## Hotels\n- Budget: Cheap Inn', 'budget': '## Budget\n| Low | ₹9,000 |'}
+
+    updated, keys = refine_sections(
+        Itinerary.from_text(TEXT),
+        'switch to a cheaper hotel',
+        lambda prompt, max_tokens: prompts.append(prompt) or 'x',
+        rerender=rerender,
+    )
+
+    assert keys == ['hotels', 'budget']
+    assert rendered == [['hotels', 'budget']]
+    assert prompts == []
+    assert updated.get('hotels').body == '- Budget: Cheap Inn'
+    assert updated.get('budget').body == '| Low | ₹9,000 |'
+    assert updated.get('day-1').body == Itinerary.from_text(TEXT).get('day-1').body
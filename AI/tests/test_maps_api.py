@@ -0,0 +1,60 @@
+import sys
+import os
+
+# Add AI folder to path so direct imports work
+ai_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ai_folder not in sys.path:
+    sys.path.insert(0, ai_folder)
+
+import pytest
+import requests_mock
+
+from zapi import maps_api
+
+URL = 'https://serpapi.com/search'
+
+
+def matrix_response(request, context):
+    origins = request.qs['origins'][0].split('|')
+    destinations = request.qs['destinations'][0].split('|')
+    return {'distance_matrix': {'rows': [
+        {'elements': [
+            {'distance': {'text': f'{i + j + 1} km'}, 'duration': {'text': f'{i + j + 5} mins'}}
+            for j in range(len(destinations))
+        ]}
+        for i in range(len(origins))
+    ]}}
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(maps_api, 'distance_cache', maps_api.TTLCache(ttl_seconds=60))
+
+
+def test_matrix_packs_pairs_into_few_requests():
+    origins = [f'Hotel {i}' for i in range(12)]
+    destinations = [f'Place {j}' for j in range(12)]
+    with requests_mock.Mocker() as m:
+        m.get(URL, json=matrix_response)
+        result = maps_api.get_distance_matrix(origins, destinations)
+
+        # 144 elements at <= 100 per request
+        assert m.call_count == 2
+        for req in m.request_history:
+            n = len(req.qs['origins'][0].split('|')) * len(req.qs['destinations'][0].split('|'))
+            assert n <= maps_api.MAX_ELEMENTS
+
+    assert len(result) == 144
+    assert result[('Hotel 0', 'Place 0')]['distance'] == '1 km'
+
+
+def test_pair_cache_is_symmetric():
+    with requests_mock.Mocker() as m:
+        m.get(URL, json=matrix_response)
+        maps_api.get_distance_matrix(['Goa airport'], ['Baga Beach', 'Fort Aguada'])
+        assert m.call_count == 1
+
+        reverse = maps_api.get_distances([('baga beach', 'Goa Airport'), ('Fort Aguada', 'Goa airport')])
+        assert m.call_count == 1
+        assert reverse[0]['distance'] == '1 km'
+        assert reverse[0]['origin'] == 'baga beach'
@@ -0,0 +1,55 @@
+import logging
+import os
+import sys
+
+# Add AI folder to path so direct imports work
+ai_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ai_folder not in sys.path:
+    sys.path.insert(0, ai_folder)
+
+from prompt_compactor import PLACE_COLUMNS, PromptCompactor, count_tokens, truncate_tokens
+
+FLIGHT_COLUMNS = [('airline', 'airline'), ('flight_number', 'flight'), ('outbound_departure', 'depart'),
+                  ('inbound_arrival', 'arrive'), ('duration', 'mins'), ('stops', 'stops'), ('price', 'price')]
+
+FLIGHTS = [
+    {'airline': 'Vistara', 'flight_number': 'UK 843', 'duration': 150, 'stops': 0, 'price': 7200,
+     'currency': 'INR', 'passengers': 2, 'cabin_class': 'economy'},
+    {'airline': 'IndiGo', 'flight_number': '6E 231', 'duration': 145, 'stops': 0, 'price': 5400,
+     'currency': 'INR', 'passengers': 2, 'cabin_class': 'economy'},
+    {'airline': 'Air India', 'flight_number': 'AI 883', 'stops': 1, 'price': None},
+]
+
+
+def test_table_is_dense_and_sorted():
+    compactor = PromptCompactor()
+    out = compactor.table('flights', FLIGHTS, FLIGHT_COLUMNS, sort_key='price')
+    lines = out.splitlines()
+
+    assert lines[0] == 'airline | flight | depart | arrive | mins | stops | price'
+    assert lines[1] == 'IndiGo | 6E 231 | - | - | 145 | 0 | 5400'
+    assert lines[3].startswith('Air India')  # missing price sorts last
+    assert 'cabin_class' not in out and 'None' not in out
+    assert compactor.after['flights'] < compactor.before['flights']
+
+
+def test_table_respects_budget():
+    places = [{'title': f'Beach {i}', 'category': 'Beaches', 'rating': 4.1, 'reviews': 1200} for i in range(50)]
+    compactor = PromptCompactor(budgets={'activities': 60})
+    out = compactor.table('activities', places, PLACE_COLUMNS)
+
+    assert count_tokens(out) <= 60 + 10  # budget plus the "omitted" note
+    assert out.splitlines()[-1].endswith('more omitted)')
+
+
+def test_text_truncation_and_report(caplog):
+    compactor = PromptCompactor(budgets={'rag': 20})
+    rag = compactor.text('rag', 'Goa is best visited between November and February. ' * 20)
+    assert count_tokens(rag) <= 22
+    assert rag.endswith('…')
+    assert truncate_tokens('short', 20) == 'short'
+
+    with caplog.at_level(logging.INFO, logger='travelai.prompt'):
+        totals = compactor.report('PROMPT ' + rag)
+    assert totals['before'] > totals['after']
+    assert 'prompt input tokens' in caplog.text
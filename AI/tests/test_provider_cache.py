@@ -0,0 +1,126 @@
+import sys
+import os
+
+# Add AI folder to path so direct imports work
+ai_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ai_folder not in sys.path:
+    sys.path.insert(0, ai_folder)
+
+import provider_cache
+from provider_cache import ProviderCache, normalize_date
+from zapi.flight_api import search_flights_flexible
+from zapi.scheduler import BACKGROUND, current_priority, priority
+
+
+def test_normalize_date():
+    assert normalize_date('10-12-2025') == '2025-12-10'
+    assert normalize_date('2025-12-10') == '2025-12-10'
+
+
+def test_weather_cached_with_normalized_city(monkeypatch):
+    calls = []
+
+    def fake_weather(city):
+        calls.append(city)
+        return f"Weather in {city}: Sunny."
+
+    monkeypatch.setattr(provider_cache, 'get_weather', fake_weather)
+    providers = ProviderCache()
+
+    providers.weather('Goa')
+    providers.weather('  goa ')
+
+    assert calls == ['goa']
+    stats = providers.stats()['weather']
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+
+
+def test_flights_key_normalizes_dates(monkeypatch):
+    calls = []
+
+    def fake_flights(**kwargs):
+        calls.append(kwargs)
+        return {'flights': [{'price': 100}]}
+
+    monkeypatch.setattr(provider_cache, 'search_flights_serpapi', fake_flights)
+    providers = ProviderCache()
+
+    providers.flights('del', 'goi', '10-12-2025', '12-12-2025')
+    providers.flights('DEL', 'GOI', '2025-12-10', '2025-12-12')
+
+    assert len(calls) == 1
+    assert calls[0]['depart_date'] == '2025-12-10'
+
+
+def test_errors_are_not_cached(monkeypatch):
+    calls = []
+
+    def fake_hotels(**kwargs):
+        calls.append(kwargs)
+        return {'error': 'HTTP 500'}
+
+    monkeypatch.setattr(provider_cache, 'search_hotels_serpapi', fake_hotels)
+    providers = ProviderCache()
+
+    providers.hotels('goa', '2025-12-10', '2025-12-12')
+    providers.hotels('goa', '2025-12-10', '2025-12-12')
+
+    assert len(calls) == 2
+
+
+def test_fare_calendar_reuses_exact_date_cells(monkeypatch):
+    calls = []
+
+    def fake_flights(**kwargs):
+        calls.append((kwargs['depart_date'], kwargs['return_date']))
+        price = 1000 + 10 * len(calls)
+        if kwargs['depart_date'] == '2030-01-09':
+            price = 500
+        return {'flights': [{'price': price, 'airline': 'IndiGo'}]}
+
+    monkeypatch.setattr(provider_cache, 'search_flights_serpapi', fake_flights)
+    providers = ProviderCache()
+
+    calendar = providers.fare_calendar('DEL', 'GOI', '2030-01-10', '2030-01-12', flex_days=1)
+
+    # 3 x 3 window minus the same-day 01-11/01-11 pair.
+    assert len(calls) == 8
+    assert calendar['depart_dates'] == ['2030-01-09', '2030-01-10', '2030-01-11']
+    assert calendar['prices'][2][0] is None
+    assert calendar['cheapest']['depart_date'] == '2030-01-09'
+    assert calendar['cheapest']['price'] == 500
+
+    # Exact-date search and a repeat calendar are served from cache.
+    providers.flights('DEL', 'GOI', '2030-01-10', '2030-01-12')
+    providers.fare_calendar('DEL', 'GOI', '2030-01-10', '2030-01-12', flex_days=1)
+    assert len(calls) == 8
+
+
+def test_fare_calendar_without_fares_is_not_cached(monkeypatch):
+    calls = []
+
+    def fake_flights(**kwargs):
+        calls.append(kwargs)
+        return {'error': 'HTTP 429'}
+
+    monkeypatch.setattr(provider_cache, 'search_flights_serpapi', fake_flights)
+    providers = ProviderCache()
+
+    first = providers.fare_calendar('DEL', 'GOI', '2030-01-10', '2030-01-12', flex_days=1)
+    providers.fare_calendar('DEL', 'GOI', '2030-01-10', '2030-01-12', flex_days=1)
+
+    assert 'error' in first
+    assert len(calls) == 16  # every cell retried on the second call
+
+
+def test_fare_calendar_cells_keep_caller_priority():
+    seen = []
+
+    def fake_search(**kwargs):
+        seen.append(current_priority())
+        return {'flights': [{'price': 1000, 'airline': 'IndiGo'}]}
+
+    with priority(BACKGROUND):
+        search_flights_flexible('DEL', 'GOI', '2030-01-10', '2030-01-12', flex_days=1, search=fake_search)
+    assert len(seen) == 8 and set(seen) == {BACKGROUND}
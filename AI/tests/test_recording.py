@@ -0,0 +1,93 @@
+import asyncio
+import gzip
+import json
+import os
+import sys
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+# Add AI folder to path so direct imports work
+ai_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ai_folder not in sys.path:
+    sys.path.insert(0, ai_folder)
+
+from zapi.recording import (
+    AsyncReplayTransport,
+    FixtureCorpus,
+    RecordingAdapter,
+    ReplayAdapter,
+    ReplayPolicy,
+    fixture_key,
+    normalize_body,
+)
+
+URL = 'https://serpapi.com/search'
+
+
+def test_fixture_key_drops_secrets_and_sorts_params():
+    a = fixture_key('get', URL + '?q=goa&engine=tripadvisor&api_key=SECRET')
+    b = fixture_key('GET', URL + '?api_key=OTHER&engine=tripadvisor&q=goa')
+    assert a == b == 'GET serpapi.com/search?engine=tripadvisor&q=goa'
+
+
+def test_normalize_body_strips_volatile_fields():
+    body = json.dumps({'search_metadata': {'id': 'x1'}, 'hotels': [1, 2]}).encode()
+    assert normalize_body(body, 'application/json') == '{"hotels":[1,2]}'
+
+
+def test_record_then_replay_roundtrip(tmp_path, monkeypatch):
+    path = str(tmp_path / 'corpus.jsonl.gz')
+
+    def fake_send(self, request, **kwargs):
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.headers['Content-Type'] = 'application/json'
+        resp._content = b'{"search_metadata": {"id": "abc"}, "places": ["Fort Aguada"]}'
+        resp.request = request
+        return resp
+
+    monkeypatch.setattr(HTTPAdapter, 'send', fake_send)
+    recorder = requests.Session()
+    recorder.mount('https://', RecordingAdapter(FixtureCorpus(path)))
+    recorder.get(URL, params={'engine': 'tripadvisor', 'q': 'goa', 'api_key': 'SECRET'})
+    monkeypatch.undo()
+
+    with gzip.open(path, 'rt') as f:
+        assert 'SECRET' not in f.read()
+
+    replayer = requests.Session()
+    replayer.mount('https://', ReplayAdapter(FixtureCorpus(path)))
+    resp = replayer.get(URL, params={'q': 'goa', 'engine': 'tripadvisor', 'api_key': 'ANY'})
+    assert resp.status_code == 200
+    assert resp.json() == {'places': ['Fort Aguada']}
+
+    missing = replayer.get(URL, params={'q': 'goa', 'engine': 'google_hotels'})
+    assert missing.status_code == 404
+
+
+def test_replay_policy_injects_errors_deterministically(tmp_path):
+    corpus = FixtureCorpus(str(tmp_path / 'c.jsonl.gz'))
+    corpus.put(fixture_key('GET', URL + '?q=goa'), 200, 'application/json', '{"ok":true}')
+
+    def statuses(seed):
+        session = requests.Session()
+        session.mount('https://', ReplayAdapter(corpus, ReplayPolicy(error_rate=0.5, seed=seed)))
+        return [session.get(URL, params={'q': 'goa'}).status_code for _ in range(20)]
+
+    first = statuses(7)
+    assert first == statuses(7)
+    assert set(first) == {200, 503}
+
+
+def test_async_replay_transport(tmp_path):
+    corpus = FixtureCorpus(str(tmp_path / 'c.jsonl.gz'))
+    corpus.put(fixture_key('GET', URL + '?q=goa'), 200, 'application/json', '{"ok":true}')
+
+    async def run():
+        async with httpx.AsyncClient(transport=AsyncReplayTransport(corpus)) as client:
+            resp = await client.get(URL, params={'q': 'goa', 'api_key': 'k'})
+            return resp.status_code, resp.json()
+
+    assert asyncio.run(run()) == (200, {'ok': True})
@@ -0,0 +1,46 @@
+import logging
+import os
+import sys
+
+# Add AI folder to path so direct imports work
+ai_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ai_folder not in sys.path:
+    sys.path.insert(0, ai_folder)
+
+from zapi import records
+from zapi.hotel_api import _parse_hotels
+from zapi.tripadvisor_api import _parse_places
+from zapi.records import HotelOption, Place, prompt_rows
+
+
+def test_empty_result_drops_raw_body():
+    body = {'search_metadata': {'id': 'x'}, 'properties': []}
+    result = _parse_hotels(body, 'INR', 5)
+    assert result == {'error': 'No hotels returned'}
+
+
+def test_raw_body_goes_to_opt_in_debug_log(monkeypatch, caplog):
+    monkeypatch.setattr(records.debug_logger, 'propagate', True)
+    with caplog.at_level(logging.DEBUG, logger='travelai.provider_payloads'):
+        _parse_places({'organic_results': [], 'note': 'empty'}, 5)
+    assert 'tripadvisor No Tripadvisor places found' in caplog.text
+    assert '"note":"empty"' in caplog.text
+
+
+def test_projections():
+    data = {'properties': [{'name': 'Taj', 'overall_rating': 4.6, 'address': 'Goa', 'thumbnail': 'http://img'}]}
+    hotel = _parse_hotels(data, 'INR', 5)['hotels'][0]
+
+    # Cache/API projection keeps typed fields and drops Nones and image URLs.
+    assert hotel == {'name': 'Taj', 'rating': 4.6, 'currency': 'INR', 'address': 'Goa'}
+    # Prompt projection drops fields the prompt never uses.
+    assert prompt_rows('hotels', [hotel]) == [{'name': 'Taj', 'rating': 4.6, 'currency': 'INR', 'address': 'Goa'}]
+    full = HotelOption(name='Taj', image='http://img')
+    assert full.to_dict() == {'name': 'Taj', 'image': 'http://img'}
+    assert HotelOption.from_dict(full.to_dict()).to_compact() == {'name': 'Taj'}
+
+
+def test_records_are_slotted():
+    place = Place(title='Fort Aguada', link='http://x')
+    assert not hasattr(place, '__dict__')
+    assert 'link' not in place.to_prompt()
@@ -0,0 +1,120 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# Add AI folder to path so direct imports work
+ai_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ai_folder not in sys.path:
+    sys.path.insert(0, ai_folder)
+
+from zapi.scheduler import (
+    BACKGROUND,
+    INTERACTIVE,
+    QuotaExceededError,
+    SchedulerTimeout,
+    SerpAPIScheduler,
+    current_priority,
+    priority,
+)
+from cache_utils import background_refresh
+
+
+def test_interactive_overtakes_queued_background():
+    scheduler = SerpAPIScheduler(rate_per_sec=20, burst=1)
+    scheduler.acquire(INTERACTIVE)  # drain the burst
+    order = []
+
+    def worker(level, name):
+        scheduler.acquire(level)
+        order.append(name)
+
+    background = [threading.Thread(target=worker, args=(BACKGROUND, f'bg{i}')) for i in range(3)]
+    for t in background:
+        t.start()
+    time.sleep(0.01)
+    interactive = threading.Thread(target=worker, args=(INTERACTIVE, 'user'))
+    interactive.start()
+    for t in background + [interactive]:
+        t.join()
+
+    assert order.index('user') <= 1
+    stats = scheduler.stats()
+    assert stats['granted'] == {'interactive': 2, 'background': 3}
+    assert stats['queue_depth'] == {'interactive': 0, 'background': 0}
+
+
+def test_quota_reserves_share_for_interactive():
+    scheduler = SerpAPIScheduler(rate_per_sec=1000, monthly_quota=10, interactive_reserve=0.2)
+    for _ in range(8):
+        scheduler.acquire(BACKGROUND)
+    with pytest.raises(QuotaExceededError):
+        scheduler.acquire(BACKGROUND)
+    scheduler.acquire(INTERACTIVE)
+    scheduler.acquire(INTERACTIVE)
+    with pytest.raises(QuotaExceededError):
+        scheduler.acquire(INTERACTIVE)
+    assert scheduler.stats()['quota_rejected'] == 2
+
+
+def test_acquire_timeout():
+    scheduler = SerpAPIScheduler(rate_per_sec=0.1, burst=1)
+    scheduler.acquire()
+    with pytest.raises(SchedulerTimeout):
+        scheduler.acquire(timeout=0.05)
+    assert scheduler.stats()['queue_depth']['interactive'] == 0
+
+
+def test_coalesce_shares_one_call():
+    scheduler = SerpAPIScheduler()
+    calls = []
+    gate = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        gate.wait(1)
+        return {'hotels': []}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(scheduler.coalesce('k', fetch))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    gate.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [{'hotels': []}] * 4
+    assert scheduler.stats()['coalesced'] == 3
+
+
+def test_async_coalesce_and_acquire():
+    scheduler = SerpAPIScheduler(rate_per_sec=1000)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await scheduler.aacquire()
+        await asyncio.sleep(0.01)
+        return 42
+
+    async def run():
+        return await asyncio.gather(*(scheduler.acoalesce('k', fetch) for _ in range(3)))
+
+    assert asyncio.run(run()) == [42, 42, 42]
+    assert len(calls) == 1
+
+
+def test_priority_context():
+    assert current_priority() == INTERACTIVE
+    with priority(BACKGROUND):
+        assert current_priority() == BACKGROUND
+    token = background_refresh.set(True)
+    try:
+        assert current_priority() == BACKGROUND
+    finally:
+        background_refresh.reset(token)
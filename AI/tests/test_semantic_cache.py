@@ -0,0 +1,105 @@
+import os
+import sys
+
+import numpy as np
+
+# Add AI folder to path so direct imports work
+ai_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ai_folder not in sys.path:
+    sys.path.insert(0, ai_folder)
+
+from semantic_cache import SemanticCache, guard_terms
+
+DIM = 64
+SYNONYMS = {"when": "time", "should": "best", "go": "visit", "i": "to"}
+
+
+def embed(texts):
+    """Bag-of-words stand-in for MiniLM: paraphrases map onto the same words."""
+    out = np.zeros((len(texts), DIM), dtype="float32")
+    for row, text in enumerate(texts):
+        for word in text.split():
+            word = SYNONYMS.get(word, word)
+            out[row, sum(map(ord, word)) % DIM] += 1.0
+        out[row] /= np.linalg.norm(out[row]) or 1.0
+    return out
+
+
+def make_cache(**kwargs):
+    options = dict(threshold=0.9, ttl_seconds=60, max_entries=10, vocabulary={"goa", "kerala"})
+    options.update(kwargs)
+    return SemanticCache(embed, DIM, **options)
+
+
+def test_paraphrase_hits_and_unrelated_misses():
+    cache = make_cache()
+    cache.store("Best time to visit Goa?", "November to February.")
+
+    assert cache.lookup("when should I go to Goa") == "November to February."
+    assert cache.lookup("cheap hotels in Goa") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_guard_terms_block_different_places_and_numbers():
+    assert guard_terms("3 days in Goa", {"goa"}) == frozenset({"3", "goa"})
+
+    cache = make_cache(threshold=0.5)
+    cache.store("best time to visit goa", "Nov-Feb")
+    cache.store("plan 3 days", "three day plan")
+    assert cache.lookup("best time to visit kerala") is None
+    assert cache.lookup("plan 5 days") is None
+    assert cache.lookup("plan 3 days") == "three day plan"
+
+
+def test_ttl_and_lru_eviction():
+    cache = make_cache(ttl_seconds=0)
+    cache.store("best time to visit goa", "Nov-Feb")
+    assert cache.lookup("best time to visit goa") is None
+    assert cache.stats()["size"] == 0
+
+    cache = make_cache(max_entries=2)
+    cache.store("alpha question", "a")
+    cache.store("beta question", "b")
+    assert cache.lookup("alpha question") == "a"   # alpha becomes most recent
+    cache.store("gamma question", "c")
+    assert cache.lookup("beta question") is None
+    assert cache.lookup("alpha question") == "a"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_false_hit_feedback():
+    cache = make_cache()
+    cache.store("best time to visit goa", "Nov-Feb")
+    assert cache.lookup("when should I go to goa") == "Nov-Feb"
+
+    assert cache.report_false_hit("when should I go to goa") is True
+    assert cache.lookup("when should I go to goa") is None
+    stats = cache.stats()
+    assert stats["false_hits"] == 1
+    assert stats["false_hit_rate"] == 1.0
+    assert cache.report_false_hit("nothing cached like this") is False
+
+
+def test_embedding_runs_outside_the_lock():
+    held = []
+
+    def checking_embed(texts):
+        held.append(cache._lock.locked())
+        return embed(texts)
+
+    cache = SemanticCache(checking_embed, DIM, threshold=0.9, ttl_seconds=60, max_entries=10)
+    cache.store("best time to visit goa", "Nov to Feb")
+    assert cache.lookup("best time to visit kerala") is None
+    assert cache.report_false_hit("what to eat in goa") is False
+    assert held and not any(held)
+
+
+def test_place_vocabulary_covers_destination_dataset(tmp_path):
+    from places import PLACE_NAMES, load_destination_names
+
+    assert {'manali', 'leh ladakh', 'uttar pradesh'} <= PLACE_NAMES
+    assert guard_terms('best time to visit manali', PLACE_NAMES) != guard_terms('best time to visit ooty', PLACE_NAMES)
+
+    (tmp_path / 'City.csv').write_text('City,Ratings\n  Mount   Abu ,4.1\n')
+    assert load_destination_names(str(tmp_path)) == {'mount abu'}  # missing files are skipped
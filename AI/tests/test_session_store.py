@@ -0,0 +1,105 @@
+import os
+import sys
+import threading
+
+# Add AI folder to path so direct imports work
+ai_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ai_folder not in sys.path:
+    sys.path.insert(0, ai_folder)
+
+import pytest
+
+from cache_store import SQLiteStore
+from itinerary_sections import Itinerary
+from session_store import SessionConflict, SessionStore
+
+TEXT = "## Day 1\nBeach\n\n## Day 2\nFort"
+
+
+def test_create_get_and_save():
+    sessions = SessionStore(ttl_seconds=60, max_entries=10)
+    session = sessions.create(TEXT, meta={"destination_city": "goa"})
+
+    found = sessions.get(session.session_id)
+    assert found is session  # parsed once, reused
+    assert found.itinerary.keys() == ["day-1", "day-2"]
+
+    found.itinerary = found.itinerary.replace("day-2", "Spice farm")
+    found.requests.append("swap day 2")
+    sessions.save(found)
+    assert sessions.get(session.session_id).text == "## Day 1\nBeach\n\n## Day 2\nSpice farm"
+    assert sessions.get("unknown") is None
+
+
+def test_expiry_and_lru_bound():
+    sessions = SessionStore(ttl_seconds=0, max_entries=10)
+    session = sessions.create(TEXT)
+    assert sessions.get(session.session_id) is None
+
+    sessions = SessionStore(ttl_seconds=60, max_entries=2)
+    ids = [sessions.create(TEXT).session_id for _ in range(3)]
+    assert sessions.get(ids[0]) is None
+    assert sessions.get(ids[2]) is not None
+
+
+def test_shared_tier_survives_restart(tmp_path):
+    store = SQLiteStore(str(tmp_path / "sessions.db"))
+    first = SessionStore(ttl_seconds=60, store=store)
+    session = first.create(TEXT, meta={"destination_city": "goa"})
+    session.requests.append("more food")
+    first.save(session)
+
+    # A different worker (fresh local tier) parses the shared copy once.
+    second = SessionStore(ttl_seconds=60, store=store)
+    found = second.get(session.session_id)
+    assert isinstance(found.itinerary, Itinerary)
+    assert found.text == TEXT
+    assert found.requests == ["more food"]
+    assert found.meta == {"destination_city": "goa"}
+    assert second.stats()["shared_hits"] == 1
+
+    second.delete(session.session_id)
+    assert SessionStore(ttl_seconds=60, store=store).get(session.session_id) is None
+
+
+def test_locked_serializes_updates():
+    sessions = SessionStore(ttl_seconds=60)
+    session_id = sessions.create(TEXT).session_id
+
+    def refine(i):
+        with sessions.locked(session_id):
+            session = sessions.get(session_id)
+            session.requests.append(str(i))
+            sessions.save(session)
+
+    threads = [threading.Thread(target=refine, args=(i,)) for i in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(sessions.get(session_id).requests, key=int) == [str(i) for i in range(20)]
+
+
+def test_workers_sharing_a_store_see_each_others_updates(tmp_path):
+    store = SQLiteStore(str(tmp_path / "sessions.db"))
+    a = SessionStore(ttl_seconds=60, store=store)
+    b = SessionStore(ttl_seconds=60, store=store)
+    session_id = a.create(TEXT).session_id
+    assert a.get(session_id) is a.get(session_id)  # unchanged version: no re-parse
+
+    on_b = b.get(session_id)
+    on_b.itinerary = on_b.itinerary.replace("day-2", "Spice farm")
+    b.save(on_b)
+    assert a.get(session_id).text.endswith("Spice farm")  # a's local copy was stale
+
+    # Both read the same version; the second save must not clobber the first.
+    first, second = a.get(session_id), b.get(session_id)
+    first.requests.append("from a")
+    a.save(first)
+    second.requests.append("from b")
+    with pytest.raises(SessionConflict):
+        b.save(second)
+    assert b.get(session_id).requests == ["from a"]
+
+    a.delete(session_id)
+    assert b.get(session_id) is None
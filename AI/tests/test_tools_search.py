@@ -0,0 +1,88 @@
+import os
+import sys
+import threading
+import time
+
+# Add AI folder to path so direct imports work
+ai_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ai_folder not in sys.path:
+    sys.path.insert(0, ai_folder)
+
+import tools_search
+from tools_search import normalize_query, search_results, web_search
+
+
+class FakeDDGS:
+    calls = []
+    delay = 0.0
+
+    def text(self, query, max_results=None):
+        FakeDDGS.calls.append(query)
+        time.sleep(FakeDDGS.delay)
+        return [
+            {'title': 'Goa guide', 'body': 'Beaches  and forts', 'href': 'https://www.example.com/goa/'},
+            {'title': 'Goa guide (mirror)', 'body': 'Same page', 'href': 'http://example.com/goa'},
+            {'title': 'Old Goa', 'body': 'Churches', 'href': 'https://travel.example.org/old-goa'},
+        ]
+
+
+def setup_function(_):
+    FakeDDGS.calls = []
+    FakeDDGS.delay = 0.0
+    tools_search.search_cache.clear()
+    tools_search._local.ddgs = None
+
+
+def test_normalize_query():
+    assert normalize_query('  Best  places, to visit in GOA? ') == 'best places to visit in goa'
+
+
+def test_results_deduped_compact_and_cached(monkeypatch):
+    monkeypatch.setattr(tools_search, 'DDGS', lambda **kwargs: FakeDDGS())
+
+    first = search_results('Things to do in Goa')
+    second = search_results('  things to  do in GOA ')
+    search_results('things to do in goa?')
+
+    assert first == second
+    assert [r['url'] for r in first] == ['https://www.example.com/goa/', 'https://travel.example.org/old-goa']
+    assert first[0]['snippet'] == 'Beaches and forts'
+    # case and spacing share an entry; punctuation is sent and keyed as written
+    assert FakeDDGS.calls == ['Things to do in Goa', 'things to do in goa?']
+
+
+def test_concurrent_identical_queries_share_one_call(monkeypatch):
+    monkeypatch.setattr(tools_search, 'DDGS', lambda **kwargs: FakeDDGS())
+    FakeDDGS.delay = 0.05
+
+    threads = [threading.Thread(target=web_search, args=('goa beaches',)) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert FakeDDGS.calls == ['goa beaches']
+
+
+def test_timeout_returns_message_and_is_not_cached(monkeypatch):
+    monkeypatch.setattr(tools_search, 'DDGS', lambda **kwargs: FakeDDGS())
+    monkeypatch.setattr(tools_search, 'SEARCH_TIMEOUT', 0.05)
+    FakeDDGS.delay = 0.3
+
+    assert web_search('slow query').startswith('Web search timed out')
+    assert tools_search.search_cache.stats()['size'] == 0
+
+
+def test_empty_results_use_the_short_ttl(monkeypatch):
+    monkeypatch.setattr(tools_search, 'DDGS', lambda **kwargs: FakeDDGS())
+    monkeypatch.setattr(FakeDDGS, 'text', lambda self, query, max_results=None: FakeDDGS.calls.append(query) or [])
+
+    monkeypatch.setattr(tools_search, 'SEARCH_EMPTY_TTL', 0)
+    assert search_results('nothing here') == []
+    assert search_results('nothing here') == []
+    assert FakeDDGS.calls == ['nothing here', 'nothing here']
+
+    monkeypatch.setattr(tools_search, 'SEARCH_EMPTY_TTL', 60)
+    assert search_results('still nothing') == []
+    assert search_results('still nothing') == []
+    assert FakeDDGS.calls[2:] == ['still nothing']
@@ -0,0 +1,64 @@
+import os
+import sys
+
+# Add AI folder to path so direct imports work
+ai_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ai_folder not in sys.path:
+    sys.path.insert(0, ai_folder)
+
+from cache_store import SQLiteStore
+from trip_cache import TripResultCache, normalize_interests, provider_fingerprint, request_key
+
+FLIGHTS = {"flights": [{"airline": "IndiGo", "price": 5400}]}
+
+
+def key(**overrides):
+    params = dict(
+        origin_city="delhi", destination_city="goa",
+        depart_date="2026-01-10", return_date="2026-01-13",
+        passengers=2, cabin_class="economy", interests="food, nightlife",
+        days=3, max_budget=None, flex_days=0,
+    )
+    params.update(overrides)
+    return request_key(**params)
+
+
+def test_request_key_canonicalizes():
+    assert key() == key(origin_city=" Delhi ", interests="Nightlife,food ", cabin_class="Economy")
+    assert key() != key(passengers=3)
+    assert normalize_interests("") == "sightseeing"
+
+
+def test_fingerprint_tracks_provider_data():
+    base = provider_fingerprint("sunny", FLIGHTS, {"hotels": []})
+    assert base == provider_fingerprint("sunny", {"flights": [{"price": 5400, "airline": "IndiGo"}]}, {"hotels": []})
+    assert base != provider_fingerprint("sunny", {"flights": [{"airline": "IndiGo", "price": 4900}]}, {"hotels": []})
+
+
+def test_hit_and_invalidation_on_changed_inputs():
+    cache = TripResultCache(ttl_seconds=60, store=None)
+    fp = provider_fingerprint("sunny", FLIGHTS)
+    assert cache.get(key(), fp) is None
+
+    cache.set(key(), fp, "## Day 1\nBeach")
+    assert cache.get(key(origin_city="DELHI"), fp) == "## Day 1\nBeach"
+
+    fresher = provider_fingerprint("sunny", {"flights": [{"airline": "IndiGo", "price": 4900}]})
+    assert cache.get(key(), fresher) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_ttl_follows_shortest_provider_ttl(monkeypatch):
+    monkeypatch.delenv("TRIP_CACHE_TTL", raising=False)
+    cache = TripResultCache({"weather": 600, "flights": 900, "hotels": 1800, "maps": 60}, store=None)
+    assert cache.ttl == 900  # weather and maps are not fingerprinted
+
+    monkeypatch.setenv("TRIP_CACHE_TTL", "120")
+    assert TripResultCache({"flights": 900}, store=None).ttl == 120
+
+
+def test_shared_tier(tmp_path):
+    store = SQLiteStore(str(tmp_path / "trips.db"))
+    fp = provider_fingerprint("sunny", FLIGHTS)
+    TripResultCache(ttl_seconds=60, store=store).set(key(), fp, "plan")
+    assert TripResultCache(ttl_seconds=60, store=store).get(key(), fp) == "plan"
@@ -0,0 +1,97 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# Add AI folder to path so direct imports work
+ai_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ai_folder not in sys.path:
+    sys.path.insert(0, ai_folder)
+
+from trip_jobs import CANCELLED, FAILED, SUCCEEDED, JobQueue, QueueFullError
+
+
+def test_submit_runs_and_keeps_result():
+    jobs = JobQueue(workers=2)
+
+    def plan(job):
+        job.progress("flights")
+        return {"itinerary": "## Day 1"}
+
+    job = jobs.submit(plan, meta={"destination_city": "goa"})
+    assert job.wait(5)
+    found = jobs.get(job.job_id).to_dict()
+    assert found["status"] == SUCCEEDED
+    assert found["stage"] == "flights"
+    assert found["result"] == {"itinerary": "## Day 1"}
+    jobs.shutdown()
+
+
+def test_failures_are_reported():
+    jobs = JobQueue(workers=1)
+
+    def boom(job):
+        raise ValueError("❌ Unsupported origin city: Xx")
+
+    job = jobs.submit(boom)
+    job.wait(5)
+    assert job.status == FAILED
+    assert job.to_dict()["error"] == "❌ Unsupported origin city: Xx"
+    assert "result" not in job.to_dict()
+    jobs.shutdown()
+
+
+def test_priority_order_and_queue_bound():
+    jobs = JobQueue(workers=1, max_pending=3)
+    gate = threading.Event()
+    order = []
+
+    jobs.submit(lambda job: gate.wait(5))          # occupies the only worker
+    time.sleep(0.05)
+    jobs.submit(lambda job: order.append("low"), priority="low")
+    jobs.submit(lambda job: order.append("normal"))
+    last = jobs.submit(lambda job: order.append("high"), priority="high")
+    with pytest.raises(QueueFullError):
+        jobs.submit(lambda job: None)
+
+    gate.set()
+    last.wait(5)
+    time.sleep(0.1)
+    assert order == ["high", "normal", "low"]
+    with pytest.raises(ValueError):
+        jobs.submit(lambda job: None, priority="urgent")
+    jobs.shutdown()
+
+
+def test_cancel_queued_and_running():
+    jobs = JobQueue(workers=1)
+    started = threading.Event()
+
+    def long_plan(job):
+        started.set()
+        for _ in range(100):
+            job.check_cancelled()
+            time.sleep(0.01)
+        return "finished"
+
+    running = jobs.submit(long_plan)
+    queued = jobs.submit(lambda job: "never")
+    started.wait(5)
+
+    assert jobs.cancel(queued.job_id).status == CANCELLED
+    jobs.cancel(running.job_id)
+    assert running.wait(5)
+    assert running.status == CANCELLED
+    assert jobs.stats()["pending"] == 0
+    assert jobs.cancel("unknown") is None
+    jobs.shutdown()
+
+
+def test_retention_drops_finished_jobs():
+    jobs = JobQueue(workers=1, retention_seconds=0)
+    job = jobs.submit(lambda job: "done")
+    job.wait(5)
+    assert jobs.get(job.job_id) is None
+    jobs.shutdown()
@@ -0,0 +1,106 @@
+import os
+import sys
+
+# Add AI folder to path so direct imports work
+ai_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ai_folder not in sys.path:
+    sys.path.insert(0, ai_folder)
+
+from trip_planning import (
+    TripPlan,
+    build_trip_plan,
+    parse_price,
+    rank_flights,
+    render_budget,
+    render_flights,
+    render_hotels,
+    replan,
+    rooms_for,
+    tier_hotels,
+)
+
+FLIGHTS = [
+    {'airline': 'Slow Air', 'price': 5000, 'duration': 400, 'stops': 2},
+    {'airline': 'IndiGo', 'price': 5400, 'duration': 145, 'stops': 0},
+    {'airline': 'Vistara', 'price': 7000, 'duration': 130, 'stops': 0},
+    {'airline': 'NoPrice', 'price': None},
+]
+
+HOTELS = [
+    {'name': 'Zostel', 'price': '₹900', 'rating': 4.2},
+    {'name': 'Cheap Inn', 'price': 1100, 'rating': 3.5},
+    {'name': 'Mid Inn', 'price': 3000, 'rating': 3.9},
+    {'name': 'Goa Resort', 'price': 3500, 'rating': 4.3},
+    {'name': 'Taj', 'price': {'lowest': '₹9,000', 'extracted_lowest': 9000}, 'rating': 4.5},
+    {'name': 'Unpriced', 'price': None},
+]
+
+
+def test_parse_price():
+    assert parse_price('₹5,400') == 5400
+    assert parse_price({'lowest': '₹1,250'}) == 1250
+    assert parse_price(None) is None
+
+
+def test_rank_flights_weighs_duration_and_stops():
+    ranked = rank_flights(FLIGHTS, passengers=2)
+    assert [f['airline'] for f in ranked] == ['IndiGo', 'Slow Air', 'Vistara']
+    assert ranked[0]['total'] == 10800
+
+
+def test_tier_hotels_by_price_tercile():
+    tiers = tier_hotels(HOTELS)
+    assert tiers['low']['name'] == 'Zostel'
+    assert tiers['mid']['name'] == 'Goa Resort'
+    assert tiers['high']['name'] == 'Taj'
+    assert tiers['high']['nightly'] == 9000
+
+
+def test_budget_table_math():
+    plan = build_trip_plan(FLIGHTS, HOTELS, '2030-01-10', '2030-01-13', passengers=3, days=3, max_budget=50000)
+    low = plan.budget['low']
+    # cheapest flight total, 2 rooms x 3 nights at the budget pick, 1500/person/day
+    assert low == {'flights': 15000, 'stay': 900 * 3 * 2, 'daily': 1500 * 3 * 3, 'total': 15000 + 5400 + 13500}
+    assert plan.fits_budget('low') is True
+    assert plan.fits_budget('high') is False
+    assert '⚠️ over budget' in render_budget(plan)
+
+
+def test_plan_without_data():
+    plan = build_trip_plan([], [], '2030-01-10', '2030-01-12', passengers=1, days=2)
+    assert plan.flights == [] and plan.hotels == {}
+    assert plan.budget['mid']['total'] == 3000 * 2
+
+
+def test_replan_repicks_from_stored_options():
+    flights = [
+        {**FLIGHTS[0], 'outbound_departure': '2030-01-10 06:00'},
+        {**FLIGHTS[1], 'outbound_departure': '2030-01-10 07:30'},
+        {**FLIGHTS[2], 'outbound_departure': '2030-01-10 18:45'},
+    ]
+    plan = build_trip_plan(flights, HOTELS, '2030-01-10', '2030-01-13', passengers=2, days=3, fare_calendar='cal')
+    plan = TripPlan.from_dict(plan.to_dict())
+    assert plan.hotels['high']['name'] == 'Taj'
+
+    cheaper = replan(plan, 'cheaper hotels please', ['hotels', 'budget'])
+    assert cheaper.hotels['high']['name'] != 'Taj'
+    assert cheaper.budget['high']['stay'] < plan.budget['high']['stay']
+    assert cheaper.flights == plan.flights
+
+    evening = replan(cheaper, 'an evening flight', ['flights', 'budget'])
+    assert [f['airline'] for f in evening.flights] == ['Vistara']
+    assert evening.preferences == {'hotels': 'cheaper', 'departure': 'later'}
+    assert evening.hotels == cheaper.hotels
+    assert 'Flexible dates:\ncal' in render_flights(evening)
+
+
+def test_four_passengers_book_two_rooms_everywhere():
+    assert [rooms_for(n) for n in (1, 2, 3, 4)] == [1, 1, 2, 2]
+    plan = build_trip_plan(FLIGHTS, HOTELS, '2030-01-10', '2030-01-13', passengers=4, days=3)
+    assert plan.rooms == 2
+
+    budget_pick = plan.hotels['low']['nightly']
+    assert plan.budget['low']['stay'] == budget_pick * 3 * 2
+    hotels = render_hotels(plan)
+    assert '₹900/room/night, ₹5,400 for 2 room(s) x 3 night(s)' in hotels
+    assert '2 room(s).' in render_budget(plan)
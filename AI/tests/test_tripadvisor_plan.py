@@ -0,0 +1,66 @@
+import os
+import sys
+
+# Add AI folder to path so direct imports work
+ai_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ai_folder not in sys.path:
+    sys.path.insert(0, ai_folder)
+
+from zapi import tripadvisor_api
+from zapi.tripadvisor_api import search_tripadvisor_categories
+
+PLACES = {
+    'things to do': ['Fort Aguada', 'Baga Beach', 'Basilica of Bom Jesus'],
+    'best food and restaurants': ['Gunpowder', 'Baga Beach'],
+}
+
+
+def fake_search(calls):
+    def search(city, interests=None, max_results=10, currency='INR'):
+        calls.append(interests)
+        titles = PLACES.get(interests, [])
+        if not titles:
+            return {'error': 'No Tripadvisor places found'}
+        return {'places': [{'title': t, 'link': f'https://tripadvisor.in/{t.replace(" ", "_")}?ref=x'} for t in titles]}
+    return search
+
+
+def setup_function(_):
+    tripadvisor_api.places_cache.clear()
+
+
+def test_plan_merges_dedupes_and_shares_identical_queries():
+    calls = []
+    result = search_tripadvisor_categories(
+        'Goa',
+        {'activities': 'things to do', 'food': 'best food and restaurants', 'interests': 'Things  to do'},
+        search=fake_search(calls),
+    )
+
+    assert sorted(calls) == ['best food and restaurants', 'things to do']
+    assert len(result['places']) == 4  # Baga Beach once
+    views = result['views']
+    assert [p['title'] for p in views['activities']] == ['Fort Aguada', 'Baga Beach', 'Basilica of Bom Jesus']
+    assert views['interests'] == views['activities']
+    assert [p['title'] for p in views['food']] == ['Gunpowder', 'Baga Beach']
+    baga = next(p for p in result['places'] if p['title'] == 'Baga Beach')
+    assert sorted(baga['categories']) == ['activities', 'food', 'interests']
+
+
+def test_queries_cached_per_city_and_partial_failures_tolerated():
+    calls = []
+    first = search_tripadvisor_categories(
+        'Goa', {'activities': 'things to do', 'nightlife': 'nightlife'}, search=fake_search(calls))
+    second = search_tripadvisor_categories(
+        ' goa ', {'activities': 'things to do', 'interests': 'best food and restaurants'},
+        search=fake_search(calls))
+
+    # 'things to do' is fetched once and reused by the second plan
+    assert sorted(calls) == ['best food and restaurants', 'nightlife', 'things to do']
+    assert first['views']['nightlife'] == []
+    assert [p['title'] for p in second['views']['interests']] == ['Gunpowder', 'Baga Beach']
+
+
+def test_plan_error_when_every_query_fails():
+    result = search_tripadvisor_categories('Atlantis', {'x': 'nightlife'}, search=fake_search([]))
+    assert 'error' in result
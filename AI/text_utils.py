@@ -0,0 +1,10 @@
+# text_utils.py — small text helpers shared by caches and search
+import re
+
+_NON_WORD_RE = re.compile(r"[^\w\s]")
+
+
+def normalize_query(query: str) -> str:
+    """'  Best  places, to visit in GOA? ' -> 'best places to visit in goa'"""
+    query = _NON_WORD_RE.sub(" ", (query or "").lower())
+    return " ".join(query.split())
@@ -1,30 +1,122 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
 from duckduckgo_search import DDGS
 
+from cache_utils import TTLCache
+from metrics import metrics
+from text_utils import normalize_query
+
+SEARCH_TTL = int(os.getenv("SEARCH_CACHE_TTL", "21600"))           # 6 h
+SEARCH_EMPTY_TTL = int(os.getenv("SEARCH_EMPTY_CACHE_TTL", "300"))  # no results: retry sooner
+SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT_SECONDS", "6"))    # whole search, queueing included
+SEARCH_MAX_CONCURRENCY = int(os.getenv("SEARCH_MAX_CONCURRENCY", "4"))
+SNIPPET_CHARS = 240
+
+# Normalized query -> compact results. Concurrent identical queries share one
+# DuckDuckGo call; empty results are kept for SEARCH_EMPTY_TTL only, failures
+# and timeouts are not cached.
+search_cache = TTLCache(ttl_seconds=SEARCH_TTL, max_entries=1024, max_bytes=8 * 1024 * 1024)
+metrics.register("web_search_cache", search_cache.stats)
+
+# At most SEARCH_MAX_CONCURRENCY searches run at once; each worker keeps its
+# own DDGS session instead of opening one per call.
+_executor = ThreadPoolExecutor(max_workers=SEARCH_MAX_CONCURRENCY, thread_name_prefix="web-search")
+_local = threading.local()
+
+
+def _url_key(url: str) -> str:
+    parts = urlsplit(url or "")
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return host + parts.path.rstrip("/")
+
+
+def _compact(raw: List[dict], max_results: int) -> List[Dict[str, str]]:
+    """Dedupe by URL and keep only what prompts use: title, snippet, url."""
+    seen, out = set(), []
+    for r in raw:
+        title = (r.get("title") or "").strip()
+        snippet = " ".join((r.get("body") or "").split())[:SNIPPET_CHARS]
+        link = r.get("href") or ""
+        key = _url_key(link) or title.lower()
+        if not (title or snippet) or key in seen:
+            continue
+        seen.add(key)
+        out.append({"title": title, "snippet": snippet, "url": link})
+        if len(out) >= max_results:
+            break
+    return out
+
+
+def _ddgs() -> DDGS:
+    if getattr(_local, "ddgs", None) is None:
+        _local.ddgs = DDGS(timeout=max(1, int(SEARCH_TIMEOUT)))
+    return _local.ddgs
+
+
+def _fetch(query: str, max_results: int) -> List[Dict[str, str]]:
+    metrics.incr("web_search.calls")
+    # Ask for a few extra so duplicates don't leave us short.
+    raw = _ddgs().text(query, max_results=max_results + 3) or []
+    return _compact(raw, max_results)
+
+
+def search_results(query: str, max_results: int = 5, timeout: Optional[float] = None) -> List[Dict[str, str]]:
+    """
+    Cached, time-boxed DuckDuckGo search.
+    Returns [{"title", "snippet", "url"}, ...] deduplicated by URL.
+    Raises TimeoutError if the search does not finish within `timeout`
+    (default SEARCH_TIMEOUT_SECONDS).
+    """
+    # The key is built from the query actually sent: whitespace collapsed and
+    # case folded, but punctuation kept ("C++", quoted phrases change results).
+    query = " ".join(query.split())
+    key = query.lower()
+    timeout = SEARCH_TIMEOUT if timeout is None else timeout
+
+    def fetch():
+        future = _executor.submit(_fetch, query, max_results)
+        try:
+            results = future.result(timeout=timeout)
+        except FutureTimeout:
+            future.cancel()
+            metrics.incr("web_search.timeouts")
+            raise TimeoutError(f"web search exceeded {timeout:.0f}s")
+        if not results:
+            # Cache the empty answer briefly ourselves; None is not cached
+            # by get_or_compute, so it cannot keep it for the full TTL.
+            if SEARCH_EMPTY_TTL > 0:
+                search_cache.set(results, key, max_results, ttl=SEARCH_EMPTY_TTL, hard_ttl=SEARCH_EMPTY_TTL)
+            return None
+        return results
+
+    return search_cache.get_or_compute((key, max_results), fetch) or []
+
+
+def format_results(results: List[Dict[str, str]]) -> str:
+    if not results:
+        return "No useful web results found."
+    blocks = [f"- {r['title']}\n  {r['snippet']}\n  ({r['url']})" for r in results]
+    return "Top web results:\n" + "\n\n".join(blocks)
+
 
 def web_search(query: str, max_results: int = 5) -> str:
     """
     Simple web search using DuckDuckGo.
     Returns a short, merged text summary of top results.
     """
-    query = query.strip()
-    if not query:
+    if not normalize_query(query):
         return "No query provided to web search."
 
     try:
-        results_text = []
-
-        with DDGS() as ddgs:
-            for r in ddgs.text(query, max_results=max_results):
-                title = r.get("title", "")
-                snippet = r.get("body", "")
-                link = r.get("href", "")
-                if title or snippet:
-                    results_text.append(f"- {title}\n  {snippet}\n  ({link})")
-
-        if not results_text:
-            return "No useful web results found."
-
-        # Join a few top results into one block
-        return "Top web results:\n" + "\n\n".join(results_text)
+        return format_results(search_results(query, max_results=max_results))
+    except TimeoutError as e:
+        return f"Web search timed out: {e}"
     except Exception as e:
+        metrics.incr("web_search.errors")
         return f"Error performing web search: {e}"
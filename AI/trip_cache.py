@@ -0,0 +1,165 @@
+# trip_cache.py — whole-response cache for TravelAI.plan_full_trip
+import hashlib
+import json
+import os
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from cache_store import TieredCache, open_store
+from cache_utils import TTLCache
+from metrics import metrics
+from places import canonical_city
+from provider_cache import normalize_date, normalize_text
+
+# Provider caches whose data a plan is fingerprinted on; the plan cache lives
+# no longer than the shortest-lived of them. Weather is left out: the forecast
+# text changes every refresh while the plan it shaped stays valid, so keying on
+# it would expire plans on the weather TTL instead of when fares move.
+TRIP_INPUTS = ("flights", "hotels", "tripadvisor")
+
+TRIP_CACHE_MAX_ENTRIES = int(os.getenv("TRIP_CACHE_MAX_ENTRIES", "512"))
+
+
+def normalize_interests(interests: Optional[str]) -> str:
+    """' Food,  nightlife ' and 'nightlife, food' -> 'food,nightlife'"""
+    terms = {normalize_text(t) for t in (interests or "").split(",")}
+    return ",".join(sorted(t for t in terms if t)) or "sightseeing"
+
+
+def request_key(
+    origin_city: str,
+    destination_city: str,
+    depart_date: str,
+    return_date: str,
+    passengers: int,
+    cabin_class: str,
+    interests: Optional[str],
+    days: int,
+    max_budget: Optional[int],
+    flex_days: int,
+) -> Tuple[Any, ...]:
+    """Cache key for a trip request; cities and dates must already be canonical."""
+    return (
+        normalize_text(origin_city),
+        normalize_text(destination_city),
+        depart_date,
+        return_date,
+        int(passengers),
+        normalize_text(cabin_class),
+        normalize_interests(interests),
+        int(days),
+        max_budget,
+        int(flex_days),
+    )
+
+
+def trip_request_key(
+    origin_city: str,
+    destination_city: str,
+    depart_date: str,
+    return_date: str,
+    passengers: int = 2,
+    cabin_class: str = "economy",
+    interests: Optional[str] = "sightseeing",
+    days: int = 3,
+    max_budget: Optional[int] = None,
+    flex_days: int = 0,
+) -> Tuple[Any, ...]:
+    """
+    request_key for raw plan_full_trip arguments: city aliases and states
+    resolve as the planner resolves them ('HYD' == 'hyderabad', 'kerala' ==
+    'kochi') and DD-MM-YYYY dates are accepted.
+    """
+    return request_key(
+        canonical_city(origin_city),
+        canonical_city(destination_city),
+        normalize_date(depart_date),
+        normalize_date(return_date),
+        passengers,
+        cabin_class,
+        interests,
+        days,
+        max_budget,
+        flex_days,
+    )
+
+
+def provider_fingerprint(*inputs: Any) -> str:
+    """Stable digest of the provider data a plan was generated from."""
+    raw = json.dumps(inputs, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class TripResultCache:
+    """
+    Finished itineraries keyed on the canonical trip request.
+
+    Each entry remembers the fingerprint of the provider data (flights,
+    hotels, activities, fare calendar) it was generated from. The
+    provider lookups are themselves cached, so re-checking them costs
+    milliseconds; a hit is only served when the fingerprint still matches,
+    and an entry whose inputs have changed (fresh fares, a refreshed hotel
+    list) is dropped and regenerated.
+
+    The TTL defaults to the shortest provider TTL in TRIP_INPUTS (override
+    with TRIP_CACHE_TTL); with TRAVELAI_CACHE_URL the cache is tiered like
+    the provider caches.
+
+    Usage:
+        cache = TripResultCache(providers.ttls)
+        key = request_key(...)
+        itinerary = cache.get(key, fingerprint)
+        if itinerary is None:
+            itinerary = generate()
+            cache.set(key, fingerprint, itinerary)
+    """
+
+    def __init__(
+        self,
+        provider_ttls: Optional[Dict[str, int]] = None,
+        ttl_seconds: Optional[int] = None,
+        max_entries: int = TRIP_CACHE_MAX_ENTRIES,
+        store=None,
+    ):
+        if ttl_seconds is None and os.getenv("TRIP_CACHE_TTL", "").isdigit():
+            ttl_seconds = int(os.environ["TRIP_CACHE_TTL"])
+        if ttl_seconds is None:
+            ttl_seconds = _shortest(provider_ttls or {}, TRIP_INPUTS, default=600)
+        self.ttl = ttl_seconds
+        self.store = store if store is not None else open_store()
+
+        if self.store is not None:
+            self._cache = TieredCache(self.store, "trip", ttl_seconds=ttl_seconds, max_entries=max_entries)
+        else:
+            self._cache = TTLCache(ttl_seconds=ttl_seconds, max_entries=max_entries)
+
+        metrics.register("trip_cache", self.stats)
+
+    def get(self, key: Tuple[Any, ...], fingerprint: str) -> Optional[str]:
+        entry = self._cache.get(*key)
+        if entry is None:
+            metrics.incr("trip_cache.misses")
+            return None
+        if entry.get("fingerprint") != fingerprint:
+            self._cache.delete(*key)
+            metrics.incr("trip_cache.invalidated")
+            metrics.incr("trip_cache.misses")
+            return None
+        metrics.incr("trip_cache.hits")
+        return entry["itinerary"]
+
+    def set(self, key: Tuple[Any, ...], fingerprint: str, itinerary: str) -> None:
+        self._cache.set({"fingerprint": fingerprint, "itinerary": itinerary}, *key)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._cache.stats()
+        stats["ttl_seconds"] = self.ttl
+        stats["invalidated"] = metrics.counter("trip_cache.invalidated")
+        return stats
+
+
+def _shortest(ttls: Dict[str, int], names: Iterable[str], default: int) -> int:
+    known = [ttls[n] for n in names if n in ttls]
+    return min(known) if known else default
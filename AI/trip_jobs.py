@@ -0,0 +1,249 @@
+# trip_jobs.py — local asynchronous job queue for long trip-planning requests
+import heapq
+import itertools
+import logging
+import os
+import secrets
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from metrics import metrics
+
+logger = logging.getLogger("travelai.jobs")
+
+TRIP_JOB_WORKERS = int(os.getenv("TRIP_JOB_WORKERS", "2"))
+TRIP_JOB_MAX_PENDING = int(os.getenv("TRIP_JOB_MAX_PENDING", "100"))
+TRIP_JOB_RETENTION_SECONDS = int(os.getenv("TRIP_JOB_RETENTION_SECONDS", "3600"))
+
+# Lower value = picked first.
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class QueueFullError(Exception):
+    """More than max_pending jobs are waiting; retry later."""
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job by Job.check_cancelled()."""
+
+
+@dataclass
+class Job:
+    job_id: str
+    priority: str
+    meta: Dict[str, Any] = field(default_factory=dict)
+    status: str = QUEUED
+    stage: Optional[str] = None
+    result: Any = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    cancel_requested: bool = False
+    _done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    def check_cancelled(self) -> None:
+        """Cooperative cancellation point for job functions."""
+        if self.cancel_requested:
+            raise JobCancelled(self.job_id)
+
+    def progress(self, stage: str) -> None:
+        self.stage = stage
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "priority": self.priority,
+            "stage": self.stage,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.status == SUCCEEDED:
+            out["result"] = self.result
+        if self.error:
+            out["error"] = self.error
+        return out
+
+
+class JobQueue:
+    """
+    In-process priority queue drained by a fixed pool of worker threads.
+
+    submit() returns at once with a queued Job; workers pick the highest
+    priority (then oldest) job and run `fn(job)`. The function reports its
+    stage with job.progress() and calls job.check_cancelled() between steps,
+    so cancel() stops a running job at its next step and drops a queued one
+    immediately. Finished jobs keep their result for `retention_seconds`.
+
+    Usage:
+        jobs = JobQueue(workers=2)
+        job = jobs.submit(lambda job: plan(job), priority="low")
+        jobs.get(job.job_id).wait(30)
+        jobs.cancel(job.job_id)
+    """
+
+    def __init__(
+        self,
+        workers: int = TRIP_JOB_WORKERS,
+        max_pending: int = TRIP_JOB_MAX_PENDING,
+        retention_seconds: int = TRIP_JOB_RETENTION_SECONDS,
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retention = retention_seconds
+
+        self._cond = threading.Condition()
+        # (priority, seq, job_id, fn) min-heap; cancelled jobs are skipped when popped
+        self._heap: List[Tuple[int, int, str, Callable[[Job], Any]]] = []
+        self._seq = itertools.count()
+        self._jobs: Dict[str, Job] = {}
+        self._pending = 0
+        self._running = 0
+        self._threads: List[threading.Thread] = []
+        self._closed = False
+
+        metrics.register("trip_jobs", self.stats)
+
+    # ------------------------ Public API ------------------------
+    def submit(
+        self,
+        fn: Callable[[Job], Any],
+        priority: str = "normal",
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> Job:
+        if priority not in PRIORITIES:
+            raise ValueError(f"priority must be one of {sorted(PRIORITIES)}")
+        job = Job(secrets.token_urlsafe(12), priority, meta=dict(meta or {}))
+        with self._cond:
+            self._purge_expired()
+            if self._pending >= self.max_pending:
+                metrics.incr("trip_jobs.rejected")
+                raise QueueFullError(f"{self._pending} jobs already queued")
+            self._jobs[job.job_id] = job
+            heapq.heappush(self._heap, (PRIORITIES[priority], next(self._seq), job.job_id, fn))
+            self._pending += 1
+            self._start_workers()
+            self._cond.notify()
+        metrics.incr("trip_jobs.submitted")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._cond:
+            self._purge_expired()
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued job now, or ask a running one to stop. None if unknown."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED:
+                return job
+            job.cancel_requested = True
+            if job.status == QUEUED:
+                self._pending -= 1
+                self._finish(job, CANCELLED)
+        return job
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            by_status: Dict[str, int] = {}
+            for job in self._jobs.values():
+                by_status[job.status] = by_status.get(job.status, 0) + 1
+            return {
+                "workers": self.workers,
+                "pending": self._pending,
+                "running": self._running,
+                "max_pending": self.max_pending,
+                "retained": len(self._jobs),
+                "by_status": by_status,
+            }
+
+    # ------------------------ Workers ------------------------
+    def _start_workers(self) -> None:
+        """Start the pool on first use. Holds the lock."""
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._work, name=f"trip-job-{len(self._threads)}", daemon=True
+            )
+            self._threads.append(thread)
+            thread.start()
+
+    def _next(self) -> Optional[Tuple[Job, Callable[[Job], Any]]]:
+        with self._cond:
+            while True:
+                while self._heap:
+                    _, _, job_id, fn = heapq.heappop(self._heap)
+                    job = self._jobs.get(job_id)
+                    if job is not None and job.status == QUEUED:
+                        self._pending -= 1
+                        self._running += 1
+                        job.status = RUNNING
+                        job.started_at = time.time()
+                        return job, fn
+                if self._closed:
+                    return None
+                self._cond.wait()
+
+    def _work(self) -> None:
+        while True:
+            picked = self._next()
+            if picked is None:
+                return
+            job, fn = picked
+            metrics.observe("trip_jobs.queue_seconds", job.started_at - job.created_at)
+            status, result, error = SUCCEEDED, None, None
+            try:
+                job.check_cancelled()
+                result = fn(job)
+            except JobCancelled:
+                status = CANCELLED
+            except Exception as e:
+                logger.exception("job %s failed", job.job_id)
+                status, error = FAILED, str(e) or e.__class__.__name__
+            with self._cond:
+                self._running -= 1
+                if status == SUCCEEDED and job.cancel_requested:
+                    status = CANCELLED
+                job.result = result if status == SUCCEEDED else None
+                job.error = error
+                self._finish(job, status)
+            metrics.observe("trip_jobs.run_seconds", job.finished_at - job.started_at)
+
+    def _finish(self, job: Job, status: str) -> None:
+        """Holds the lock."""
+        job.status = status
+        job.finished_at = time.time()
+        job._done.set()
+        metrics.incr(f"trip_jobs.{status}")
+
+    def _purge_expired(self) -> None:
+        """Drop finished jobs past retention. Holds the lock."""
+        cutoff = time.time() - self.retention
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.status in FINISHED and job.finished_at is not None and job.finished_at <= cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
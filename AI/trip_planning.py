@@ -0,0 +1,390 @@
+# trip_planning.py — deterministic flight/hotel selection and budget math for plan_full_trip
+import math
+import re
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+# Ranking weights for flights (lower score is better).
+FLIGHT_WEIGHTS = {"price": 0.6, "duration": 0.25, "stops": 0.15}
+
+# Per person per day spend at the destination (food, local transport,
+# entry tickets) in INR, by tier.
+DAILY_SPEND = {"low": 1500, "mid": 3000, "high": 6000}
+
+# Travellers sharing one hotel room.
+GUESTS_PER_ROOM = 2
+
+TIERS = ("low", "mid", "high")
+HOTEL_TIER_NAMES = {"low": "Budget", "mid": "Mid-range", "high": "Premium"}
+
+# Flight ranking weights for a "flights" preference set by a refinement.
+PREFERRED_FLIGHT_WEIGHTS = {
+    "cheaper": {"price": 0.85, "duration": 0.1, "stops": 0.05},
+    "faster": {"price": 0.2, "duration": 0.45, "stops": 0.35},
+}
+
+_CHEAPER_RE = re.compile(r"\b(cheap|cheaper|cheapest|budget|affordable|less expensive|lower (price|fare|cost))\b", re.I)
+
+# (section, preference, value, request wording). Later rules win.
+PREFERENCE_RULES = [
+    ("flights", "flights", "cheaper", _CHEAPER_RE),
+    ("flights", "flights", "faster", re.compile(r"\b(fast|faster|fastest|quick|quicker|shorter|direct|non-?stop)\b", re.I)),
+    ("flights", "departure", "morning", re.compile(r"\b(morning|early|earlier)\b", re.I)),
+    ("flights", "departure", "later", re.compile(r"\b(afternoon|evening|late|later)\b", re.I)),
+    ("hotels", "hotels", "cheaper", _CHEAPER_RE),
+    ("hotels", "hotels", "nicer", re.compile(r"\b(nicer|better|luxury|luxurious|premium|upscale|higher[- ]rated|(5|five)[- ]star)\b", re.I)),
+]
+
+_TIME_RE = re.compile(r"\b(\d{1,2}):\d{2}\b")
+
+
+def parse_price(value: Any) -> Optional[float]:
+    """5400, "₹5,400", {"extracted_lowest": 5400}, {"lowest": "₹5,400"} -> 5400.0"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, dict):
+        for key in ("extracted_lowest", "extracted_before_taxes_fees", "lowest", "before_taxes_fees"):
+            price = parse_price(value.get(key))
+            if price is not None:
+                return price
+        return None
+    if isinstance(value, str):
+        digits = re.sub(r"[^\d.]", "", value.replace(",", ""))
+        try:
+            return float(digits) if digits else None
+        except ValueError:
+            return None
+    return None
+
+
+def _fmt_inr(amount: float) -> str:
+    return f"₹{amount:,.0f}"
+
+
+def _fmt_minutes(minutes: Any) -> str:
+    if not isinstance(minutes, (int, float)):
+        return "-"
+    h, m = divmod(int(minutes), 60)
+    return f"{h}h {m:02d}m" if h else f"{m}m"
+
+
+# -------------------------------------------------
+# FLIGHTS
+# -------------------------------------------------
+def rank_flights(
+    flights: List[Dict[str, Any]],
+    passengers: int = 1,
+    top: int = 3,
+    weights: Optional[Dict[str, float]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Best `top` priced flights by weighted (FLIGHT_WEIGHTS by default), min-max
+    normalized price, duration and stops. Each result gets
+    "price_per_person", "total" and "score".
+    """
+    weights = weights or FLIGHT_WEIGHTS
+    priced = []
+    for f in flights:
+        price = parse_price(f.get("price")) if isinstance(f, dict) else None
+        if price is not None:
+            priced.append((f, price))
+    if not priced:
+        return []
+
+    def normalized(values):
+        lo, hi = min(values), max(values)
+        return [0.0 if hi == lo else (v - lo) / (hi - lo) for v in values]
+
+    prices = [p for _, p in priced]
+    known = [f["duration"] for f, _ in priced if isinstance(f.get("duration"), (int, float))]
+    slowest = max(known) if known else 0
+    durations = [f["duration"] if isinstance(f.get("duration"), (int, float)) else slowest for f, _ in priced]
+    stops = [f.get("stops") if isinstance(f.get("stops"), int) else 2 for f, _ in priced]
+
+    scored = []
+    for (f, price), np_, nd, ns in zip(priced, normalized(prices), normalized(durations), normalized(stops)):
+        score = weights["price"] * np_ + weights["duration"] * nd + weights["stops"] * ns
+        scored.append({
+            **f,
+            "price_per_person": price,
+            "total": price * passengers,
+            "score": round(score, 4),
+        })
+    scored.sort(key=lambda f: (f["score"], f["price_per_person"]))
+    return scored[:top]
+
+
+def _departure_hour(flight: Dict[str, Any]) -> Optional[int]:
+    match = _TIME_RE.search(str(flight.get("outbound_departure") or ""))
+    return int(match.group(1)) if match else None
+
+
+def filter_departures(flights: List[Dict[str, Any]], departure: Optional[str]) -> List[Dict[str, Any]]:
+    """Flights leaving before noon ("morning") or from noon on ("later"); all if none match."""
+    if departure not in ("morning", "later"):
+        return flights
+    kept = [
+        f for f in flights
+        if _departure_hour(f) is not None and (_departure_hour(f) < 12) == (departure == "morning")
+    ]
+    return kept or flights
+
+
+# -------------------------------------------------
+# HOTELS
+# -------------------------------------------------
+def tier_hotels(hotels: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Split priced hotels into budget/mid/premium by nightly-price tercile and
+    pick the best-rated hotel in each tier. Tiers with no hotel are omitted;
+    with fewer than three hotels the cheapest is "low", the dearest "high".
+    """
+    priced = []
+    for h in hotels:
+        price = parse_price(h.get("price")) if isinstance(h, dict) else None
+        if price is not None:
+            priced.append({**h, "nightly": price})
+    if not priced:
+        return {}
+    priced.sort(key=lambda h: h["nightly"])
+
+    n = len(priced)
+    if n < 3:
+        groups = {"low": priced[:1], "high": priced[1:]} if n == 2 else {"low": priced}
+    else:
+        a, b = math.ceil(n / 3), math.ceil(2 * n / 3)
+        groups = {"low": priced[:a], "mid": priced[a:b], "high": priced[b:]}
+
+    tiers = {}
+    for tier, group in groups.items():
+        if group:
+            tiers[tier] = max(group, key=lambda h: (h.get("rating") or 0, -h["nightly"]))
+    return tiers
+
+
+def hotel_band(hotels: List[Dict[str, Any]], band: Optional[str]) -> List[Dict[str, Any]]:
+    """The cheaper or the dearer half of the priced hotels, for re-tiering."""
+    if band not in ("cheaper", "nicer"):
+        return hotels
+    priced = sorted(
+        (h for h in hotels if isinstance(h, dict) and parse_price(h.get("price")) is not None),
+        key=lambda h: parse_price(h.get("price")),
+    )
+    if len(priced) < 2:
+        return hotels
+    half = math.ceil(len(priced) / 2)
+    return priced[:half] if band == "cheaper" else priced[len(priced) - half:]
+
+
+# -------------------------------------------------
+# BUDGET
+# -------------------------------------------------
+def rooms_for(passengers: int) -> int:
+    """Hotel rooms for a party; used for the hotel search, the hotel prices shown and the budget."""
+    return max(1, math.ceil(passengers / GUESTS_PER_ROOM))
+
+
+def trip_nights(depart_date: str, return_date: str, days: int) -> int:
+    try:
+        nights = (datetime.strptime(return_date, "%Y-%m-%d") - datetime.strptime(depart_date, "%Y-%m-%d")).days
+    except ValueError:
+        nights = 0
+    return nights if nights > 0 else max(1, days - 1)
+
+
+def budget_table(
+    flights: List[Dict[str, Any]],
+    hotel_tiers: Dict[str, Dict[str, Any]],
+    passengers: int,
+    nights: int,
+    days: int,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Low/mid/high trip totals in INR. Flights: cheapest, median and dearest of
+    the ranked options. Hotels: that tier's pick (or the nearest tier) for
+    rooms_for(passengers) rooms.
+    """
+    rooms = rooms_for(passengers)
+    flight_totals = sorted(f["total"] for f in flights)
+    table = {}
+    for i, tier in enumerate(TIERS):
+        flight_cost = flight_totals[min(i * len(flight_totals) // 2, len(flight_totals) - 1)] if flight_totals else 0.0
+        hotel = hotel_tiers.get(tier) or hotel_tiers.get("mid") or next(iter(hotel_tiers.values()), None)
+        stay = hotel["nightly"] * nights * rooms if hotel else 0.0
+        daily = DAILY_SPEND[tier] * passengers * days
+        table[tier] = {
+            "flights": flight_cost,
+            "stay": stay,
+            "daily": daily,
+            "total": flight_cost + stay + daily,
+        }
+    return table
+
+
+# -------------------------------------------------
+# PLAN
+# -------------------------------------------------
+@dataclass
+class TripPlan:
+    passengers: int
+    nights: int
+    days: int
+    rooms: int = 1
+    flights: List[Dict[str, Any]] = field(default_factory=list)
+    hotels: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    budget: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    max_budget: Optional[int] = None
+    # Provider data the picks were made from, so a refinement can re-pick.
+    flight_options: List[Dict[str, Any]] = field(default_factory=list)
+    hotel_options: List[Dict[str, Any]] = field(default_factory=list)
+    fare_calendar: str = ""
+    # Set by replan(): {"flights": "cheaper", "departure": "morning", "hotels": "nicer"}
+    preferences: Dict[str, str] = field(default_factory=dict)
+
+    def fits_budget(self, tier: str) -> Optional[bool]:
+        if self.max_budget is None or tier not in self.budget:
+            return None
+        return self.budget[tier]["total"] <= self.max_budget
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TripPlan":
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+def _pick(
+    flight_options: List[Dict[str, Any]],
+    hotel_options: List[Dict[str, Any]],
+    passengers: int,
+    nights: int,
+    days: int,
+    max_budget: Optional[int],
+    fare_calendar: str,
+    preferences: Dict[str, str],
+) -> TripPlan:
+    weights = PREFERRED_FLIGHT_WEIGHTS.get(preferences.get("flights"))
+    ranked = rank_flights(filter_departures(flight_options, preferences.get("departure")), passengers, weights=weights)
+    tiers = tier_hotels(hotel_band(hotel_options, preferences.get("hotels")))
+    return TripPlan(
+        passengers=passengers,
+        nights=nights,
+        days=days,
+        rooms=rooms_for(passengers),
+        flights=ranked,
+        hotels=tiers,
+        budget=budget_table(ranked, tiers, passengers, nights, days),
+        max_budget=max_budget,
+        flight_options=flight_options,
+        hotel_options=hotel_options,
+        fare_calendar=fare_calendar,
+        preferences=preferences,
+    )
+
+
+def build_trip_plan(
+    flights: List[Dict[str, Any]],
+    hotels: List[Dict[str, Any]],
+    depart_date: str,
+    return_date: str,
+    passengers: int,
+    days: int,
+    max_budget: Optional[int] = None,
+    fare_calendar: str = "",
+) -> TripPlan:
+    nights = trip_nights(depart_date, return_date, days)
+    return _pick(list(flights), list(hotels), passengers, nights, days, max_budget, fare_calendar, {})
+
+
+def replan(plan: TripPlan, request: str, sections: Iterable[str] = ("flights", "hotels")) -> TripPlan:
+    """
+    Re-pick flights and/or hotels from the plan's stored provider data for
+    a refinement request ("cheaper hotels", "a morning flight", ...) and
+    recompute the budget. Preferences accumulate across refinements.
+    """
+    sections = set(sections)
+    preferences = dict(plan.preferences)
+    for section, name, value, pattern in PREFERENCE_RULES:
+        if section in sections and pattern.search(request):
+            preferences[name] = value
+    return _pick(
+        plan.flight_options, plan.hotel_options, plan.passengers, plan.nights, plan.days,
+        plan.max_budget, plan.fare_calendar, preferences,
+    )
+
+
+def render_flights(plan: TripPlan) -> str:
+    if not plan.flights:
+        return "## Flights\nNo live fares found for these dates; check airline sites closer to travel."
+    lines = ["## Flights"]
+    for i, f in enumerate(plan.flights, 1):
+        stops = f.get("stops")
+        stops_text = "non-stop" if stops == 0 else f"{stops} stop(s)" if stops is not None else ""
+        details = ", ".join(x for x in (_fmt_minutes(f.get("duration")), stops_text) if x and x != "-")
+        lines.append(
+            f"{i}. {f.get('airline') or 'Airline'} {f.get('flight_number') or ''}".rstrip()
+            + (f" ({details})" if details else "")
+            + f" — {_fmt_inr(f['price_per_person'])} per person, "
+            f"{_fmt_inr(f['total'])} for {plan.passengers}"
+        )
+    if plan.fare_calendar:
+        lines.append("\nFlexible dates:\n" + plan.fare_calendar)
+    return "\n".join(lines)
+
+
+def render_hotels(plan: TripPlan) -> str:
+    if not plan.hotels:
+        return "## Hotels\nNo live hotel rates found; budget estimates below assume typical local prices."
+    lines = ["## Hotels"]
+    for tier in TIERS:
+        h = plan.hotels.get(tier)
+        if not h:
+            continue
+        rating = f", rated {h['rating']}" if h.get("rating") else ""
+        area = f", {h['address']}" if h.get("address") else ""
+        lines.append(
+            f"- {HOTEL_TIER_NAMES[tier]}: {h.get('name')}{rating}{area} — "
+            f"{_fmt_inr(h['nightly'])}/room/night, {_fmt_inr(h['nightly'] * plan.nights * plan.rooms)} "
+            f"for {plan.rooms} room(s) x {plan.nights} night(s)"
+        )
+    return "\n".join(lines)
+
+
+def render_budget(plan: TripPlan) -> str:
+    rows = ["## Budget", "| Tier | Flights | Stay | Food & local | Total |", "|---|---|---|---|---|"]
+    for tier in TIERS:
+        b = plan.budget.get(tier)
+        if not b:
+            continue
+        total = _fmt_inr(b["total"])
+        fits = plan.fits_budget(tier)
+        if fits is not None:
+            total += " ✅" if fits else " ⚠️ over budget"
+        rows.append(
+            f"| {tier.title()} | {_fmt_inr(b['flights'])} | {_fmt_inr(b['stay'])} | {_fmt_inr(b['daily'])} | {total} |"
+        )
+    rows.append(
+        f"Totals for {plan.passengers} traveller(s), {plan.nights} night(s), {plan.rooms} room(s)."
+    )
+    return "\n".join(rows)
+
+
+def plan_summary_for_prompt(plan: TripPlan) -> str:
+    """The few facts the LLM needs to write prose around the fixed sections."""
+    lines = []
+    if plan.flights:
+        f = plan.flights[0]
+        lines.append(
+            f"Recommended flight: {f.get('airline')} departing {f.get('outbound_departure') or 'morning'}, "
+            f"return arriving {f.get('inbound_arrival') or 'evening'}."
+        )
+    for tier in TIERS:
+        h = plan.hotels.get(tier)
+        if h:
+            lines.append(f"{HOTEL_TIER_NAMES[tier]} stay: {h.get('name')} ({h.get('address') or 'city centre'}).")
+    return "\n".join(lines) or "No flight or hotel data; keep the plan generic."
@@ -18,13 +18,11 @@ from agent_router import ToolRouter
 
 # External APIs
 from zapi.tools_weather import get_weather
-from zapi.maps_api import get_distance
+from zapi.maps_api import get_distance, get_distances
 from zapi.flight_api import search_flights_serpapi
 from zapi.hotel_api import search_hotels_serpapi
-from zapi.tripadvisor_api import search_tripadvisor
-
-
-from zapi.maps_api import get_distance
+from zapi.tripadvisor_api import search_tripadvisor, search_tripadvisor_categories
+from zapi.records import prompt_rows
 
 # Caching
 from cache_utils import TTLCache
@@ -82,7 +80,6 @@ class TravelAI:
         self.flights_cache = TTLCache(ttl_seconds=900)   # 15 min
         self.hotels_cache = TTLCache(ttl_seconds=900)    # 15 min
         self.trip_cache = TTLCache(ttl_seconds=1800)     # 30 min
-        self.maps_cache = TTLCache(ttl_seconds=900)      # 15 min
 
     # -------------------------------------------------------------------------
     # BASIC LLM
@@ -104,13 +101,8 @@ class TravelAI:
         return result
 
     def _get_distance_cached(self, origin: str, dest: str) -> dict:
-        key = (origin, dest)
-        cached = self.maps_cache.get(*key)
-        if cached is not None:
-            return cached
-        result = get_distance(origin, dest)
-        self.maps_cache.set(result, *key)
-        return result
+        # maps_api keeps a symmetric pair cache shared with get_distances()
+        return get_distance(origin, dest)
 
     # -------------------------------------------------------------------------
     # SIMPLE WEATHER-BASED TRIP (OLD SMALL MODE)
@@ -369,29 +361,21 @@ Provide a clear, structured, helpful answer.
         )
         hotels = hotels_raw.get("hotels", []) if isinstance(hotels_raw, dict) else []
 
-        # ---------------- ACTIVITIES + FOOD (Tripadvisor) ----------------
-        activities_raw = self.get_tripadvisor_places(
-            city=destination_city,
-            interests="things to do",
-            max_results=15,
-        )
-        activities = activities_raw.get("places", []) if isinstance(activities_raw, dict) else []
-
-        food_raw = self.get_tripadvisor_places(
+        # ---------------- ACTIVITIES + FOOD (Tripadvisor, one query plan) ----------------
+        places = search_tripadvisor_categories(
             city=destination_city,
-            interests="best food and restaurants",
+            categories={
+                "activities": "things to do",
+                "food": "best food and restaurants",
+                "interests": interests,
+            },
             max_results=15,
+            search=self.get_tripadvisor_places,
         )
-        food_places = food_raw.get("places", []) if isinstance(food_raw, dict) else []
-
-        interest_raw = self.get_tripadvisor_places(
-            city=destination_city,
-            interests=interests,
-            max_results=15,
-        )
-        interest_spots = (
-            interest_raw.get("places", []) if isinstance(interest_raw, dict) else []
-        )
+        views = places.get("views", {}) if isinstance(places, dict) else {}
+        activities = views.get("activities", [])
+        food_places = views.get("food", [])
+        interest_spots = views.get("interests", [])
 
         # ---------------- RAG CONTEXT (summarized) ----------------
         rag_query = (
@@ -405,21 +389,21 @@ Provide a clear, structured, helpful answer.
             summarize=True,
         )
 
-        # ---------------- DISTANCE HINTS ----------------
+        # ---------------- DISTANCE HINTS (one batched matrix lookup) ----------------
         distance_text = ""
         try:
+            hints = []
             if hotels:
                 hotel_addr = hotels[0].get("address") or hotels[0].get("name")
-                d1 = self._get_distance_cached(f"{destination_city} airport", hotel_addr)
-                if d1 and d1.get("distance"):
-                    distance_text += f"Airport → Hotel: {d1['distance']} ({d1['duration']})\n"
-
-            if hotels and activities:
-                hotel_addr = hotels[0].get("address") or hotels[0].get("name")
-                act_title = activities[0].get("title") or activities[0].get("name")
-                d2 = self._get_distance_cached(hotel_addr, act_title)
-                if d2 and d2.get("distance"):
-                    distance_text += f"Hotel → First Activity: {d2['distance']} ({d2['duration']})"
+                hints.append(("Airport → Hotel", f"{destination_city} airport", hotel_addr))
+                for act in activities[:3]:
+                    act_title = act.get("title") or act.get("name")
+                    hints.append((f"Hotel → {act_title}", hotel_addr, act_title))
+
+            results = get_distances([(origin, dest) for _, origin, dest in hints])
+            for (label, _, _), d in zip(hints, results):
+                if d and d.get("distance"):
+                    distance_text += f"{label}: {d['distance']} ({d['duration']})\n"
         except Exception:
             # Distance hints are optional; ignore any failures silently
             pass
@@ -451,19 +435,19 @@ RAG – STATE/CITY KNOWLEDGE (SUMMARIZED)
 {rag_context}
 
 FLIGHTS (RAW LIST FROM API – YOU MUST PICK 2–3 CHEAPEST)
-{flights}
+{prompt_rows('flights', flights)}
 
 HOTELS (RAW LIST FROM API – YOU MUST PICK BUDGET/MID/PREMIUM)
-{hotels}
+{prompt_rows('hotels', hotels)}
 
 ACTIVITIES (Tripadvisor – things to do)
-{activities}
+{prompt_rows('places', activities)}
 
 FOOD / RESTAURANTS (Tripadvisor – best food places)
-{food_places}
+{prompt_rows('places', food_places)}
 
 INTEREST-FOCUSED SPOTS (Tripadvisor – matches user interests)
-{interest_spots}
+{prompt_rows('places', interest_spots)}
 
 GOOGLE MAPS DISTANCE HINTS
 {distance_text}
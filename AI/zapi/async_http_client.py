@@ -0,0 +1,145 @@
+import asyncio
+import importlib.util
+import os
+import weakref
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception
+
+from metrics import metrics
+from zapi.recording import make_async_transport
+from zapi.resilience import breakers, retry_budget, provider_name, is_failure_status
+from zapi.scheduler import serpapi_scheduler, is_serpapi, request_key
+
+# HTTP/2 needs the optional `h2` package (pip install "httpx[http2]").
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class AsyncProviderHTTPClient:
+    """
+    Async counterpart of ProviderHTTPClient, built on httpx.AsyncClient.
+
+    One AsyncClient (HTTP/2 when available, bounded keep-alive pool) is
+    created per event loop on first use, so all provider traffic of a worker
+    shares its connections. Retries use the same backoff policy, circuit
+    breakers, retry budget and SerpAPI scheduler as the sync client.
+
+    get()      : returns the Response; retries transport errors only
+    get_json() : raises httpx.HTTPStatusError on non-200 and retries it as well
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_keepalive: int = 10,
+        max_attempts: int = 3,
+        retry_wait_min: float = 1,
+        retry_wait_max: float = 10,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        breakers=breakers,
+        retry_budget=retry_budget,
+        scheduler=serpapi_scheduler,
+    ):
+        self.breakers = breakers
+        self.retry_budget = retry_budget
+        self.scheduler = scheduler
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+        )
+        # Recording/replay transport when PROVIDER_RECORD_MODE asks for one.
+        self.transport = transport if transport is not None else make_async_transport(self.limits, HTTP2_AVAILABLE)
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+        retrying = retry(
+            wait=wait_exponential(min=retry_wait_min, max=retry_wait_max),
+            stop=stop_after_attempt(max_attempts),
+            retry=retry_if_exception(self._should_retry),
+            reraise=True,
+        )
+        self._get_retrying = retrying(self._get_once)
+        self._get_json_retrying = retrying(self._get_json_once)
+
+    def client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE and self.transport is None,
+                limits=self.limits,
+                transport=self.transport,
+            )
+            self._clients[loop] = client
+        return client
+
+    async def aclose(self) -> None:
+        """Close the client bound to the running loop (e.g. on app shutdown)."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    # ------------------------ Requests ------------------------
+    def _should_retry(self, exc: BaseException) -> bool:
+        return isinstance(exc, httpx.HTTPError) and self.retry_budget.try_spend()
+
+    async def _get_once(self, url: str, params: Optional[Dict[str, Any]], timeout: float) -> httpx.Response:
+        breaker = self.breakers.get(provider_name(url, params))
+        # Scheduler first: a quota/timeout error there must not hold a half-open probe.
+        if is_serpapi(url):
+            await self.scheduler.aacquire()
+        breaker.before_call()
+        recorded = False
+        try:
+            try:
+                resp = await self.client().get(url, params=params, timeout=timeout)
+            except httpx.TransportError:
+                recorded = True
+                breaker.record_failure()
+                raise
+            recorded = True
+            if is_failure_status(resp.status_code):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            return resp
+        finally:
+            if not recorded:  # cancelled or unexpected error: free the probe slot
+                breaker.release_probe()
+
+    async def _get_json_once(self, url: str, params: Optional[Dict[str, Any]], timeout: float) -> Any:
+        resp = await self._get_once(url, params, timeout)
+        if resp.status_code != 200:
+            raise httpx.HTTPStatusError(f"HTTP {resp.status_code}", request=resp.request, response=resp)
+        return resp.json()
+
+    async def get(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 20) -> httpx.Response:
+        metrics.incr(f"provider_http_async.{_host(url)}.calls")
+        self.retry_budget.deposit()
+        if is_serpapi(url):
+            return await self.scheduler.acoalesce(
+                "get " + request_key(url, params), lambda: self._get_retrying(url, params, timeout)
+            )
+        return await self._get_retrying(url, params, timeout)
+
+    async def get_json(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 20) -> Any:
+        metrics.incr(f"provider_http_async.{_host(url)}.calls")
+        self.retry_budget.deposit()
+        if is_serpapi(url):
+            return await self.scheduler.acoalesce(
+                "json " + request_key(url, params), lambda: self._get_json_retrying(url, params, timeout)
+            )
+        return await self._get_json_retrying(url, params, timeout)
+
+
+def _host(url: str) -> str:
+    return urlsplit(url).hostname or "unknown"
+
+
+async_http_client = AsyncProviderHTTPClient(
+    max_connections=int(os.getenv("PROVIDER_ASYNC_MAX_CONNECTIONS", "20")),
+    max_keepalive=int(os.getenv("PROVIDER_POOL_MAXSIZE", "10")),
+)
@@ -1,10 +1,86 @@
+import contextvars
 import os
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional
+
 from dotenv import load_dotenv
 
+from zapi.http_client import http_client
+from zapi.async_http_client import async_http_client
+from zapi.records import FlightOption, debug_payload
+
 load_dotenv()
 
 SERPAPI_KEY = os.getenv("SERPAPI_KEY")
+SERPAPI_URL = "https://serpapi.com/search"
+
+# Fan-out limit for flexible-date searches (per process). The request rate
+# itself is paced by the SerpAPI scheduler in the HTTP client.
+FLEX_MAX_CONCURRENCY = int(os.getenv("FLEX_MAX_CONCURRENCY", "4"))
+
+
+def _flight_params(origin_airport, destination_airport, depart_date, return_date, passengers, currency):
+    return {
+        "engine": "google_flights",
+        "departure_id": origin_airport,
+        "arrival_id": destination_airport,
+        "outbound_date": depart_date,
+        "return_date": return_date,
+        "adults": passengers,
+        # "travel_class": ...  # REMOVED to avoid 'Unsupported 0' error
+        "type": "1",           # 1 = round trip
+        "currency": currency,
+        "hl": "en",
+        "api_key": SERPAPI_KEY,
+    }
+
+
+def _parse_flights(data, passengers, cabin_class, currency, max_results):
+    flights_raw = data.get("best_flights", []) or data.get("other_flights", [])
+    flights_clean = []
+
+    for f in flights_raw[:max_results]:
+        segs = f.get("segments", [])
+        if not segs:
+            continue
+
+        first_seg = segs[0]
+        last_seg = segs[-1]
+
+        airline = first_seg.get("airline", "Unknown airline")
+        flight_number = first_seg.get("flight_number")
+        outbound_time = first_seg.get("departure_time")
+        inbound_time = last_seg.get("arrival_time")
+        duration = f.get("total_duration")
+        stops = f.get("stops")
+
+        price = None
+        cur = currency
+        if isinstance(f.get("price"), dict):
+            price = f["price"].get("raw")
+            cur = f["price"].get("currency", cur)
+
+        flights_clean.append(
+            FlightOption(
+                airline=airline,
+                flight_number=flight_number,
+                outbound_departure=outbound_time,
+                inbound_arrival=inbound_time,
+                duration=duration,
+                stops=stops,
+                price=price,
+                currency=cur,
+                passengers=passengers,
+                cabin_class=cabin_class,  # for your output only
+            )
+        )
+
+    if not flights_clean:
+        debug_payload("flights", "No flights returned", data)
+        return {"error": "No flights returned"}
+
+    return {"flights": [f.to_compact() for f in flights_clean]}
 
 
 def search_flights_serpapi(
@@ -31,74 +107,165 @@ def search_flights_serpapi(
     if not SERPAPI_KEY:
         return {"error": "SERPAPI_KEY missing in .env"}
 
-    url = "https://serpapi.com/search"
-
-    params = {
-        "engine": "google_flights",
-        "departure_id": origin_airport,
-        "arrival_id": destination_airport,
-        "outbound_date": depart_date,
-        "return_date": return_date,
-        "adults": passengers,
-        # "travel_class": ...  # REMOVED to avoid 'Unsupported 0' error
-        "type": "1",           # 1 = round trip
-        "currency": currency,
-        "hl": "en",
-        "api_key": SERPAPI_KEY,
-    }
+    params = _flight_params(origin_airport, destination_airport, depart_date, return_date, passengers, currency)
 
     try:
-        resp = requests.get(url, params=params, timeout=20)
+        resp = http_client.get(SERPAPI_URL, params=params, timeout=20)
 
         if resp.status_code != 200:
-            return {"error": f"HTTP {resp.status_code}", "body": resp.text[:300]}
+            debug_payload("flights", f"HTTP {resp.status_code}", resp.text)
+            return {"error": f"HTTP {resp.status_code}"}
 
-        data = resp.json()
+        return _parse_flights(resp.json(), passengers, cabin_class, currency, max_results)
 
-        flights_raw = data.get("best_flights", []) or data.get("other_flights", [])
-        flights_clean = []
+    except Exception as e:
+        return {"error": f"Exception when calling SerpAPI: {e}"}
 
-        for f in flights_raw[:max_results]:
-            segs = f.get("segments", [])
-            if not segs:
-                continue
 
-            first_seg = segs[0]
-            last_seg = segs[-1]
-
-            airline = first_seg.get("airline", "Unknown airline")
-            flight_number = first_seg.get("flight_number")
-            outbound_time = first_seg.get("departure_time")
-            inbound_time = last_seg.get("arrival_time")
-            duration = f.get("total_duration")
-            stops = f.get("stops")
-
-            price = None
-            cur = currency
-            if isinstance(f.get("price"), dict):
-                price = f["price"].get("raw")
-                cur = f["price"].get("currency", cur)
-
-            flights_clean.append(
-                {
-                    "airline": airline,
-                    "flight_number": flight_number,
-                    "outbound_departure": outbound_time,
-                    "inbound_arrival": inbound_time,
-                    "duration": duration,
-                    "stops": stops,
-                    "price": price,
-                    "currency": cur,
-                    "passengers": passengers,
-                    "cabin_class": cabin_class,  # for your output only
-                }
-            )
+async def search_flights_serpapi_async(
+    origin_airport: str,
+    destination_airport: str,
+    depart_date: str,
+    return_date: str,
+    passengers: int = 1,
+    cabin_class: str = "economy",
+    currency: str = "INR",
+    max_results: int = 5,
+):
+    """Async counterpart of search_flights_serpapi (same arguments and result)."""
+
+    if not SERPAPI_KEY:
+        return {"error": "SERPAPI_KEY missing in .env"}
 
-        if not flights_clean:
-            return {"error": "No flights returned", "raw": data}
+    params = _flight_params(origin_airport, destination_airport, depart_date, return_date, passengers, currency)
 
-        return {"flights": flights_clean}
+    try:
+        resp = await async_http_client.get(SERPAPI_URL, params=params, timeout=20)
+
+        if resp.status_code != 200:
+            debug_payload("flights", f"HTTP {resp.status_code}", resp.text)
+            return {"error": f"HTTP {resp.status_code}"}
+
+        return _parse_flights(resp.json(), passengers, cabin_class, currency, max_results)
 
     except Exception as e:
         return {"error": f"Exception when calling SerpAPI: {e}"}
 
+
+# -------------------------------------------------
+# FLEXIBLE DATES / FARE CALENDAR
+# -------------------------------------------------
+def _shift(date: str, days: int) -> str:
+    return (datetime.strptime(date, "%Y-%m-%d") + timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+def _cheapest(result) -> Optional[dict]:
+    flights = result.get("flights", []) if isinstance(result, dict) else []
+    priced = [f for f in flights if isinstance(f.get("price"), (int, float))]
+    return min(priced, key=lambda f: f["price"]) if priced else None
+
+
+def search_flights_flexible(
+    origin_airport: str,
+    destination_airport: str,
+    depart_date: str,
+    return_date: str,
+    flex_days: int = 1,
+    passengers: int = 1,
+    cabin_class: str = "economy",
+    currency: str = "INR",
+    search=None,
+):
+    """
+    Fare calendar for depart/return dates within ±flex_days of the requested
+    pair. Every date pair is searched concurrently (FLEX_MAX_CONCURRENCY
+    workers), each in a copy of the caller's context so its SerpAPI
+    priority applies.
+
+    search : flight search callable with search_flights_serpapi's keyword
+             arguments; pass a cached wrapper so cells are reused across
+             overlapping calendars and by the exact-date search.
+
+    Returns:
+        {
+          "route": "DEL-GOI",
+          "currency": "INR",
+          "depart_dates": ["2025-12-09", "2025-12-10", "2025-12-11"],
+          "return_dates": ["2025-12-11", "2025-12-12", "2025-12-13"],
+          "prices": [[5400, 5100, None], ...],   # rows = depart, cols = return
+          "cheapest": {"depart_date", "return_date", "price", "airline"}
+        }
+    or {"error": ...} if no date pair returned a fare.
+    """
+    search = search or search_flights_serpapi
+
+    offsets = range(-flex_days, flex_days + 1)
+    depart_dates = [_shift(depart_date, d) for d in offsets]
+    return_dates = [_shift(return_date, d) for d in offsets]
+    today = datetime.now().strftime("%Y-%m-%d")
+
+    cells = [
+        (i, j, dep, ret)
+        for i, dep in enumerate(depart_dates)
+        for j, ret in enumerate(return_dates)
+        if dep < ret and dep >= today
+    ]
+
+    def fetch(cell):
+        i, j, dep, ret = cell
+        result = search(
+            origin_airport=origin_airport,
+            destination_airport=destination_airport,
+            depart_date=dep,
+            return_date=ret,
+            passengers=passengers,
+            cabin_class=cabin_class,
+            currency=currency,
+        )
+        return i, j, dep, ret, _cheapest(result)
+
+    prices = [[None] * len(return_dates) for _ in depart_dates]
+    best = None
+    with ThreadPoolExecutor(max_workers=max(1, FLEX_MAX_CONCURRENCY)) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, fetch, cell) for cell in cells]
+        for future in futures:
+            i, j, dep, ret, flight = future.result()
+            if flight is None:
+                continue
+            prices[i][j] = flight["price"]
+            if best is None or flight["price"] < best["price"]:
+                best = {
+                    "depart_date": dep,
+                    "return_date": ret,
+                    "price": flight["price"],
+                    "airline": flight.get("airline"),
+                }
+
+    if best is None:
+        return {"error": f"No fares found for {origin_airport}-{destination_airport} within ±{flex_days} days"}
+
+    return {
+        "route": f"{origin_airport}-{destination_airport}",
+        "currency": currency,
+        "depart_dates": depart_dates,
+        "return_dates": return_dates,
+        "prices": prices,
+        "cheapest": best,
+    }
+
+
+def format_fare_calendar(calendar: dict) -> str:
+    """Compact text grid of a fare calendar for prompts and CLI output."""
+    if not calendar or not calendar.get("cheapest"):
+        return "No flexible-date fares available."
+
+    header = "depart \\ return | " + " | ".join(d[5:] for d in calendar["return_dates"])
+    lines = [f"Cheapest price per person ({calendar['currency']}), {calendar['route']}", header]
+    for dep, row in zip(calendar["depart_dates"], calendar["prices"]):
+        lines.append(dep[5:] + " | " + " | ".join("-" if p is None else str(p) for p in row))
+    best = calendar["cheapest"]
+    lines.append(
+        f"Best: depart {best['depart_date']}, return {best['return_date']} "
+        f"at {best['price']} ({best.get('airline') or 'any airline'})"
+    )
+    return "\n".join(lines)
@@ -1,10 +1,58 @@
 import os
-import requests
 from dotenv import load_dotenv
 
+from zapi.http_client import http_client
+from zapi.async_http_client import async_http_client
+from zapi.records import HotelOption, debug_payload
+
 load_dotenv()
 
 SERPAPI_KEY = os.getenv("SERPAPI_KEY")
+SERPAPI_URL = "https://serpapi.com/search"
+
+
+def _hotel_params(city, checkin, checkout, adults, rooms, currency):
+    return {
+        # REQUIRED
+        "engine": "google_hotels",
+        "q": city,
+        "check_in_date": checkin,
+        "check_out_date": checkout,
+
+        # OPTIONAL
+        "adults": adults,
+        "rooms": rooms,
+        "currency": currency,
+        "hl": "en",
+
+        # KEY
+        "api_key": SERPAPI_KEY,
+    }
+
+
+def _parse_hotels(data, currency, max_results):
+    # Hotels appear in the "properties" array
+    hotels_raw = data.get("properties", [])
+    hotels_clean = []
+
+    for h in hotels_raw[:max_results]:
+        hotels_clean.append(
+            HotelOption(
+                name=h.get("name"),
+                rating=h.get("overall_rating") or h.get("rating"),
+                reviews=h.get("reviews"),
+                price=h.get("rate_per_night") or (h.get("rate") or {}).get("extracted_lowest_price"),
+                currency=currency,
+                address=h.get("address"),
+                image=h.get("thumbnail") or (h.get("images") or [{}])[0].get("thumbnail"),
+            )
+        )
+
+    if not hotels_clean:
+        debug_payload("hotels", "No hotels returned", data)
+        return {"error": "No hotels returned"}
+
+    return {"hotels": [h.to_compact() for h in hotels_clean]}
 
 
 def search_hotels_serpapi(
@@ -27,58 +75,33 @@ def search_hotels_serpapi(
     if not SERPAPI_KEY:
         return {"error": "SERPAPI_KEY missing in .env"}
 
-    url = "https://serpapi.com/search"
+    params = _hotel_params(city, checkin, checkout, adults, rooms, currency)
 
-    params = {
-        # REQUIRED
-        "engine": "google_hotels",
-        "q": city,
-        "check_in_date": checkin,
-        "check_out_date": checkout,
+    try:
+        data = http_client.get_json(SERPAPI_URL, params=params, timeout=20)
+        return _parse_hotels(data, currency, max_results)
+    except Exception as e:
+        return {"error": f"Exception calling SerpAPI Hotels API: {e}"}
 
-        # OPTIONAL
-        "adults": adults,
-        "rooms": rooms,
-        "currency": currency,
-        "hl": "en",
 
-        # KEY
-        "api_key": SERPAPI_KEY,
-    }
+async def search_hotels_serpapi_async(
+    city: str,
+    checkin: str,
+    checkout: str,
+    adults: int = 2,
+    rooms: int = 1,
+    currency: str = "INR",
+    max_results: int = 5,
+):
+    """Async counterpart of search_hotels_serpapi (same arguments and result)."""
 
-    from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type
+    if not SERPAPI_KEY:
+        return {"error": "SERPAPI_KEY missing in .env"}
 
-    @retry(wait=wait_exponential(min=1, max=10), stop=stop_after_attempt(3), retry=retry_if_exception_type(requests.exceptions.RequestException))
-    def _call_hotels(url, params):
-        resp = requests.get(url, params=params, timeout=20)
-        if resp.status_code != 200:
-            raise requests.exceptions.RequestException(f"HTTP {resp.status_code}")
-        return resp.json()
+    params = _hotel_params(city, checkin, checkout, adults, rooms, currency)
 
     try:
-        data = _call_hotels(url, params)
-
-        # Hotels appear in the "properties" array
-        hotels_raw = data.get("properties", [])
-        hotels_clean = []
-
-        for h in hotels_raw[:max_results]:
-            hotels_clean.append(
-                {
-                    "name": h.get("name"),
-                    "rating": h.get("overall_rating") or h.get("rating"),
-                    "reviews": h.get("reviews"), 
-                    "price": h.get("rate_per_night") or (h.get("rate") or {}).get("extracted_lowest_price"),
-                    "currency": currency,
-                    "address": h.get("address"),
-                    "image": h.get("thumbnail") or h.get("images", [{}])[0].get("thumbnail"),
-                }
-            )
-
-        if not hotels_clean:
-            return {"error": "No hotels returned", "raw": data}
-
-        return {"hotels": hotels_clean}
-
+        data = await async_http_client.get_json(SERPAPI_URL, params=params, timeout=20)
+        return _parse_hotels(data, currency, max_results)
     except Exception as e:
         return {"error": f"Exception calling SerpAPI Hotels API: {e}"}
@@ -0,0 +1,143 @@
+import os
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception
+
+from metrics import metrics
+from zapi.recording import make_adapter
+from zapi.resilience import breakers, retry_budget, provider_name, is_failure_status
+from zapi.scheduler import serpapi_scheduler, is_serpapi, request_key
+
+
+class ProviderHTTPClient:
+    """
+    Shared HTTP client for all zapi provider modules.
+
+    One pooled requests.Session (keep-alive, bounded connections per host)
+    and one retry policy, built once at import instead of on every call.
+
+    get()      : returns the Response; retries connection-level errors only
+    get_json() : raises RequestException on non-200 and retries it as well
+
+    Every attempt goes through the provider's circuit breaker (fails fast
+    with CircuitOpenError while it is open), and retries draw from a retry
+    budget shared by all in-flight calls (zapi/resilience.py).
+
+    SerpAPI requests also wait for a slot from the quota-aware scheduler, and
+    identical SerpAPI requests in flight at the same time share one call
+    (zapi/scheduler.py).
+    """
+
+    def __init__(
+        self,
+        pool_maxsize: int = 10,
+        max_attempts: int = 3,
+        retry_wait_min: float = 1,
+        retry_wait_max: float = 10,
+        breakers=breakers,
+        retry_budget=retry_budget,
+        scheduler=serpapi_scheduler,
+    ):
+        self.breakers = breakers
+        self.retry_budget = retry_budget
+        self.scheduler = scheduler
+        self.session = requests.Session()
+        # Plain HTTPAdapter unless PROVIDER_RECORD_MODE is record/replay (zapi/recording.py).
+        self.adapter = make_adapter(
+            pool_connections=8,         # distinct hosts kept in the pool manager
+            pool_maxsize=pool_maxsize,  # connections kept alive per host
+            pool_block=True,            # wait for a free connection instead of opening extras
+        )
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+        retrying = retry(
+            wait=wait_exponential(min=retry_wait_min, max=retry_wait_max),
+            stop=stop_after_attempt(max_attempts),
+            retry=retry_if_exception(self._should_retry),
+            reraise=True,
+        )
+        self._get_retrying = retrying(self._get_once)
+        self._get_json_retrying = retrying(self._get_json_once)
+
+    # ------------------------ Requests ------------------------
+    def _should_retry(self, exc: BaseException) -> bool:
+        return isinstance(exc, requests.exceptions.RequestException) and self.retry_budget.try_spend()
+
+    def _get_once(self, url: str, params: Optional[Dict[str, Any]], timeout: float) -> requests.Response:
+        breaker = self.breakers.get(provider_name(url, params))
+        # Scheduler first: a quota/timeout error there must not hold a half-open probe.
+        if is_serpapi(url):
+            self.scheduler.acquire()
+        breaker.before_call()
+        recorded = False
+        try:
+            try:
+                resp = self.session.get(url, params=params, timeout=timeout)
+            except requests.exceptions.RequestException:
+                recorded = True
+                breaker.record_failure()
+                raise
+            recorded = True
+            if is_failure_status(resp.status_code):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            return resp
+        finally:
+            if not recorded:  # cancelled or unexpected error: free the probe slot
+                breaker.release_probe()
+
+    def _get_json_once(self, url: str, params: Optional[Dict[str, Any]], timeout: float) -> Any:
+        resp = self._get_once(url, params, timeout)
+        if resp.status_code != 200:
+            raise requests.exceptions.RequestException(f"HTTP {resp.status_code}")
+        return resp.json()
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 20) -> requests.Response:
+        metrics.incr(f"provider_http.{_host(url)}.calls")
+        self.retry_budget.deposit()
+        if is_serpapi(url):
+            return self.scheduler.coalesce(
+                "get " + request_key(url, params), lambda: self._get_retrying(url, params, timeout)
+            )
+        return self._get_retrying(url, params, timeout)
+
+    def get_json(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: float = 20) -> Any:
+        metrics.incr(f"provider_http.{_host(url)}.calls")
+        self.retry_budget.deposit()
+        if is_serpapi(url):
+            return self.scheduler.coalesce(
+                "json " + request_key(url, params), lambda: self._get_json_retrying(url, params, timeout)
+            )
+        return self._get_json_retrying(url, params, timeout)
+
+    # ------------------------ Metrics ------------------------
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Per-host connection reuse, from the urllib3 pools."""
+        out = {}
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened = pool.num_connections
+            requests_sent = pool.num_requests
+            out[pool.host] = {
+                "requests": requests_sent,
+                "connections_opened": opened,
+                "connections_reused": max(0, requests_sent - opened),
+            }
+        return out
+
+
+def _host(url: str) -> str:
+    return urlsplit(url).hostname or "unknown"
+
+
+http_client = ProviderHTTPClient(
+    pool_maxsize=int(os.getenv("PROVIDER_POOL_MAXSIZE", "10")),
+)
+metrics.register("provider_http", http_client.stats)
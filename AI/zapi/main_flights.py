@@ -1,7 +1,9 @@
 import os
-import requests
 from dotenv import load_dotenv
 
+from zapi.http_client import http_client
+from zapi.records import debug_payload
+
 load_dotenv()
 
 SERPAPI_KEY = os.getenv("SERPAPI_KEY")
@@ -46,17 +48,8 @@ def search_flights_serpapi(
         "api_key": SERPAPI_KEY,
     }
 
-    from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type
-
-    @retry(wait=wait_exponential(min=1, max=10), stop=stop_after_attempt(3), retry=retry_if_exception_type(requests.exceptions.RequestException))
-    def _call_flights(url, params):
-        resp = requests.get(url, params=params, timeout=20)
-        if resp.status_code != 200:
-            raise requests.exceptions.RequestException(f"HTTP {resp.status_code}")
-        return resp.json()
-
     try:
-        data = _call_flights(url, params)
+        data = http_client.get_json(url, params=params, timeout=20)
 
         flights_raw = data.get("best_flights", []) or data.get("other_flights", [])
         flights_clean = []
@@ -98,7 +91,8 @@ def search_flights_serpapi(
             )
 
         if not flights_clean:
-            return {"error": "No flights returned", "raw": data}
+            debug_payload("flights", "No flights returned", data)
+            return {"error": "No flights returned"}
 
         return {"flights": flights_clean}
 
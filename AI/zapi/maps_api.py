@@ -1,21 +1,36 @@
+import asyncio
 import os
-import requests
+from typing import Dict, Iterable, List, Sequence, Tuple
 from dotenv import load_dotenv
 
+from cache_utils import TTLCache
+from zapi.http_client import http_client
+from zapi.async_http_client import async_http_client
+
 load_dotenv()
 
 SERPAPI_KEY = os.getenv("GOOGLE_MAPS_API_KEY") or os.getenv("SERPAPI_KEY")
+SERPAPI_URL = "https://serpapi.com/search"
 
+# Distance-matrix request limits (Google Maps): origins, destinations and
+# origin x destination elements per request.
+MAX_ORIGINS = 25
+MAX_DESTINATIONS = 25
+MAX_ELEMENTS = 100
+
+# Driving distance A<->B is treated as symmetric, so one entry serves both
+# directions. Road distances barely change; keep them for a day.
+distance_cache = TTLCache(ttl_seconds=86400, max_entries=20000)
 
-def get_distance(origin: str, destination: str):
-    """
-    Returns driving distance and duration between two places using SerpAPI Google Maps.
-    Example: origin="Hyderabad airport", destination="Charminar"
-    """
 
-    url = "https://serpapi.com/search"
+def _pair_key(origin: str, destination: str) -> Tuple[str, str]:
+    a = " ".join(origin.split()).lower()
+    b = " ".join(destination.split()).lower()
+    return (a, b) if a <= b else (b, a)
 
-    params = {
+
+def _distance_params(origin, destination):
+    return {
         "engine": "google_maps",
         "type": "distance_matrix",
         "origins": origin,
@@ -23,31 +38,199 @@ def get_distance(origin: str, destination: str):
         "api_key": SERPAPI_KEY,
     }
 
-    from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type
 
-    @retry(wait=wait_exponential(min=1, max=10), stop=stop_after_attempt(3), retry=retry_if_exception_type(requests.exceptions.RequestException))
-    def _call_maps(url, params):
-        resp = requests.get(url, params=params, timeout=15)
-        if resp.status_code != 200:
-            raise requests.exceptions.RequestException(f"HTTP {resp.status_code}")
-        return resp.json()
+def _parse_distance(data, origin, destination):
+    row = (data.get("distance_matrix", {})
+                .get("rows", [{}])[0]
+                .get("elements", [{}])[0])
+
+    distance = row.get("distance", {}).get("text")
+    duration = row.get("duration", {}).get("text")
+
+    return {
+        "origin": origin,
+        "destination": destination,
+        "distance": distance,
+        "duration": duration,
+    }
+
+
+def get_distance(origin: str, destination: str):
+    """
+    Returns driving distance and duration between two places using SerpAPI Google Maps.
+    Example: origin="Hyderabad airport", destination="Charminar"
+    """
+
+    cached = distance_cache.get(*_pair_key(origin, destination))
+    if cached is not None:
+        return {"origin": origin, "destination": destination, **cached}
+
+    params = _distance_params(origin, destination)
 
     try:
-        data = _call_maps(url, params)
+        data = http_client.get_json(SERPAPI_URL, params=params, timeout=15)
+        result = _parse_distance(data, origin, destination)
+        _remember(origin, destination, result)
+        return result
+    except Exception as e:
+        return {"error": f"Could not fetch distance: {e}"}
+
 
-        row = (data.get("distance_matrix", {})
-                    .get("rows", [{}])[0]
-                    .get("elements", [{}])[0])
+async def get_distance_async(origin: str, destination: str):
+    """Async counterpart of get_distance (same arguments and result)."""
 
-        distance = row.get("distance", {}).get("text")
-        duration = row.get("duration", {}).get("text")
+    cached = distance_cache.get(*_pair_key(origin, destination))
+    if cached is not None:
+        return {"origin": origin, "destination": destination, **cached}
 
-        return {
-            "origin": origin,
-            "destination": destination,
-            "distance": distance,
-            "duration": duration,
-        }
+    params = _distance_params(origin, destination)
 
+    try:
+        data = await async_http_client.get_json(SERPAPI_URL, params=params, timeout=15)
+        result = _parse_distance(data, origin, destination)
+        _remember(origin, destination, result)
+        return result
     except Exception as e:
         return {"error": f"Could not fetch distance: {e}"}
+
+
+# -------------------------------------------------
+# BATCHED DISTANCE MATRIX
+# -------------------------------------------------
+def _remember(origin: str, destination: str, result: dict) -> None:
+    if result.get("distance"):
+        distance_cache.set(
+            {"distance": result["distance"], "duration": result.get("duration")},
+            *_pair_key(origin, destination),
+        )
+
+
+def _unique(items: Iterable[str]) -> List[str]:
+    seen, out = set(), []
+    for item in items:
+        key = " ".join(item.split()).lower()
+        if key and key not in seen:
+            seen.add(key)
+            out.append(item)
+    return out
+
+
+def _plan_matrix_requests(
+    origins: Sequence[str], destinations: Sequence[str]
+) -> Tuple[Dict[Tuple[str, str], dict], List[Tuple[List[str], List[str]]]]:
+    """
+    Split the matrix into cached results and as few API requests as the
+    origin/destination/element limits allow. Only origins and destinations
+    with at least one uncached pair are requested.
+    """
+    results: Dict[Tuple[str, str], dict] = {}
+    missing_origins, missing_destinations = [], []
+
+    for o in origins:
+        for d in destinations:
+            cached = distance_cache.get(*_pair_key(o, d))
+            if cached is not None:
+                results[(o, d)] = {"origin": o, "destination": d, **cached}
+            else:
+                if o not in missing_origins:
+                    missing_origins.append(o)
+                if d not in missing_destinations:
+                    missing_destinations.append(d)
+
+    requests_plan = []
+    if missing_origins:
+        o_step = min(MAX_ORIGINS, len(missing_origins))
+        d_step = max(1, min(MAX_DESTINATIONS, len(missing_destinations), MAX_ELEMENTS // o_step))
+        for i in range(0, len(missing_origins), o_step):
+            for j in range(0, len(missing_destinations), d_step):
+                requests_plan.append(
+                    (missing_origins[i:i + o_step], missing_destinations[j:j + d_step])
+                )
+    return results, requests_plan
+
+
+def _matrix_params(origins: List[str], destinations: List[str]) -> dict:
+    return _distance_params("|".join(origins), "|".join(destinations))
+
+
+def _parse_matrix(data, origins, destinations, results) -> None:
+    rows = data.get("distance_matrix", {}).get("rows", [])
+    for i, o in enumerate(origins):
+        elements = rows[i].get("elements", []) if i < len(rows) else []
+        for j, d in enumerate(destinations):
+            element = elements[j] if j < len(elements) else {}
+            distance = element.get("distance", {}).get("text")
+            duration = element.get("duration", {}).get("text")
+            if distance:
+                result = {"origin": o, "destination": d, "distance": distance, "duration": duration}
+                _remember(o, d, result)
+            else:
+                result = {"error": f"No route between {o} and {d}"}
+            if (o, d) not in results or "error" in results[(o, d)]:
+                results[(o, d)] = result
+
+
+def get_distance_matrix(origins: Sequence[str], destinations: Sequence[str]) -> Dict[Tuple[str, str], dict]:
+    """
+    Driving distance/duration for every origin x destination pair, packed into
+    as few SerpAPI distance-matrix requests as the API limits allow.
+
+    Returns {(origin, destination): {"origin", "destination", "distance", "duration"}}
+    or {"error": ...} per pair. Pairs already in the symmetric pair cache cost
+    no request.
+    """
+    origins, destinations = _unique(origins), _unique(destinations)
+    results, plan = _plan_matrix_requests(origins, destinations)
+
+    for chunk_o, chunk_d in plan:
+        try:
+            data = http_client.get_json(SERPAPI_URL, params=_matrix_params(chunk_o, chunk_d), timeout=15)
+            _parse_matrix(data, chunk_o, chunk_d, results)
+        except Exception as e:
+            for o in chunk_o:
+                for d in chunk_d:
+                    results.setdefault((o, d), {"error": f"Could not fetch distance: {e}"})
+    return results
+
+
+async def get_distance_matrix_async(
+    origins: Sequence[str], destinations: Sequence[str]
+) -> Dict[Tuple[str, str], dict]:
+    """Async counterpart of get_distance_matrix (same arguments and result)."""
+    origins, destinations = _unique(origins), _unique(destinations)
+    results, plan = _plan_matrix_requests(origins, destinations)
+
+    async def fetch(chunk_o, chunk_d):
+        try:
+            data = await async_http_client.get_json(
+                SERPAPI_URL, params=_matrix_params(chunk_o, chunk_d), timeout=15
+            )
+            _parse_matrix(data, chunk_o, chunk_d, results)
+        except Exception as e:
+            for o in chunk_o:
+                for d in chunk_d:
+                    results.setdefault((o, d), {"error": f"Could not fetch distance: {e}"})
+
+    await asyncio.gather(*(fetch(o, d) for o, d in plan))
+    return results
+
+
+def get_distances(pairs: Sequence[Tuple[str, str]]) -> List[dict]:
+    """
+    Distance for each (origin, destination) pair, in order, using one batched
+    matrix lookup for all of them.
+    """
+    pairs = [(o, d) for o, d in pairs if o and d]
+    if not pairs:
+        return []
+    matrix = get_distance_matrix([o for o, _ in pairs], [d for _, d in pairs])
+    return [matrix.get((o, d)) or _lookup_normalized(matrix, o, d) for o, d in pairs]
+
+
+def _lookup_normalized(matrix, origin, destination) -> dict:
+    # _unique() keeps the first spelling of a place; match case/space-insensitively.
+    want = _pair_key(origin, destination)
+    for (o, d), result in matrix.items():
+        if _pair_key(o, d) == want:
+            return {**result, "origin": origin, "destination": destination}
+    return {"error": f"Could not fetch distance between {origin} and {destination}"}
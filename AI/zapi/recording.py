@@ -0,0 +1,275 @@
+import asyncio
+import gzip
+import json
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import metrics
+
+# PROVIDER_RECORD_MODE:
+#   off    : live traffic (default)
+#   record : live traffic, every response is also written to the corpus
+#   replay : no network; responses come from the corpus
+RECORD_MODE = os.getenv("PROVIDER_RECORD_MODE", "off").strip().lower()
+FIXTURES_PATH = os.getenv(
+    "PROVIDER_FIXTURES",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "providers.jsonl.gz"),
+)
+
+# Query parameters that never go into a fixture key or onto disk.
+SECRET_PARAMS = {"api_key", "appid", "key", "token"}
+
+# Per-request fields in SerpAPI responses (ids, timings, raw html links) that
+# would make identical searches look different.
+VOLATILE_FIELDS = {"search_metadata"}
+
+
+def fixture_key(method: str, url: str) -> str:
+    """'GET serpapi.com/search?engine=google_flights&...' with sorted, secret-free params."""
+    parts = urlsplit(str(url))
+    params = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in SECRET_PARAMS)
+    query = urlencode(params)
+    return f"{method.upper()} {parts.hostname}{parts.path}" + (f"?{query}" if query else "")
+
+
+def normalize_body(body: bytes, content_type: str) -> str:
+    """Compact JSON without volatile fields; other bodies are kept as text."""
+    text = body.decode("utf-8", errors="replace")
+    if "json" not in (content_type or ""):
+        return text
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return text
+    if isinstance(data, dict):
+        for field in VOLATILE_FIELDS:
+            data.pop(field, None)
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+# -------------------------------------------------
+# CORPUS
+# -------------------------------------------------
+class FixtureCorpus:
+    """
+    Recorded provider responses, one gzip'd JSON line per response:
+        {"k": fixture_key, "s": status, "t": content_type, "b": body}
+
+    Recording appends a gzip member per response, so concurrent workers and
+    repeated runs only ever add to the file; on load the last entry for a
+    key wins.
+    """
+
+    def __init__(self, path: str = FIXTURES_PATH):
+        self.path = path
+        self._entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries[entry["k"]] = entry
+
+    def get(self, key: str) -> Optional[dict]:
+        return self._entries.get(key)
+
+    def put(self, key: str, status: int, content_type: str, body: str) -> None:
+        entry = {"k": key, "s": status, "t": content_type, "b": body}
+        line = json.dumps(entry, separators=(",", ":"), ensure_ascii=False) + "\n"
+        with self._lock:
+            self._entries[key] = entry
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(line)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ReplayPolicy:
+    """
+    Injected latency and failures for replayed responses. Seeded, so a load
+    test sees the same sequence of delays and errors on every run.
+
+    latency_ms  : mean added latency (PROVIDER_REPLAY_LATENCY_MS)
+    jitter_ms   : +/- uniform jitter (PROVIDER_REPLAY_JITTER_MS)
+    error_rate  : share of requests answered with HTTP 503 (PROVIDER_REPLAY_ERROR_RATE)
+    """
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "ReplayPolicy":
+        return cls(
+            latency_ms=float(os.getenv("PROVIDER_REPLAY_LATENCY_MS", "0")),
+            jitter_ms=float(os.getenv("PROVIDER_REPLAY_JITTER_MS", "0")),
+            error_rate=float(os.getenv("PROVIDER_REPLAY_ERROR_RATE", "0")),
+            seed=int(os.getenv("PROVIDER_REPLAY_SEED", "0")),
+        )
+
+    def draw(self):
+        """(delay_seconds, fail) for the next request."""
+        with self._lock:
+            jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+            fail = self.error_rate > 0 and self._rng.random() < self.error_rate
+        return max(0.0, self.latency_ms + jitter) / 1000.0, fail
+
+
+def _replayed(corpus: FixtureCorpus, key: str, fail: bool):
+    """(status, content_type, body) to answer with."""
+    if fail:
+        metrics.incr("provider_replay.injected_errors")
+        return 503, "application/json", '{"error":"injected replay failure"}'
+    entry = corpus.get(key)
+    if entry is None:
+        metrics.incr("provider_replay.misses")
+        return 404, "application/json", json.dumps({"error": f"no recorded fixture for {key}"})
+    metrics.incr("provider_replay.hits")
+    return entry["s"], entry["t"], entry["b"]
+
+
+# -------------------------------------------------
+# SYNC (requests)
+# -------------------------------------------------
+class RecordingAdapter(HTTPAdapter):
+    """HTTPAdapter that writes every response it receives to the corpus."""
+
+    def __init__(self, corpus: FixtureCorpus, **kwargs):
+        self.corpus = corpus
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        resp = super().send(request, **kwargs)
+        content_type = resp.headers.get("Content-Type", "")
+        self.corpus.put(
+            fixture_key(request.method, request.url),
+            resp.status_code,
+            content_type,
+            normalize_body(resp.content, content_type),
+        )
+        return resp
+
+
+class ReplayAdapter(HTTPAdapter):
+    """HTTPAdapter that answers from the corpus and never opens a connection."""
+
+    def __init__(self, corpus: FixtureCorpus, policy: Optional[ReplayPolicy] = None, **kwargs):
+        self.corpus = corpus
+        self.policy = policy or ReplayPolicy()
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        delay, fail = self.policy.draw()
+        if delay:
+            time.sleep(delay)
+        status, content_type, body = _replayed(self.corpus, fixture_key(request.method, request.url), fail)
+
+        resp = requests.Response()
+        resp.status_code = status
+        resp.headers["Content-Type"] = content_type
+        resp._content = body.encode("utf-8")
+        resp.encoding = "utf-8"
+        resp.url = request.url
+        resp.request = request
+        return resp
+
+
+# -------------------------------------------------
+# ASYNC (httpx)
+# -------------------------------------------------
+class AsyncRecordingTransport(httpx.AsyncBaseTransport):
+    """Wraps a real transport and writes every response to the corpus."""
+
+    def __init__(self, corpus: FixtureCorpus, inner: httpx.AsyncBaseTransport):
+        self.corpus = corpus
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        resp = await self.inner.handle_async_request(request)
+        body = await resp.aread()
+        content_type = resp.headers.get("Content-Type", "")
+        self.corpus.put(
+            fixture_key(request.method, request.url),
+            resp.status_code,
+            content_type,
+            normalize_body(body, content_type),
+        )
+        return httpx.Response(resp.status_code, headers=resp.headers, content=body, request=request)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class AsyncReplayTransport(httpx.AsyncBaseTransport):
+    """Answers from the corpus; async counterpart of ReplayAdapter."""
+
+    def __init__(self, corpus: FixtureCorpus, policy: Optional[ReplayPolicy] = None):
+        self.corpus = corpus
+        self.policy = policy or ReplayPolicy()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        delay, fail = self.policy.draw()
+        if delay:
+            await asyncio.sleep(delay)
+        status, content_type, body = _replayed(self.corpus, fixture_key(request.method, request.url), fail)
+        return httpx.Response(
+            status,
+            headers={"Content-Type": content_type},
+            content=body.encode("utf-8"),
+            request=request,
+        )
+
+
+# -------------------------------------------------
+# FACTORIES (used by the provider HTTP clients)
+# -------------------------------------------------
+_corpus: Optional[FixtureCorpus] = None
+_policy: Optional[ReplayPolicy] = None
+
+
+def _shared():
+    global _corpus, _policy
+    if _corpus is None:
+        _corpus = FixtureCorpus()
+        _policy = ReplayPolicy.from_env()
+    return _corpus, _policy
+
+
+def make_adapter(mode: str = RECORD_MODE, **adapter_kwargs) -> HTTPAdapter:
+    """HTTPAdapter for the sync client according to PROVIDER_RECORD_MODE."""
+    if mode == "record":
+        return RecordingAdapter(_shared()[0], **adapter_kwargs)
+    if mode == "replay":
+        corpus, policy = _shared()
+        return ReplayAdapter(corpus, policy, **adapter_kwargs)
+    return HTTPAdapter(**adapter_kwargs)
+
+
+def make_async_transport(
+    limits: httpx.Limits, http2: bool, mode: str = RECORD_MODE
+) -> Optional[httpx.AsyncBaseTransport]:
+    """Transport for the async client, or None for httpx's default (mode off)."""
+    if mode == "record":
+        return AsyncRecordingTransport(_shared()[0], httpx.AsyncHTTPTransport(http2=http2, limits=limits))
+    if mode == "replay":
+        corpus, policy = _shared()
+        return AsyncReplayTransport(corpus, policy)
+    return None
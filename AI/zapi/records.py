@@ -0,0 +1,128 @@
+import json
+import logging
+import os
+from dataclasses import dataclass, fields
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, List, Optional
+
+# Opt-in log of raw provider bodies (empty results, unexpected shapes).
+# Set PROVIDER_DEBUG_LOG=/path/to/file to enable; nothing is kept otherwise.
+DEBUG_LOG_PATH = os.getenv("PROVIDER_DEBUG_LOG")
+DEBUG_MAX_CHARS = int(os.getenv("PROVIDER_DEBUG_MAX_CHARS", "20000"))
+
+debug_logger = logging.getLogger("travelai.provider_payloads")
+debug_logger.propagate = False
+if DEBUG_LOG_PATH:
+    _handler = RotatingFileHandler(DEBUG_LOG_PATH, maxBytes=10 * 1024 * 1024, backupCount=3, encoding="utf-8")
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    debug_logger.addHandler(_handler)
+    debug_logger.setLevel(logging.DEBUG)
+
+
+def debug_payload(provider: str, reason: str, data: Any) -> None:
+    """Write a (truncated) raw provider body to the debug log, if enabled."""
+    if not debug_logger.isEnabledFor(logging.DEBUG):
+        return
+    try:
+        body = json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str)
+    except (TypeError, ValueError):
+        body = repr(data)
+    debug_logger.debug("%s %s %s", provider, reason, body[:DEBUG_MAX_CHARS])
+
+
+class _Record:
+    """
+    Shared projections for provider records.
+
+    to_dict()    : every known field except None values (full record)
+    to_compact() : to_dict() without MEDIA_FIELDS; this is what providers
+                   return, what caches store and what API responses expose
+    to_prompt()  : only PROMPT_FIELDS, for LLM prompts
+    """
+
+    __slots__ = ()
+    PROMPT_FIELDS: tuple = ()
+    # Image URLs and outbound links: large, and no consumer here reads them.
+    MEDIA_FIELDS: tuple = ("image", "link")
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]):
+        return cls(**{f.name: data.get(f.name) for f in fields(cls)})
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = {}
+        for f in fields(self):
+            value = getattr(self, f.name)
+            if value is not None:
+                out[f.name] = value
+        return out
+
+    def to_compact(self) -> Dict[str, Any]:
+        out = self.to_dict()
+        for name in self.MEDIA_FIELDS:
+            out.pop(name, None)
+        return out
+
+    def to_prompt(self) -> Dict[str, Any]:
+        out = {}
+        for name in self.PROMPT_FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                out[name] = value
+        return out
+
+
+@dataclass(slots=True)
+class FlightOption(_Record):
+    airline: Optional[str] = None
+    flight_number: Optional[str] = None
+    outbound_departure: Optional[str] = None
+    inbound_arrival: Optional[str] = None
+    duration: Optional[int] = None
+    stops: Optional[int] = None
+    price: Optional[float] = None
+    currency: Optional[str] = None
+    passengers: Optional[int] = None
+    cabin_class: Optional[str] = None
+
+    PROMPT_FIELDS = (
+        "airline", "flight_number", "outbound_departure", "inbound_arrival",
+        "duration", "stops", "price", "currency",
+    )
+
+
+@dataclass(slots=True)
+class HotelOption(_Record):
+    name: Optional[str] = None
+    rating: Optional[float] = None
+    reviews: Optional[int] = None
+    price: Optional[Any] = None
+    currency: Optional[str] = None
+    address: Optional[str] = None
+    image: Optional[str] = None
+
+    PROMPT_FIELDS = ("name", "rating", "reviews", "price", "currency", "address")
+
+
+@dataclass(slots=True)
+class Place(_Record):
+    title: Optional[str] = None
+    category: Optional[str] = None
+    rating: Optional[float] = None
+    reviews: Optional[int] = None
+    price_level: Optional[str] = None
+    address: Optional[str] = None
+    snippet: Optional[str] = None
+    image: Optional[str] = None
+    link: Optional[str] = None
+
+    PROMPT_FIELDS = ("title", "category", "rating", "reviews", "price_level", "address", "snippet")
+
+
+RECORD_TYPES = {"flights": FlightOption, "hotels": HotelOption, "places": Place}
+
+
+def prompt_rows(kind: str, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Prompt projection of provider dicts ('flights' / 'hotels' / 'places')."""
+    record = RECORD_TYPES[kind]
+    return [record.from_dict(item).to_prompt() for item in items if isinstance(item, dict)]
@@ -0,0 +1,195 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+from metrics import metrics
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose breaker is open."""
+
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"{provider} unavailable (circuit open, retry in {retry_after:.0f}s)")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker.
+
+    closed    : calls go through; `failure_threshold` consecutive failures open it
+    open      : calls fail fast with CircuitOpenError for `reset_timeout` seconds
+    half_open : up to `half_open_max` probe calls; a success closes the
+                breaker, a failure opens it again
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30, half_open_max: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max = half_open_max
+
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._times_opened = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may go out now."""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and self._probes < self.half_open_max:
+                self._probes += 1
+                return
+            self._rejected += 1
+            retry_after = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+        metrics.incr(f"provider_breaker.{self.name}.rejected")
+        raise CircuitOpenError(self.name, retry_after)
+
+    def release_probe(self) -> None:
+        """Give back a half-open probe slot taken by a call that recorded no outcome."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._state = CLOSED
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            state = self._current_state()
+            if state == HALF_OPEN or (state == CLOSED and self._failures >= self.failure_threshold):
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._times_opened += 1
+                opened = True
+            else:
+                opened = False
+        if opened:
+            metrics.incr(f"provider_breaker.{self.name}.opened")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "consecutive_failures": self._failures,
+                "times_opened": self._times_opened,
+                "rejected": self._rejected,
+            }
+
+
+class RetryBudget:
+    """
+    Retry budget shared by all concurrent provider calls.
+
+    Every first attempt deposits `ratio` tokens and every retry spends one,
+    so retries stay within ~ratio of normal traffic however many requests are
+    failing at once. `min_per_sec` tokens are granted per second on top, so
+    low-traffic periods can still retry.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_sec: float = 1.0, max_tokens: float = 50.0):
+        self.ratio = ratio
+        self.min_per_sec = min_per_sec
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._updated = time.monotonic()
+        self._spent = 0
+        self._denied = 0
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._updated) * self.min_per_sec)
+        self._updated = now
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self._spent += 1
+                return True
+            self._denied += 1
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refill()
+            return {"tokens": round(self._tokens, 2), "retries": self._spent, "denied": self._denied}
+
+
+class BreakerRegistry:
+    """One CircuitBreaker per provider name, created on first use."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(name, self.failure_threshold, self.reset_timeout)
+                self._breakers[name] = breaker
+            return breaker
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {b.name: b.stats() for b in breakers}
+
+
+def provider_name(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """'serpapi.com:google_flights', 'api.openweathermap.org', ..."""
+    host = urlsplit(url).hostname or "unknown"
+    engine = (params or {}).get("engine")
+    return f"{host}:{engine}" if engine else host
+
+
+def is_failure_status(status: int) -> bool:
+    """Statuses that count against a provider's health (4xx are our fault)."""
+    return status >= 500 or status == 429
+
+
+breakers = BreakerRegistry(
+    failure_threshold=int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5")),
+    reset_timeout=float(os.getenv("BREAKER_RESET_SECONDS", "30")),
+)
+retry_budget = RetryBudget(
+    ratio=float(os.getenv("RETRY_BUDGET_RATIO", "0.2")),
+    min_per_sec=float(os.getenv("RETRY_BUDGET_MIN_PER_SEC", "1")),
+)
+metrics.register("provider_breakers", breakers.stats)
+metrics.register("provider_retry_budget", retry_budget.stats)
@@ -0,0 +1,284 @@
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from cache_utils import background_refresh
+from metrics import metrics
+from zapi.rate_limit import TokenBucket
+
+# Lower value = served first.
+INTERACTIVE = 0   # a user is waiting on /trip, /chat
+BACKGROUND = 1    # cache refreshes, prefetch, batch jobs
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+_priority: contextvars.ContextVar = contextvars.ContextVar("serpapi_priority", default=None)
+
+
+class QuotaExceededError(Exception):
+    """The SerpAPI monthly allowance (or its background share) is used up."""
+
+
+class SchedulerTimeout(Exception):
+    """No rate-limit token became available within the caller's timeout."""
+
+
+@contextlib.contextmanager
+def priority(level: int):
+    """
+    Run SerpAPI calls made inside the block at `level`:
+
+        with priority(BACKGROUND):
+            providers.hotels(...)
+    """
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    level = _priority.get()
+    if level is not None:
+        return level
+    return BACKGROUND if background_refresh.get() else INTERACTIVE
+
+
+def request_key(url: str, params: Optional[Dict[str, Any]]) -> str:
+    """Identity of a GET for coalescing: URL plus sorted params."""
+    return url + "?" + "&".join(f"{k}={v}" for k, v in sorted((params or {}).items()))
+
+
+def is_serpapi(url: str) -> bool:
+    return urlsplit(url).hostname == "serpapi.com"
+
+
+class SerpAPIScheduler:
+    """
+    Gate for every request that spends SERPAPI_KEY quota (flights, hotels,
+    Tripadvisor, maps).
+
+    - Token bucket: `rate_per_sec` sustained, `burst` at once. Waiters are
+      served strictly by priority, then arrival, so interactive traffic
+      overtakes queued background work.
+    - Monthly quota: with `monthly_quota` set, background calls stop once
+      usage reaches (1 - interactive_reserve) of it and all calls stop at
+      100%, raising QuotaExceededError. Usage is counted per process and
+      calendar month.
+    - Coalescing: identical queries already in flight share one call
+      (coalesce / acoalesce).
+    """
+
+    def __init__(
+        self,
+        rate_per_sec: float = 5,
+        burst: Optional[float] = None,
+        monthly_quota: Optional[int] = None,
+        interactive_reserve: float = 0.1,
+    ):
+        self.bucket = TokenBucket(rate_per_sec, burst)
+        self.monthly_quota = monthly_quota
+        self.interactive_reserve = interactive_reserve
+
+        self._cond = threading.Condition()
+        self._waiters: list = []
+        self._seq = itertools.count()
+        self._month = datetime.now().strftime("%Y-%m")
+        self._used = 0
+
+        self._inflight: Dict[str, Future] = {}
+        self._ainflight: Dict[Tuple[int, str], "asyncio.Future"] = {}
+        self._inflight_lock = threading.Lock()
+
+        self._granted = {name: 0 for name in PRIORITY_NAMES.values()}
+        self._coalesced = 0
+        self._quota_rejected = 0
+
+    # ------------------------ Quota ------------------------
+    def _check_quota(self, level: int) -> None:
+        """Caller holds self._cond."""
+        month = datetime.now().strftime("%Y-%m")
+        if month != self._month:
+            self._month, self._used = month, 0
+        if not self.monthly_quota:
+            return
+        limit = self.monthly_quota
+        if level != INTERACTIVE:
+            limit = int(self.monthly_quota * (1 - self.interactive_reserve))
+        if self._used >= limit:
+            self._quota_rejected += 1
+            metrics.incr("serpapi_scheduler.quota_rejected")
+            raise QuotaExceededError(
+                f"SerpAPI quota reached ({self._used}/{self.monthly_quota} this month, "
+                f"{PRIORITY_NAMES.get(level, level)} limit {limit})"
+            )
+
+    # ------------------------ Tokens ------------------------
+    def _poll(self, ticket) -> float:
+        """0 if `ticket` got a token now, else seconds to wait before polling again."""
+        with self._cond:
+            if self._waiters[0] != ticket:
+                return 0.01
+            self._check_quota(ticket[0])
+            if self.bucket.try_acquire():
+                heapq.heappop(self._waiters)
+                self._used += 1
+                self._cond.notify_all()
+                return 0.0
+            return max(self.bucket.wait_time(), 0.001)
+
+    def _enqueue(self, level: int):
+        ticket = (level, next(self._seq))
+        with self._cond:
+            self._check_quota(level)
+            heapq.heappush(self._waiters, ticket)
+        return ticket
+
+    def _dequeue(self, ticket) -> None:
+        with self._cond:
+            if ticket in self._waiters:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def _granted_after(self, level: int, start: float) -> float:
+        waited = time.perf_counter() - start
+        name = PRIORITY_NAMES.get(level, str(level))
+        with self._cond:
+            self._granted[name] = self._granted.get(name, 0) + 1
+        metrics.observe("serpapi_scheduler.wait", waited)
+        return waited
+
+    def acquire(self, level: Optional[int] = None, timeout: Optional[float] = None) -> float:
+        """Block until this call may go out; returns seconds waited."""
+        level = current_priority() if level is None else level
+        start = time.perf_counter()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        ticket = self._enqueue(level)
+        try:
+            while True:
+                wait = self._poll(ticket)
+                if wait == 0.0:
+                    return self._granted_after(level, start)
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise SchedulerTimeout(f"no SerpAPI slot within {timeout}s")
+                    wait = min(wait, remaining)
+                with self._cond:
+                    self._cond.wait(wait)
+        except BaseException:
+            self._dequeue(ticket)
+            raise
+
+    async def aacquire(self, level: Optional[int] = None, timeout: Optional[float] = None) -> float:
+        """Async counterpart of acquire()."""
+        level = current_priority() if level is None else level
+        start = time.perf_counter()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        ticket = self._enqueue(level)
+        try:
+            while True:
+                wait = self._poll(ticket)
+                if wait == 0.0:
+                    return self._granted_after(level, start)
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise SchedulerTimeout(f"no SerpAPI slot within {timeout}s")
+                    wait = min(wait, remaining)
+                await asyncio.sleep(wait)
+        except BaseException:
+            self._dequeue(ticket)
+            raise
+
+    # ------------------------ Coalescing ------------------------
+    def coalesce(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Run fn() once for concurrent callers with the same key."""
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self._coalesced += 1
+        if not leader:
+            metrics.incr("serpapi_scheduler.coalesced")
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    async def acoalesce(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Async counterpart of coalesce() (per event loop)."""
+        loop = asyncio.get_running_loop()
+        akey = (id(loop), key)
+        with self._inflight_lock:
+            future = self._ainflight.get(akey)
+            leader = future is None
+            if leader:
+                future = self._ainflight[akey] = loop.create_future()
+            else:
+                self._coalesced += 1
+        if not leader:
+            metrics.incr("serpapi_scheduler.coalesced")
+            return await asyncio.shield(future)
+
+        try:
+            result = await fn()
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._inflight_lock:
+                self._ainflight.pop(akey, None)
+
+    # ------------------------ Metrics ------------------------
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            depth = {name: 0 for name in PRIORITY_NAMES.values()}
+            for level, _ in self._waiters:
+                name = PRIORITY_NAMES.get(level, str(level))
+                depth[name] = depth.get(name, 0) + 1
+            used = self._used
+        return {
+            "queue_depth": depth,
+            "granted": dict(self._granted),
+            "coalesced": self._coalesced,
+            "quota_rejected": self._quota_rejected,
+            "month_used": used,
+            "monthly_quota": self.monthly_quota,
+        }
+
+
+_quota = os.getenv("SERPAPI_MONTHLY_QUOTA", "")
+serpapi_scheduler = SerpAPIScheduler(
+    rate_per_sec=float(os.getenv("SERPAPI_RATE_PER_SEC", "5")),
+    burst=float(os.getenv("SERPAPI_BURST", "5")),
+    monthly_quota=int(_quota) if _quota.isdigit() else None,
+    interactive_reserve=float(os.getenv("SERPAPI_INTERACTIVE_RESERVE", "0.1")),
+)
+metrics.register("serpapi_scheduler", serpapi_scheduler.stats)
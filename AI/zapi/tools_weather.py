@@ -2,14 +2,30 @@ import os
 import requests
 from dotenv import load_dotenv
 
+from zapi.http_client import http_client
+from zapi.async_http_client import async_http_client
+
 load_dotenv()
 
 OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
+OPENWEATHER_URL = "https://api.openweathermap.org/data/2.5/weather"
+
+
+def _format_weather(data, city: str) -> str:
+    name = data.get("name", city)
+    country = data.get("sys", {}).get("country", "")
+    main = data.get("weather", [{}])[0].get("description", "unknown").capitalize()
+    temp = data.get("main", {}).get("temp")
+    feels = data.get("main", {}).get("feels_like")
+    humidity = data.get("main", {}).get("humidity")
 
+    return (
+        f"Weather in {name}, {country}: {main}. "
+        f"Temperature {temp}°C (feels like {feels}°C). "
+        f"Humidity {humidity}%."
+    )
 
-from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type
 
-@retry(wait=wait_exponential(min=1, max=10), stop=stop_after_attempt(3), retry=retry_if_exception_type(requests.exceptions.RequestException))
 def get_weather(city: str) -> str:
     """
     Simple wrapper around OpenWeather current weather API.
@@ -24,29 +40,35 @@ def get_weather(city: str) -> str:
         return "Please provide a valid city name."
 
     try:
-        url = (
-            "https://api.openweathermap.org/data/2.5/weather"
-            f"?q={city}&appid={OPENWEATHER_API_KEY}&units=metric"
-        )
-        resp = requests.get(url, timeout=10)
+        params = {"q": city, "appid": OPENWEATHER_API_KEY, "units": "metric"}
+        resp = http_client.get(OPENWEATHER_URL, params=params, timeout=10)
 
         if resp.status_code != 200:
             return f"Could not fetch weather for '{city}'. (status {resp.status_code})"
 
-        data = resp.json()
-        name = data.get("name", city)
-        country = data.get("sys", {}).get("country", "")
-        main = data.get("weather", [{}])[0].get("description", "unknown").capitalize()
-        temp = data.get("main", {}).get("temp")
-        feels = data.get("main", {}).get("feels_like")
-        humidity = data.get("main", {}).get("humidity")
-
-        return (
-            f"Weather in {name}, {country}: {main}. "
-            f"Temperature {temp}°C (feels like {feels}°C). "
-            f"Humidity {humidity}%."
-        )
+        return _format_weather(resp.json(), city)
     except requests.exceptions.RequestException as e:
         return f"Error fetching weather: {e}"
     except Exception as e:
         return f"Error fetching weather: {e}"
+
+
+async def get_weather_async(city: str) -> str:
+    """Async counterpart of get_weather (same arguments and result)."""
+    if not OPENWEATHER_API_KEY:
+        return "Weather API key missing. Please set OPENWEATHER_API_KEY in .env."
+
+    city = city.strip()
+    if not city:
+        return "Please provide a valid city name."
+
+    try:
+        params = {"q": city, "appid": OPENWEATHER_API_KEY, "units": "metric"}
+        resp = await async_http_client.get(OPENWEATHER_URL, params=params, timeout=10)
+
+        if resp.status_code != 200:
+            return f"Could not fetch weather for '{city}'. (status {resp.status_code})"
+
+        return _format_weather(resp.json(), city)
+    except Exception as e:
+        return f"Error fetching weather: {e}"
@@ -1,10 +1,79 @@
+import contextvars
 import os
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
 from dotenv import load_dotenv
 
+from cache_utils import TTLCache
+from zapi.http_client import http_client
+from zapi.async_http_client import async_http_client
+from zapi.records import Place, debug_payload
+
 load_dotenv()
 
 SERPAPI_KEY = os.getenv("SERPAPI_KEY")
+SERPAPI_URL = "https://serpapi.com/search"
+SNIPPET_CHARS = 300
+
+# Per-query place lists for search_tripadvisor_categories, keyed by city and
+# query text, so a plan with a new interests string refetches only that query.
+places_cache = TTLCache(ttl_seconds=21600, max_entries=512)
+
+
+def _tripadvisor_params(city, interests, currency):
+    # Build query like: "Hyderabad best food and nightlife" etc.
+    if interests:
+        query = f"{city} {interests}"
+    else:
+        query = city
+
+    return {
+        "engine": "tripadvisor",  # <-- IMPORTANT: Tripadvisor Search Engine on SerpAPI
+        "q": query,
+        "currency": currency,
+        "hl": "en",
+        "api_key": SERPAPI_KEY,
+    }
+
+
+def _parse_places(data, max_results):
+    # Common SerpAPI Tripadvisor format: "organic_results"
+    results = data.get("organic_results", []) or data.get("results", [])
+
+    places = []
+
+    for r in results[:max_results]:
+        title = r.get("title")
+        category = r.get("category") or r.get("type")
+        rating = r.get("rating")
+        reviews = r.get("reviews")
+        price_level = r.get("price_level")
+        address = r.get("address")
+        snippet = r.get("snippet") or r.get("description")
+        if snippet:
+            snippet = " ".join(snippet.split())[:SNIPPET_CHARS]
+        image = r.get("thumbnail")
+        link = r.get("link")
+
+        places.append(
+            Place(
+                title=title,
+                category=category,         # e.g. "Restaurant", "Attraction"
+                rating=rating,
+                reviews=reviews,
+                price_level=price_level,   # $, $$, ₹₹, etc.
+                address=address,
+                snippet=snippet,
+                image=image,
+                link=link,
+            )
+        )
+
+    if not places:
+        debug_payload("tripadvisor", "No Tripadvisor places found", data)
+        return {"error": "No Tripadvisor places found"}
+
+    return {"places": [p.to_compact() for p in places]}
 
 
 def search_tripadvisor(
@@ -41,68 +110,105 @@ def search_tripadvisor(
     if not SERPAPI_KEY:
         return {"error": "SERPAPI_KEY missing in .env"}
 
-    # Build query like: "Hyderabad best food and nightlife" etc.
-    if interests:
-        query = f"{city} {interests}"
-    else:
-        query = city
+    params = _tripadvisor_params(city, interests, currency)
 
-    url = "https://serpapi.com/search"
+    try:
+        data = http_client.get_json(SERPAPI_URL, params=params, timeout=20)
+        return _parse_places(data, max_results)
+    except Exception as e:
+        return {"error": f"Exception calling SerpAPI Tripadvisor API: {e}"}
 
-    params = {
-        "engine": "tripadvisor",  # <-- IMPORTANT: Tripadvisor Search Engine on SerpAPI
-        "q": query,
-        "currency": currency,
-        "hl": "en",
-        "api_key": SERPAPI_KEY,
-    }
 
-    from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type
+async def search_tripadvisor_async(
+    city: str,
+    interests: str | None = None,
+    max_results: int = 10,
+    currency: str = "INR",
+):
+    """Async counterpart of search_tripadvisor (same arguments and result)."""
 
-    @retry(wait=wait_exponential(min=1, max=10), stop=stop_after_attempt(3), retry=retry_if_exception_type(requests.exceptions.RequestException))
-    def _call_tripadvisor(url, params):
-        resp = requests.get(url, params=params, timeout=20)
-        if resp.status_code != 200:
-            raise requests.exceptions.RequestException(f"HTTP {resp.status_code}")
-        return resp.json()
+    if not SERPAPI_KEY:
+        return {"error": "SERPAPI_KEY missing in .env"}
+
+    params = _tripadvisor_params(city, interests, currency)
 
     try:
-        data = _call_tripadvisor(url, params)
-
-        # Common SerpAPI Tripadvisor format: "organic_results"
-        results = data.get("organic_results", []) or data.get("results", [])
-
-        places = []
-
-        for r in results[:max_results]:
-            title = r.get("title")
-            category = r.get("category") or r.get("type")
-            rating = r.get("rating")
-            reviews = r.get("reviews")
-            price_level = r.get("price_level")
-            address = r.get("address")
-            snippet = r.get("snippet") or r.get("description")
-            image = r.get("thumbnail")
-            link = r.get("link")
-
-            places.append(
-                {
-                    "title": title,
-                    "category": category,         # e.g. "Restaurant", "Attraction"
-                    "rating": rating,
-                    "reviews": reviews,
-                    "price_level": price_level,   # $, $$, ₹₹, etc.
-                    "address": address,
-                    "snippet": snippet,
-                    "image": image,
-                    "link": link,
-                }
-            )
+        data = await async_http_client.get_json(SERPAPI_URL, params=params, timeout=20)
+        return _parse_places(data, max_results)
+    except Exception as e:
+        return {"error": f"Exception calling SerpAPI Tripadvisor API: {e}"}
 
-        if not places:
-            return {"error": "No Tripadvisor places found", "raw": data}
 
-        return {"places": places}
+# -------------------------------------------------
+# MULTI-CATEGORY QUERY PLAN
+# -------------------------------------------------
+def _place_key(place: dict) -> str:
+    link = (place.get("link") or "").split("?")[0].rstrip("/").lower()
+    return link or " ".join((place.get("title") or "").split()).lower()
 
-    except Exception as e:
-        return {"error": f"Exception calling SerpAPI Tripadvisor API: {e}"}
+
+def search_tripadvisor_categories(
+    city: str,
+    categories: Dict[str, Optional[str]],
+    max_results: int = 15,
+    currency: str = "INR",
+    search=None,
+):
+    """
+    Several Tripadvisor category lookups for one city as a single plan.
+
+    categories : {"activities": "things to do", "food": "best food and restaurants", ...}
+
+    Categories with the same query text share one request, distinct queries
+    run concurrently, and places returned by several queries are merged by
+    link (or title). Each query's result is cached per city, so plans that
+    differ only in their interests text reuse the shared category lookups.
+
+    Returns:
+        {
+          "places": [{..., "categories": ["activities", "interests"]}, ...],
+          "views":  {"activities": [...], "food": [...], ...}   # per-category ranking
+        }
+    or {"error": ...} if every query failed.
+    """
+    search = search or search_tripadvisor
+    city_key = " ".join(city.split()).lower()
+
+    queries: Dict[str, list] = {}
+    for name, interests in categories.items():
+        queries.setdefault(" ".join((interests or "").split()).lower(), []).append(name)
+
+    def fetch(query):
+        result = places_cache.get_or_compute(
+            (city_key, query, max_results, currency.upper()),
+            lambda: search(city=city, interests=query or None, max_results=max_results, currency=currency),
+            is_error=lambda v: not isinstance(v, dict) or "places" not in v,
+        )
+        return query, result
+
+    with ThreadPoolExecutor(max_workers=max(1, min(4, len(queries)))) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, fetch, query) for query in queries]
+        responses = [future.result() for future in futures]
+
+    merged: Dict[str, dict] = {}
+    views: Dict[str, list] = {name: [] for name in categories}
+    errors = []
+    for query, result in responses:
+        if not isinstance(result, dict) or "places" not in result:
+            errors.append(result.get("error", "no places") if isinstance(result, dict) else str(result))
+            continue
+        for place in result["places"]:
+            key = _place_key(place)
+            if not key:
+                continue
+            entry = merged.get(key)
+            if entry is None:
+                entry = merged[key] = {**place, "categories": []}
+            for name in queries[query]:
+                if name not in entry["categories"]:
+                    entry["categories"].append(name)
+                    views[name].append(entry)
+
+    if not merged:
+        return {"error": "; ".join(errors) or "No Tripadvisor places found"}
+    return {"places": list(merged.values()), "views": views}